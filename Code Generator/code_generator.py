@@ -2,6 +2,11 @@ import json
 import os
 import sys
 
+# the arena AST lives with the parser; its Node views answer the dict-style
+# lookups below (node['typ'], node.get('children', []), 'size' in node)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'SyntaxAnalyzer'))
+from ast_arena import AST, IndexedASTFile, is_ast_file, is_indexed_ast_file
+
 # Expanded mapping from Trust types to C types
 C_PRIMITIVES = {
     'TypeI32': 'int',  # Trust i32 mapped to C int
@@ -123,10 +128,10 @@ def map_type(node):
         return {'ctype': 'void'}
     
 
-def gen_structs():
+def gen_structs(defs=None):
     """Generate C structs based on the defined struct information."""
     lines = []
-    for s in struct_defs:
+    for s in struct_defs if defs is None else defs:
         lines.append(f"typedef struct {{")
         for ctype, fname in s['fields']:
             if ctype == 'i32':
@@ -135,198 +140,193 @@ def gen_structs():
         lines.append(f"}} {s['name']};\n")
     return lines
 
-def gen_program(prog):
-    struct_defs.clear()
-
-    # 1) Collect all top‐level lets as C globals
-    globals_code = []
-    for node in prog['children']:
-        if node['typ'] != 'LetDecl':
+HEADERS = [
+    "#include <stdio.h>",
+    "#include <stdlib.h>",
+    "#include <stdbool.h>",
+    ""
+]
+
+def gen_global(node):
+    """C global for a top-level LetDecl, or None."""
+    # unwrap Pattern → VarPattern
+    pat = get_child(node, 'Pattern')
+    if not pat:
+        return None
+    vp = get_child(pat, 'VarPattern')
+    if not vp:
+        return None
+
+    ctype = annotate(vp, 'ctype') or 'int'
+    name  = vp['value']
+    size  = vp.get('size')
+
+    # initializer (if any)
+    init_expr = None
+    expr_wrap = get_child(node,'Expr')
+    if expr_wrap and expr_wrap.get('children'):
+        init_node = expr_wrap['children'][0]
+        # unwrap unary plus/minus if necessary
+        # gen_expr must handle Number, BinaryOp, UnaryOp, etc.
+        init_expr = gen_expr(init_node)
+
+    # default initializer if none
+    if init_expr is None:
+        init_expr = 'false' if ctype == 'bool' else '0'
+
+    if size is not None:
+        return f"{ctype} {name}[{size}] = {init_expr};"
+    return f"{ctype} {name} = {init_expr};"
+
+def return_struct(fn):
+    """(a) the struct of a named tuple return, or None."""
+    struct_name = annotate(fn, 'struct_name')
+    if not struct_name:
+        return None
+    rtype      = get_child(fn, 'ReturnType')['children'][0]
+    tuple_node = get_child(rtype, 'TupleType')
+    fields     = [
+        (map_type({'children': [c]})['ctype'], f'f{i}')
+        for i, c in enumerate(tuple_node['children'])
+    ]
+    return {'name': struct_name, 'fields': fields}
+
+def param_structs(fn):
+    """(b) parameter-tuple structs."""
+    structs = []
+    # look at each Param under Params
+    for param in get_child(fn, 'Params')['children']:
+        varpat = get_child(param, 'VarPattern')
+        struct_name = annotate(varpat, 'struct_name')
+        # only process tuple parameters
+        if not struct_name:
             continue
 
-        # unwrap Pattern → VarPattern
-        pat = get_child(node, 'Pattern')
-        if not pat:
-            continue
-        vp = get_child(pat, 'VarPattern')
-        if not vp:
+        # the Param node has a child 'Type' or 'TypeAnnotation'
+        type_node = get_child(param, 'Type') or get_child(param, 'TypeAnnotation')
+        tup_node  = get_child(type_node, 'TupleType') if type_node else None
+        if not tup_node:
+            continue  # not a tuple parameter?
+
+        # now build each field type from the tuple’s element types
+        elem_cts = []
+        for elem in tup_node['children']:
+            if elem['typ'] == 'TypeI32':      elem_cts.append('int')
+            elif elem['typ'] == 'TypeBool':   elem_cts.append('bool')
+            elif elem['typ'] == 'ArrayType':  elem_cts.append('int*')
+            else:                            elem_cts.append('void')
+
+        fields = [(ctype, f"f{i}") for i, ctype in enumerate(elem_cts)]
+        structs.append({'name': struct_name, 'fields': fields})
+    return structs
+
+def let_structs(fn):
+    """(c) structs of tuple lets in a function body."""
+    structs = []
+    # iterate over all LetDecls in this function body
+    body_stmts = get_child(fn, 'Body')['children'][0]['children']
+    for stmt in body_stmts:
+        if stmt['typ'] != 'LetDecl':
             continue
 
-        ctype = annotate(vp, 'ctype') or 'int'
-        name  = vp['value']
-        size  = vp.get('size')
-
-        # initializer (if any)
-        init_expr = None
-        expr_wrap = get_child(node,'Expr')
-        if expr_wrap and expr_wrap.get('children'):
-            init_node = expr_wrap['children'][0]
-            # unwrap unary plus/minus if necessary
-            # gen_expr must handle Number, BinaryOp, UnaryOp, etc.
-            init_expr = gen_expr(init_node)
-
-        # default initializer if none
-        if init_expr is None:
-            init_expr = 'false' if ctype == 'bool' else '0'
-
-        if size is not None:
-            globals_code.append(f"{ctype} {name}[{size}] = {init_expr};")
-        else:
-            globals_code.append(f"{ctype} {name} = {init_expr};")
-
-
-
-    # (a) named tuple returns
-    for fn in prog.get('children', []):
-        if fn['typ'] != 'FunctionDecl':
-            continue
-        struct_name = annotate(fn, 'struct_name')
-        if struct_name:
-            rtype      = get_child(fn, 'ReturnType')['children'][0]
-            tuple_node = get_child(rtype, 'TupleType')
-            fields     = [
-                (map_type({'children': [c]})['ctype'], f'f{i}')
-                for i, c in enumerate(tuple_node['children'])
-            ]
-            struct_defs.append({'name': struct_name, 'fields': fields})
-        
-
-    # (b) parameter‑tuple structs
-    for fn in prog.get('children', []):
-        if fn['typ'] != 'FunctionDecl':
+        # unwrap the Pattern wrapper
+        pat_wrapper = get_child(stmt, 'Pattern')
+        if not pat_wrapper:
             continue
 
+        #
+        # (c1) single‐binding with explicit tuple type:
+        #      let t: (i32,bool) = …
+        #
+        # check for a single VarPattern carrying struct_name
+        vp = get_child(pat_wrapper, 'VarPattern')
+        struct_name = annotate(vp, 'struct_name') if vp else None
 
-        # look at each Param under Params
-        for param in get_child(fn, 'Params')['children']:
-            varpat = get_child(param, 'VarPattern')
-            struct_name = annotate(varpat, 'struct_name')
-            # only process tuple parameters
-            if not struct_name:
-                continue
-
-            # the Param node has a child 'Type' or 'TypeAnnotation'
-            type_node = get_child(param, 'Type') or get_child(param, 'TypeAnnotation')
-            tup_node  = get_child(type_node, 'TupleType') if type_node else None
-            if not tup_node:
-                continue  # not a tuple parameter?
+        # check if this same stmt has a Type → TupleType
+        type_node = get_child(stmt, 'Type')
+        tup_node  = get_child(type_node, 'TupleType') if type_node else None
 
-            # now build each field type from the tuple’s element types
+        if struct_name and tup_node:
+            # build C field types from the TupleType children
             elem_cts = []
             for elem in tup_node['children']:
-                if elem['typ'] == 'TypeI32':      elem_cts.append('int')
-                elif elem['typ'] == 'TypeBool':   elem_cts.append('bool')
-                elif elem['typ'] == 'ArrayType':  elem_cts.append('int*')
-                else:                            elem_cts.append('void')
+                if elem['typ'] == 'TypeI32':
+                    elem_cts.append('int')
+                elif elem['typ'] == 'TypeBool':
+                    elem_cts.append('bool')
+                elif elem['typ'] == 'ArrayType':
+                    elem_cts.append('int*')
+                else:
+                    elem_cts.append('void')
 
             fields = [(ctype, f"f{i}") for i, ctype in enumerate(elem_cts)]
-            struct_defs.append({'name': struct_name, 'fields': fields})
-
-    # (c) let‐binding tuple structs
-    for fn in prog.get('children', []):
-        if fn['typ'] != 'FunctionDecl':
-            continue
+            structs.append({'name': struct_name, 'fields': fields})
+
+        # (c2) destructuring‐binding (let (a, b) = t): the VarPatterns
+        # carry the struct_name of a tuple defined elsewhere, so there is
+        # nothing to add here
+    return structs
+
+def global_let_struct(node):
+    """(d) the struct of a global tuple let, or None."""
+    # explicit Type → TupleType?
+    type_node = get_child(node,'Type')
+    tup_node  = get_child(type_node,'TupleType') if type_node else None
+    if not tup_node:
+        return None
+    pat = get_child(node,'Pattern')
+    vp  = get_child(pat,'VarPattern') if pat else None
+    struct_name = annotate(vp,'struct_name') if vp else None
+    if not struct_name:
+        return None
+    # gather element ctypes
+    fields = []
+    for i, elem in enumerate(tup_node['children']):
+        c = map_type({'children':[elem]})['ctype']
+        fields.append((c,f"f{i}"))
+    return {'name': struct_name, 'fields': fields}
+
+def gen_param(vp):
+    """C parameter for an annotated VarPattern (or a signature table entry)."""
+    if 'size' in vp:
+        return f"{annotate(vp,'ctype')}* {vp['value']}"
+    elif 'struct_name' in vp:
+        return f"{annotate(vp,'struct_name')} {vp['value']}"
+    return f"{annotate(vp,'ctype') or 'int'} {vp['value']}"
+
+def gen_return_type(fn):
+    """C return type of an annotated FunctionDecl (or a signature table entry)."""
+    if 'struct_name' in fn:
+        return annotate(fn, 'struct_name')
+    return annotate(fn, 'return_ctype') or 'void'
 
-        # iterate over all LetDecls in this function body
-        body_stmts = get_child(fn, 'Body')['children'][0]['children']
-        for stmt in body_stmts:
-            if stmt['typ'] != 'LetDecl':
-                continue
-
-            # unwrap the Pattern wrapper
-            pat_wrapper = get_child(stmt, 'Pattern')
-            if not pat_wrapper:
-                continue
-
-            #
-            # (c1) single‐binding with explicit tuple type:
-            #      let t: (i32,bool) = …
-            #
-            # check for a single VarPattern carrying struct_name
-            vp = get_child(pat_wrapper, 'VarPattern')
-            struct_name = annotate(vp, 'struct_name') if vp else None
-
-            # check if this same stmt has a Type → TupleType
-            type_node = get_child(stmt, 'Type')
-            tup_node  = get_child(type_node, 'TupleType') if type_node else None
-
-            if struct_name and tup_node:
-                # build C field types from the TupleType children
-                elem_cts = []
-                for elem in tup_node['children']:
-                    if elem['typ'] == 'TypeI32':
-                        elem_cts.append('int')
-                    elif elem['typ'] == 'TypeBool':
-                        elem_cts.append('bool')
-                    elif elem['typ'] == 'ArrayType':
-                        elem_cts.append('int*')
-                    else:
-                        elem_cts.append('void')
-
-                fields = [(ctype, f"f{i}") for i, ctype in enumerate(elem_cts)]
-                struct_defs.append({'name': struct_name, 'fields': fields})
-
-                # we’ve generated this struct—skip to next LetDecl
-                continue
-
-            #
-            # (c2) destructuring‐binding:
-            #      let (a, b) = t
-            #      pattern is TuplePattern of VarPatterns,
-            #      but no Type annotation here
-            #
-            # look for a TuplePattern anywhere under the Pattern wrapper
-            pat = None
-            stack = [pat_wrapper]
-            while stack:
-                nd = stack.pop()
-                if nd.get('typ') == 'TuplePattern':
-                    pat = nd
-                    break
-                for ch in nd.get('children', []):
-                    stack.append(ch)
-
-            if not pat:
-                # no TuplePattern, move on
-                continue
-
-            # each VarPattern child will carry the same struct_name
-            # pick the first one to record the struct (fields were already
-            # generated in c1, so we don’t append here—this pass just
-            # ensures your code knows the struct_name exists)
-            first_vp = next((c for c in pat['children'] if c['typ'] == 'VarPattern'), None)
-            if not first_vp or 'struct_name' not in first_vp:
-                continue
+def gen_signature(fn):
+    """`ret name(params)` of a FunctionDecl."""
+    name   = get_child(fn, 'Id')['value']
+    params = [gen_param(get_child(p, 'VarPattern')) for p in get_child(fn, 'Params')['children']]
+    return f"{gen_return_type(fn)} {name}({', '.join(params)})"
 
-            # nothing more to do—the struct was already defined in c1
-            # (if you ever want to recalc fields here, you could, but it's
-            # redundant since we already appended above)
-            # continue to next LetDecl
-            continue
+def gen_prototype(fn):
+    """Forward declaration of a FunctionDecl."""
+    return gen_signature(fn) + ";"
 
+def gen_program(prog):
+    struct_defs.clear()
+    items = prog['children']
+    fns   = [fn for fn in items if fn['typ'] == 'FunctionDecl']
+    lets  = [node for node in items if node['typ'] == 'LetDecl']
 
-    # (d) global tuple‐let structs
-    for node in prog['children']:
-        if node['typ'] != 'LetDecl': 
-            continue
-        # explicit Type → TupleType?
-        type_node = get_child(node,'Type')
-        tup_node  = get_child(type_node,'TupleType') if type_node else None
-        if not tup_node:
-            continue
-        pat = get_child(node,'Pattern')
-        vp  = get_child(pat,'VarPattern') if pat else None
-        struct_name = annotate(vp,'struct_name') if vp else None
-        if not struct_name:
-            continue
-        # gather element ctypes
-        fields = []
-        for i, elem in enumerate(tup_node['children']):
-            c = map_type({'children':[elem]})['ctype']
-            fields.append((c,f"f{i}"))
-        struct_defs.append({'name': struct_name, 'fields': fields})
-    
+    # 1) Collect all top‐level lets as C globals
+    globals_code = [code for code in map(gen_global, lets) if code is not None]
 
+    # (a) named tuple returns, (b) parameter‑tuple structs, (c) let‐binding
+    # tuple structs, (d) global tuple‐let structs
+    struct_defs.extend(s for s in map(return_struct, fns) if s)
+    for fn in fns:
+        struct_defs.extend(param_structs(fn))
+    for fn in fns:
+        struct_defs.extend(let_structs(fn))
+    struct_defs.extend(s for s in map(global_let_struct, lets) if s)
 
     # dedupe
     unique, seen = [], set()
@@ -337,12 +337,7 @@ def gen_program(prog):
     struct_defs[:] = unique
 
     # 2) Emit headers + typedefs first
-    lines = [
-    "#include <stdio.h>",
-    "#include <stdlib.h>",
-    "#include <stdbool.h>",
-    ""
-    ]
+    lines = list(HEADERS)
     lines += gen_structs()      # <<— BEFORE any globals that use them
     lines.append("")            # blank line
 
@@ -351,60 +346,152 @@ def gen_program(prog):
     lines.append("")
 
     # forward‐declare prototypes
-    for fn in prog.get('children', []):
-        if fn['typ'] != 'FunctionDecl':
-            continue
-
-        name   = get_child(fn, 'Id')['value']
-        params = []
-        for p in get_child(fn, 'Params')['children']:
-            vp = get_child(p, 'VarPattern')
-            if 'size' in vp:
-                params.append(f"{annotate(vp,'ctype')}* {vp['value']}")
-            elif 'struct_name' in vp:
-                params.append(f"{annotate(vp,'struct_name')} {vp['value']}")
-            else:
-                params.append(f"{annotate(vp,'ctype') or 'int'} {vp['value']}")
-
-        if 'struct_name' in fn:
-            ret = annotate(fn, 'struct_name')
-        else:
-            ret = annotate(fn, 'return_ctype') or 'void'
-
-        lines.append(f"{ret} {name}({', '.join(params)});")
-
+    lines += map(gen_prototype, fns)
     lines.append("")
 
     # definitions
-    for fn in prog.get('children', []):
-        if fn['typ'] == 'FunctionDecl':
-            lines += gen_function(fn)
-            lines.append("")
+    for fn in fns:
+        lines += gen_function(fn)
+        lines.append("")
 
     return lines
 
 
-def gen_function(fn):
-    """Generate the C function definition from a function declaration."""
-    name   = get_child(fn, 'Id')['value']
-    params = []
-    # build params (no tuple‐out pointers)
-    for p in get_child(fn, 'Params')['children']:
-        vp = get_child(p, 'VarPattern')
-        if 'size' in vp:
-            params.append(f"{annotate(vp,'ctype')}* {vp['value']}")
-        elif 'struct_name' in vp:
-            params.append(f"{annotate(vp,'struct_name')} {vp['value']}")
+def start_stream():
+    """Begin streamed output (see gen_item): forget earlier structs, return the headers."""
+    struct_defs.clear()
+    return list(HEADERS)
+
+def struct_from_name(name):
+    """A tuple struct rebuilt from its name, 'tuple_' + element types joined by '_'."""
+    elems = name[len('tuple_'):].split('_')
+    return {'name': name, 'fields': [('int' if t == 'i32' else t, f"f{i}") for i, t in enumerate(elems)]}
+
+def used_structs(node):
+    """Names of the tuple structs annotated anywhere in node's subtree, in preorder."""
+    names = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if 'struct_name' in n:
+            names.append(n['struct_name'])
+        stack.extend(reversed(n['children']))
+    return names
+
+def gen_item(node):
+    """
+    C for one checked top-level item of a stream, in source order: the
+    tuple structs it is the first to use, then its global or its
+    definition. Items can only use functions and globals declared before
+    them, so unlike gen_program no prototypes are needed. A struct that
+    gen_program would take from a later item (e.g. for an inferred tuple
+    type) is rebuilt from its name.
+    """
+    if node['typ'] == 'FunctionDecl':
+        structs = [return_struct(node)] + param_structs(node) + let_structs(node)
+    elif node['typ'] == 'LetDecl':
+        structs = [global_let_struct(node)]
+    else:
+        return []
+    structs += map(struct_from_name, used_structs(node))
+    seen = {s['name'] for s in struct_defs}
+    new = []
+    for s in structs:
+        if s and s['name'] not in seen:
+            seen.add(s['name'])
+            new.append(s)
+    struct_defs.extend(new)
+    lines = gen_structs(new)
+    if node['typ'] == 'LetDecl':
+        code = gen_global(node)
+        return lines + ([code] if code is not None else [])
+    return lines + gen_function(node) + [""]
+
+
+def elem_ctype(typ):
+    """C field type of a tuple element type as the semantic analyzer writes it ('i32', '[i32;3]', ...)."""
+    if typ == 'i32':
+        return 'int'
+    if typ == 'bool':
+        return 'bool'
+    if typ.startswith('['):
+        return 'int*'
+    return 'void'
+
+def indexed_structs(f):
+    """
+    The tuple structs gen_program finds for the program in IndexedASTFile
+    f, in its order (named tuple returns, parameter tuples, tuple lets,
+    global tuple lets), decoding one item at a time. Each kind keeps the
+    first struct of a name only, so this holds one entry per distinct
+    struct.
+    """
+    returns, params, lets, global_lets = {}, {}, {}, {}
+    def add(found, structs):
+        for s in structs:
+            if s:
+                found.setdefault(s['name'], s)
+    for i in range(len(f)):
+        kind = f.item_type(i)
+        if kind not in ('FunctionDecl', 'LetDecl'):
+            continue
+        ast  = f.item(i)
+        node = ast.node(ast.root)
+        if kind == 'FunctionDecl':
+            add(returns, [return_struct(node)])
+            add(params, param_structs(node))
+            add(lets, let_structs(node))
         else:
-            params.append(f"{(annotate(vp,'ctype') or 'int')} {vp['value']}")
+            add(global_lets, [global_let_struct(node)])
+    return [s for found in (returns, params, lets, global_lets) for s in found.values()]
+
+def gen_indexed(f):
+    """
+    gen_program's layout for an IndexedASTFile, as a generator of lines.
+    Prototypes come from the file's signature table; the globals and then
+    the functions are decoded one item at a time and dropped once their C
+    is out, so memory stays flat in the size of the program. The structs
+    are gen_program's, in its order (see indexed_structs), followed by
+    the ones only the file's struct registry knows: the registry holds
+    every tuple struct the analyzer named, where gen_program only knows
+    the ones spelled out in a declaration.
+    """
+    struct_defs.clear()
+    seen = set()
+    for s in indexed_structs(f):
+        if s['name'] not in seen:
+            seen.add(s['name'])
+            struct_defs.append(s)
+    struct_defs.extend({'name': name, 'fields': [(elem_ctype(t), f"f{i}") for i, t in enumerate(elems)]}
+                       for name, elems in f.table('structs') if name not in seen)
+    yield from HEADERS
+    yield from gen_structs()
+    yield ""
+
+    for i in range(len(f)):
+        if f.item_type(i) == 'LetDecl':
+            ast  = f.item(i)
+            code = gen_global(ast.node(ast.root))
+            if code is not None:
+                yield code
+    yield ""
+
+    for sig in f.table('signatures'):
+        params = ', '.join(map(gen_param, sig['params']))
+        yield f"{gen_return_type(sig)} {sig['value']}({params});"
+    yield ""
+
+    for i in range(len(f)):
+        if f.item_type(i) == 'FunctionDecl':
+            ast = f.item(i)
+            yield from gen_function(ast.node(ast.root))
+            yield ""
 
-    # choose return type
-    if 'struct_name' in fn:
-        ret = annotate(fn, 'struct_name')
-    else:
-        ret = annotate(fn, 'return_ctype') or 'void'
 
-    header = f"{ret} {name}({', '.join(params)}) {{"
+def gen_function(fn):
+    """Generate the C function definition from a function declaration."""
+    # params carry no tuple‐out pointers
+    header = gen_signature(fn) + " {"
     footer = "}"
 
     stmts = []
@@ -638,16 +725,45 @@ def gen_expr(node):
     return ''
 
 if __name__ == '__main__':
+    # input: the semantic analyzer's syntax_tree.bin (an indexed AST file;
+    # a plain binary AST file also works), else the older syntax_tree.json
     base = os.path.dirname(os.path.realpath(__file__))
-    fname = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base, 'syntax_tree.json')
+    if len(sys.argv) > 1:
+        fname = sys.argv[1]
+    else:
+        fname = os.path.join(base, 'syntax_tree.bin')
+        if not os.path.exists(fname):
+            fname = os.path.join(base, 'syntax_tree.json')
     
     try:
-        ast = json.load(open(fname))
+        if is_indexed_ast_file(fname):
+            # the semantic analyzer's indexed file: one item in memory at a time
+            tree = IndexedASTFile(fname)
+            lines = gen_indexed(tree)
+        elif is_ast_file(fname):
+            ast = AST.load(fname)
+            lines = gen_program(ast.node(ast.root))
+        else:
+            ast = AST.from_dict(json.load(open(fname)))
+            lines = gen_program(ast.node(ast.root))
     except Exception as e:
         sys.exit(f"Cannot load {fname}: {e}")
-    
-    lines = gen_program(ast)
-    with open(os.path.join(base, 'output.c'), 'w', encoding='utf-8') as f:
-        f.write("\n".join(lines))
+
+    # gen_indexed decodes the items while the C is written, so a corrupt
+    # file can still fail here: write to a temporary file and only put it
+    # in place of output.c once all of it is out
+    out = os.path.join(base, 'output.c')
+    tmp = f"{out}.{os.getpid()}.tmp"
+    lines = iter(lines)
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(next(lines, ""))
+            for line in lines:
+                f.write("\n" + line)
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        sys.exit(f"Cannot load {fname}: {e}")
+    os.replace(tmp, out)
 
     print("Generated output.c")
@@ -1,6 +1,14 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto
+import mmap
+from operator import attrgetter
 import os
+import re
+import struct
 import sys
+import unicodedata
 
 class TokenType(Enum):
     # Keywords
@@ -66,12 +74,14 @@ class TokenType(Enum):
     T_EOF = auto()
 
 class Token:
-    def __init__(self, type_: TokenType, lexeme: str, literal=None, line: int = 0, column: int = 0):
+    def __init__(self, type_: TokenType, lexeme: str, literal=None, line: int = 0, column: int = 0,
+                 offset: int = None):
         self.type = type_
         self.lexeme = lexeme
         self.literal = literal
         self.line = line
         self.column = column
+        self.offset = offset    # index of the first character in the lexed source
 
     def __repr__(self):
         return f"Token({self.type.name}, '{self.lexeme}', {self.literal}, line={self.line}, col={self.column})"
@@ -79,17 +89,287 @@ class Token:
 class LexerError(Exception):
     pass
 
+# Characters pulled per read() when lexing from a stream (Lexer.iter_tokens)
+CHUNK_SIZE = 64 * 1024
+
+# Lexer.tokenize_parallel never cuts shards smaller than this
+MIN_SHARD_SIZE = 256 * 1024
+
+# The characters \w matches that cannot start an identifier: numerals that
+# are not letters (str.isnumeric() but not str.isalpha(), like '²' or
+# '٣'), as a regex class body. Digits are ASCII [0-9] only; the char
+# engine starts an identifier on str.isalpha() or '_', and TOKEN_RE on
+# \w minus these, so both reject '²' outside an identifier. Scanning all
+# of Unicode costs about 0.1 s, so the class is stored as ranges for
+# NUMERALS_UNICODE and only rebuilt (_numerals) under other Unicode data.
+NUMERALS_UNICODE = '14.0.0'
+NUMERALS = (
+    '\u0030-\u0039\u00b2-\u00b3\u00b9\u00bc-\u00be\u0660-\u0669'
+    '\u06f0-\u06f9\u07c0-\u07c9\u0966-\u096f\u09e6-\u09ef\u09f4-\u09f9'
+    '\u0a66-\u0a6f\u0ae6-\u0aef\u0b66-\u0b6f\u0b72-\u0b77\u0be6-\u0bf2'
+    '\u0c66-\u0c6f\u0c78-\u0c7e\u0ce6-\u0cef\u0d58-\u0d5e\u0d66-\u0d78'
+    '\u0de6-\u0def\u0e50-\u0e59\u0ed0-\u0ed9\u0f20-\u0f33\u1040-\u1049'
+    '\u1090-\u1099\u1369-\u137c\u16ee-\u16f0\u17e0-\u17e9\u17f0-\u17f9'
+    '\u1810-\u1819\u1946-\u194f\u19d0-\u19da\u1a80-\u1a89\u1a90-\u1a99'
+    '\u1b50-\u1b59\u1bb0-\u1bb9\u1c40-\u1c49\u1c50-\u1c59\u2070'
+    '\u2074-\u2079\u2080-\u2089\u2150-\u2182\u2185-\u2189\u2460-\u249b'
+    '\u24ea-\u24ff\u2776-\u2793\u2cfd\u3007\u3021-\u3029\u3038-\u303a'
+    '\u3192-\u3195\u3220-\u3229\u3248-\u324f\u3251-\u325f\u3280-\u3289'
+    '\u32b1-\u32bf\ua620-\ua629\ua6e6-\ua6ef\ua830-\ua835\ua8d0-\ua8d9'
+    '\ua900-\ua909\ua9d0-\ua9d9\ua9f0-\ua9f9\uaa50-\uaa59\uabf0-\uabf9'
+    '\uff10-\uff19\U00010107-\U00010133\U00010140-\U00010178'
+    '\U0001018a-\U0001018b\U000102e1-\U000102fb\U00010320-\U00010323'
+    '\U00010341\U0001034a\U000103d1-\U000103d5\U000104a0-\U000104a9'
+    '\U00010858-\U0001085f\U00010879-\U0001087f\U000108a7-\U000108af'
+    '\U000108fb-\U000108ff\U00010916-\U0001091b\U000109bc-\U000109bd'
+    '\U000109c0-\U000109cf\U000109d2-\U000109ff\U00010a40-\U00010a48'
+    '\U00010a7d-\U00010a7e\U00010a9d-\U00010a9f\U00010aeb-\U00010aef'
+    '\U00010b58-\U00010b5f\U00010b78-\U00010b7f\U00010ba9-\U00010baf'
+    '\U00010cfa-\U00010cff\U00010d30-\U00010d39\U00010e60-\U00010e7e'
+    '\U00010f1d-\U00010f26\U00010f51-\U00010f54\U00010fc5-\U00010fcb'
+    '\U00011052-\U0001106f\U000110f0-\U000110f9\U00011136-\U0001113f'
+    '\U000111d0-\U000111d9\U000111e1-\U000111f4\U000112f0-\U000112f9'
+    '\U00011450-\U00011459\U000114d0-\U000114d9\U00011650-\U00011659'
+    '\U000116c0-\U000116c9\U00011730-\U0001173b\U000118e0-\U000118f2'
+    '\U00011950-\U00011959\U00011c50-\U00011c6c\U00011d50-\U00011d59'
+    '\U00011da0-\U00011da9\U00011fc0-\U00011fd4\U00012400-\U0001246e'
+    '\U00016a60-\U00016a69\U00016ac0-\U00016ac9\U00016b50-\U00016b59'
+    '\U00016b5b-\U00016b61\U00016e80-\U00016e96\U0001d2e0-\U0001d2f3'
+    '\U0001d360-\U0001d378\U0001d7ce-\U0001d7ff\U0001e140-\U0001e149'
+    '\U0001e2f0-\U0001e2f9\U0001e8c7-\U0001e8cf\U0001e950-\U0001e959'
+    '\U0001ec71-\U0001ecab\U0001ecad-\U0001ecaf\U0001ecb1-\U0001ecb4'
+    '\U0001ed01-\U0001ed2d\U0001ed2f-\U0001ed3d\U0001f100-\U0001f10c'
+    '\U0001fbf0-\U0001fbf9'
+)
+
+def _numerals():
+    codes = [c for c in range(sys.maxunicode + 1)
+             if chr(c).isnumeric() and not chr(c).isalpha()]
+    body, i = [], 0
+    while i < len(codes):
+        j = i
+        while j + 1 < len(codes) and codes[j + 1] == codes[j] + 1:
+            j += 1
+        body.append(re.escape(chr(codes[i])) if i == j else
+                    f'{re.escape(chr(codes[i]))}-{re.escape(chr(codes[j]))}')
+        i = j + 1
+    return ''.join(body)
+
+if unicodedata.unidata_version != NUMERALS_UNICODE:
+    NUMERALS = _numerals()
+
 class SymbolTable:
     """
-    A simple symbol table to record identifiers with their positions.
+    Interned identifier pool. Each distinct name gets a dense integer id
+    (its index in `names`); the positions it occurs at are kept in one
+    pair of array('I') line/column columns per id. T_Id tokens carry the
+    id as their literal, so later stages can compare ints, not strings.
+    """
+    def __init__(self):
+        self.names = []         # id -> interned name
+        self.ids = {}           # name -> id
+        self.lines = []         # id -> array('I') of lines
+        self.columns = []       # id -> array('I') of columns
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        return name in self.ids
+
+    def intern(self, name: str) -> int:
+        """Id of `name`, allocating one (with empty columns) if it is new."""
+        sid = self.ids.get(name)
+        if sid is None:
+            sid = len(self.names)
+            name = sys.intern(name)
+            self.names.append(name)
+            self.ids[name] = sid
+            self.lines.append(array('I'))
+            self.columns.append(array('I'))
+        return sid
+
+    def add(self, name: str, position: tuple) -> int:
+        sid = self.intern(name)
+        self.lines[sid].append(position[0])
+        self.columns[sid].append(position[1])
+        return sid
+
+    def positions(self, sid: int) -> list:
+        return list(zip(self.lines[sid], self.columns[sid]))
+
+    def items(self):
+        """(name, positions) pairs in first-seen order."""
+        for sid, name in enumerate(self.names):
+            yield name, self.positions(sid)
+
+class CommentTable:
+    """
+    Side table for comments dropped by a trivia-free Lexer: offsets of
+    each comment in the lexed source plus its 1-based line and column,
+    kept in arrays instead of one Token per comment.
     """
     def __init__(self):
-        self.symbols = {}
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.columns = array('I')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start: int, end: int, line: int, column: int):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def text(self, source, i: int):
+        """Comment i sliced out of the source it was lexed from."""
+        return source[self.starts[i]:self.ends[i]]
+
+class BufferToken:
+    """
+    Flyweight view of one TokenBuffer entry. It quacks like the parser's
+    Token (type name, lexeme, line, col) but only holds the buffer and an
+    index; lexeme and position are computed when they are read.
+    """
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer, index: int):
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def type(self):
+        return TokenBuffer.KIND_NAMES[self.buffer.kinds[self.index]]
+
+    @property
+    def lexeme(self):
+        return self.buffer.lexeme(self.index)
+
+    @property
+    def line(self):
+        return self.buffer.position(self.index)[0]
+
+    @property
+    def col(self):
+        return self.buffer.position(self.index)[1]
+
+    column = col
+
+    @property
+    def symbol_id(self):
+        return self.buffer.symbol_id(self.index)
+
+    def __repr__(self):
+        return repr(self.buffer.token(self.index))
 
-    def add(self, name: str, position: tuple):
-        if name not in self.symbols:
-            self.symbols[name] = {'name': name, 'positions': []}
-        self.symbols[name]['positions'].append(position)
+class TokenBuffer:
+    """
+    Struct-of-arrays token storage: per token one kind byte (TokenType
+    value) and start/end offsets into the source. Lexemes are sliced from
+    the source on demand, and line/column are found by bisecting a
+    line-start index that is only built the first time a position is
+    asked for.
+    """
+    KIND_NAMES = (None,) + tuple(t.name for t in TokenType)   # TokenType values start at 1
+
+    def __init__(self, source):
+        # source is a str, or a bytes-like object (bytes, mmap) of UTF-8
+        # text, in which case offsets are byte offsets and lexemes and
+        # columns are decoded only when asked for
+        self.source = source
+        self.is_bytes = not isinstance(source, str)
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self._line_starts = None
+        # SymbolTable the identifiers were added to, if any (see symbol_id)
+        self.symbols = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [BufferToken(self, j) for j in range(*i.indices(len(self.kinds)))]
+        if i < 0:
+            i += len(self.kinds)
+        if not 0 <= i < len(self.kinds):
+            raise IndexError('token index out of range')
+        return BufferToken(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield BufferToken(self, i)
+
+    def append(self, kind: TokenType, start: int, end: int):
+        self.kinds.append(kind.value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def kind(self, i: int) -> TokenType:
+        return TokenType(self.kinds[i])
+
+    def lexeme(self, i: int) -> str:
+        if self.is_bytes:
+            return self._decode(self.starts[i], self.ends[i])
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def _decode(self, start: int, end: int) -> str:
+        with memoryview(self.source) as view:
+            return str(view[start:end], 'utf-8')
+
+    def symbol_id(self, i: int):
+        """SymbolTable id of T_Id token i, or None."""
+        if self.symbols is None or self.kinds[i] != TokenType.T_Id.value:
+            return None
+        return self.symbols.ids.get(self.lexeme(i))
+
+    def position(self, i: int) -> tuple:
+        """(line, column) of token i, both 1-based like Token."""
+        return self.locate(self.starts[i])
+
+    def locate(self, offset: int) -> tuple:
+        """(line, column) of a source offset."""
+        if self._line_starts is None:
+            self._line_starts = self._index_lines()
+        line = bisect_right(self._line_starts, offset)
+        line_start = self._line_starts[line - 1]
+        if self.is_bytes:
+            # columns count characters, so decode just this line's prefix
+            return line, len(self._decode(line_start, offset)) + 1
+        return line, offset - line_start + 1
+
+    def _index_lines(self):
+        source = self.source
+        newline = b'\n' if self.is_bytes else '\n'
+        starts = array('I', [0])
+        nl = source.find(newline)
+        while nl != -1:
+            starts.append(nl + 1)
+            nl = source.find(newline, nl + 1)
+        return starts
+
+    def close(self):
+        """Release the source if it is a mapped file (see lex_file)."""
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+
+    def token(self, i: int) -> Token:
+        """Materialize token i as a full Token (for diagnostics and dumps)."""
+        kind = self.kind(i)
+        lexeme = self.lexeme(i)
+        literal = None
+        if kind is TokenType.T_Decimal:
+            literal = int(lexeme)
+        elif kind is TokenType.T_Hexadecimal:
+            literal = int(lexeme, 16)
+        elif kind is TokenType.T_Id:
+            literal = self.symbol_id(i)
+        line, col = self.position(i)
+        return Token(kind, lexeme, literal, line, col, self.starts[i])
 
 class Lexer:
     KEYWORDS = {
@@ -140,13 +420,50 @@ class Lexer:
         ']': TokenType.T_RB,
     }
 
-    def __init__(self, text: str, symbol_table: SymbolTable = None):
+    # Scanning engines accepted by Lexer(engine=...):
+    #   'char'  - the original character-at-a-time scanner (advance/peek)
+    #   'regex' - a single compiled alternation driven by re.match
+    ENGINES = ('char', 'regex')
+
+    # Master pattern for the regex engine. Group names are the TokenType
+    # names they produce, except OP (looked up in TWO_CHAR_TOKENS /
+    # SINGLE_CHAR_TOKENS) and T_Id (looked up in KEYWORDS). Alternatives are
+    # ordered exactly like the branches of the char engine so both engines
+    # make the same maximal-munch decisions. The string rule is written as
+    # an unrolled loop so re does not keep a backtrack frame per character.
+    TOKEN_RE = re.compile('|'.join([
+        r'(?P<T_Whitespace>\s+)',
+        r'(?P<T_Comment>//[^\n]*\n?)',
+        r'(?P<T_Print>println!)',
+        rf'(?P<T_Id>(?:[A-Za-z_]|[^\W{NUMERALS}])\w*)',
+        r'(?P<T_Hexadecimal>0[xX][0-9a-fA-F]+)',
+        r'(?P<T_Decimal>(?!0[xX])[0-9]+)',
+        r'(?P<T_String>"[^"\\]*(?:\\.[^"\\]*)*")',
+        '(?P<OP>' + '|'.join(
+            [re.escape(op) for op in TWO_CHAR_TOKENS] +
+            [re.escape(op) for op in SINGLE_CHAR_TOKENS]) + ')',
+    ]), re.DOTALL)
+
+    # TokenType values for the TokenBuffer scanners
+    OPERATOR_KINDS = {op: tt.value for op, tt in {**SINGLE_CHAR_TOKENS, **TWO_CHAR_TOKENS}.items()}
+    GROUP_KINDS = {name: TokenType[name].value for name in
+                   ('T_Whitespace', 'T_Comment', 'T_Print', 'T_Hexadecimal', 'T_Decimal', 'T_String')}
+
+    def __init__(self, text: str = '', symbol_table: SymbolTable = None, engine: str = 'char',
+                 skip_trivia: bool = False, comments: CommentTable = None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown lexer engine '{engine}', expected one of {self.ENGINES}")
         self.text = text
         self.pos = 0
         self.current_char = self.text[self.pos] if self.text else None
         self.line = 1
         self.column = 1
         self.symbol_table = symbol_table
+        self.engine = engine
+        # trivia-free mode: whitespace and comments are consumed but not
+        # emitted; comment spans go to `comments` if one is given
+        self.skip_trivia = skip_trivia
+        self.comments = comments
 
     def advance(self):
         if self.current_char == '\n':
@@ -161,46 +478,417 @@ class Lexer:
         return self.text[peek_pos] if peek_pos < len(self.text) else None
 
     def tokenize(self):
-        tokens = []
+        return list(self.iter_tokens())
+
+    def iter_tokens(self, stream=None, chunk_size: int = CHUNK_SIZE):
+        """
+        Yield tokens lazily, ending with T_EOF.
+
+        With a text `stream` (anything with .read(n), e.g. an open file)
+        the source is pulled chunk_size characters at a time instead of
+        coming from self.text, so memory stays bounded by one chunk plus
+        the longest token. Streaming always uses the regex scanner.
+        """
+        if stream is not None:
+            return self._scan_regex(stream.read, chunk_size)
+        if self.engine == 'regex':
+            return self._scan_regex()
+        return self._scan_chars()
+
+    def tokenize_regex(self):
+        return list(self._scan_regex())
+
+    def relex(self, tokens: list, offset: int, removed: int, inserted: str) -> tuple:
+        """
+        Update `tokens` (a full token list of self.text, with offsets) for
+        the edit that replaces text[offset:offset+removed] with `inserted`.
+
+        Scanning restarts at the last token that begins before the edit,
+        since the edit may extend it ('-' + '>', 'println' + '!', an
+        opened or closed string). The lexer keeps no state besides the
+        position, so as soon as a new token starts exactly where an old
+        token starts in the unchanged suffix, the rest of the old stream is
+        still valid. The unchanged tokens are reused with their offsets and
+        lines shifted, and their columns too on the line where the edit
+        ends.
+
+        self.text becomes the edited text and `tokens` is updated in place.
+        The symbol table and comment table are not touched. Returns (first, stop), the index
+        range of the relexed tokens in the updated list.
+        """
+        old_text = self.text
+        if offset < 0 or removed < 0 or offset + removed > len(old_text):
+            raise ValueError(f"Edit ({offset}, {removed}) is outside the {len(old_text)}-character text")
+        delta = len(inserted) - removed
+        resume = offset + len(inserted)     # first unchanged character in the new text
+
+        first = bisect_left(tokens, offset, key=attrgetter('offset')) - 1
+        if first < 0:
+            # nothing before the edit (trivia-free lists may not start at 0)
+            first = 0
+            restart = (0, 1, 1)
+        else:
+            start = tokens[first]
+            restart = (start.offset, start.line, start.column)
+
+        self.text = old_text[:offset] + inserted + old_text[offset + removed:]
+        self.pos, self.line, self.column = restart
+        symtab, self.symbol_table = self.symbol_table, None
+        comments, self.comments = self.comments, None
+        fresh = []
+        j = first
+        resync = None
+        try:
+            for tok in self._scan_regex():
+                if tok.offset >= resume:
+                    old_offset = tok.offset - delta
+                    while j < len(tokens) and tokens[j].offset < old_offset:
+                        j += 1
+                    if j < len(tokens) and tokens[j].offset == old_offset:
+                        resync = tok
+                        break
+                fresh.append(tok)
+        except Exception:
+            self.text = old_text
+            raise
+        finally:
+            self.symbol_table = symtab
+            self.comments = comments
+
+        if resync is None:
+            j = len(tokens)     # relexed through EOF, nothing to reuse
+        else:
+            line_delta = resync.line - tokens[j].line
+            col_delta = resync.column - tokens[j].column
+            edit_line = tokens[j].line
+            for k in range(j, len(tokens)):
+                tok = tokens[k]
+                if tok.line == edit_line:
+                    tok.column += col_delta
+                elif not (delta or line_delta):
+                    break       # offsets and later lines are unchanged
+                tok.offset += delta
+                tok.line += line_delta
+            self.pos, self.line, self.column = len(self.text), tokens[-1].line, tokens[-1].column
+        tokens[first:j] = fresh
+        return first, first + len(fresh)
+
+    @classmethod
+    def _scan_span(cls, text: str, pos: int, skip_trivia: bool, kinds, starts, ends,
+                   ids: list, comment_spans: list):
+        """
+        The TOKEN_RE loop behind tokenize_buffer: append kind/start/end of
+        every token from `pos` until nothing matches, the index of each
+        T_Id to `ids` and, when trivia is skipped, (start, end) of each
+        comment to `comment_spans`. Returns (stop, start of last match).
+        """
+        keywords = cls.KEYWORDS
+        operators = cls.OPERATOR_KINDS
+        group_kinds = cls.GROUP_KINDS
+        trivia = ('T_Whitespace', 'T_Comment') if skip_trivia else ()
+        T_Id = TokenType.T_Id.value
+        last = pos
+        for m in iter(cls.TOKEN_RE.scanner(text, pos).match, None):
+            last = pos
+            kind = m.lastgroup
+            end = m.end()
+            if kind == 'OP':
+                kinds.append(operators[text[pos:end]])
+            elif kind == 'T_Id':
+                tok_type = keywords.get(text[pos:end])
+                if tok_type is None:
+                    ids.append(len(kinds))
+                    kinds.append(T_Id)
+                else:
+                    kinds.append(tok_type.value)
+            elif kind in trivia:
+                if kind == 'T_Comment':
+                    comment_spans.append((pos, end))
+                pos = end
+                continue
+            else:
+                kinds.append(group_kinds[kind])
+            starts.append(pos)
+            ends.append(end)
+            pos = end
+        return pos, last
+
+    def tokenize_buffer(self, skip_trivia: bool = None) -> TokenBuffer:
+        """
+        Scan self.text with TOKEN_RE straight into a TokenBuffer, without
+        creating a Token object or copying a lexeme per token. With
+        skip_trivia (default: the lexer's mode), whitespace and comment
+        tokens are left out, which is what the parser wants.
+        """
+        if skip_trivia is None:
+            skip_trivia = self.skip_trivia
+        text = self.text
+        buf = TokenBuffer(text)
+        ids = []
+        comment_spans = []
+        pos = self._scan_span(text, self.pos, skip_trivia, buf.kinds, buf.starts, buf.ends,
+                              ids, comment_spans)[0]
+        return self._finish_buffer(buf, pos, ids, comment_spans, skip_trivia)
+
+    def tokenize_parallel(self, workers: int = None, skip_trivia: bool = None) -> TokenBuffer:
+        """
+        tokenize_buffer for large sources, lexing newline-aligned shards in
+        a process pool. Shards are lexed as if each started a token; the
+        merge walks them in order and, where the real token stream does not
+        land on a shard's start (the cut fell inside a string, a comment or
+        a whitespace run, or the previous shard stopped early), relexes
+        from the real boundary until it reaches a token start the shard
+        also has. TOKEN_RE keeps no state between tokens, so the rest of
+        that shard is exact from there. Offsets are made global in the
+        workers and lines/columns come from the merged buffer, so the
+        result equals tokenize_buffer() token for token.
+        """
+        if skip_trivia is None:
+            skip_trivia = self.skip_trivia
+        text = self.text
+        workers = workers or os.cpu_count() or 1
+        shard_size = max(MIN_SHARD_SIZE, -(-(len(text) - self.pos) // workers))
+        cuts = [self.pos]
+        while len(text) - cuts[-1] > shard_size:
+            nl = text.find('\n', cuts[-1] + shard_size)
+            if nl == -1 or nl + 1 == len(text):
+                break
+            cuts.append(nl + 1)
+        if len(cuts) == 1:
+            return self.tokenize_buffer(skip_trivia)
+        cuts.append(len(text))
+
+        jobs = [(text[a:b], a, b == len(text), skip_trivia) for a, b in zip(cuts, cuts[1:])]
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            shards = list(pool.map(_lex_shard, jobs))
+
+        buf = TokenBuffer(text)
+        kinds, starts, ends = buf.kinds, buf.starts, buf.ends
+        ids = []
+        comment_spans = []
+        trivia = ('T_Whitespace', 'T_Comment') if skip_trivia else ()
+        pos = self.pos
+        for (s_kinds, s_starts, s_ends, s_ids, s_comments, stop), begin in zip(shards, cuts):
+            first = 0                       # shard tokens are exact from here
+            if pos != begin:
+                first = None
+                scanner = self.TOKEN_RE.scanner(text, pos)
+                for m in iter(scanner.match, None):
+                    start = m.start()
+                    if start >= stop:
+                        break               # ran past the shard: nothing to reuse
+                    if start >= begin:
+                        k = bisect_left(s_starts, start)
+                        if k < len(s_starts) and s_starts[k] == start:
+                            first = k
+                            break
+                    if m.lastgroup in trivia:
+                        if m.lastgroup == 'T_Comment':
+                            comment_spans.append((start, m.end()))
+                    else:
+                        self._append_match(m, kinds, starts, ends, ids)
+                    pos = m.end()
+                if first is None:
+                    continue
+                begin = s_starts[first]
+            base = len(kinds) - first
+            kinds.extend(s_kinds[first:])
+            starts.extend(s_starts[first:])
+            ends.extend(s_ends[first:])
+            ids.extend(i + base for i in s_ids if i >= first)
+            comment_spans.extend(span for span in s_comments if span[0] >= begin)
+            pos = stop
+        pos = self._scan_span(text, pos, skip_trivia, kinds, starts, ends, ids, comment_spans)[0]
+        return self._finish_buffer(buf, pos, ids, comment_spans, skip_trivia)
+
+    @classmethod
+    def _append_match(cls, m, kinds, starts, ends, ids: list):
+        """Append one non-trivia TOKEN_RE match, as _scan_span would."""
+        kind = m.lastgroup
+        lexeme = m.group()
+        if kind == 'OP':
+            kinds.append(cls.OPERATOR_KINDS[lexeme])
+        elif kind == 'T_Id':
+            tok_type = cls.KEYWORDS.get(lexeme)
+            if tok_type is None:
+                ids.append(len(kinds))
+                kinds.append(TokenType.T_Id.value)
+            else:
+                kinds.append(tok_type.value)
+        else:
+            kinds.append(cls.GROUP_KINDS[kind])
+        starts.append(m.start())
+        ends.append(m.end())
+
+    def _finish_buffer(self, buf: TokenBuffer, pos: int, ids: list, comment_spans: list,
+                       skip_trivia: bool) -> TokenBuffer:
+        """Raise for an unmatched position, else append EOF and fill the side tables."""
+        text = self.text
+        self.pos = pos
+        if pos < len(text):
+            line = text.count('\n', 0, pos) + 1
+            col = pos - text.rfind('\n', 0, pos)
+            if text[pos] == '"':
+                raise LexerError(f"Unterminated string literal at line {line}, column {col}")
+            if text.startswith(('0x', '0X'), pos):
+                raise LexerError(f"Hexadecimal literal '{text[pos:pos + 2]}' without digits at line {line}, column {col}")
+            raise LexerError(f"Unknown character '{text[pos]}' at line {line}, column {col}")
+        buf.append(TokenType.T_EOF, pos, pos)
+        self.current_char = None
+        if self.symbol_table is not None:
+            buf.symbols = self.symbol_table
+            for i in ids:
+                self.symbol_table.add(buf.lexeme(i), buf.position(i))
+        if self.comments is not None:
+            if not skip_trivia:
+                comment_spans = [(buf.starts[i], buf.ends[i]) for i in range(len(buf))
+                                 if buf.kinds[i] == TokenType.T_Comment.value]
+            for start, end in comment_spans:
+                self.comments.add(start, end, *buf.locate(start))
+        return buf
+
+    def _scan_chars(self):
+        skip_trivia, comments = self.skip_trivia, self.comments
         while self.current_char is not None:
             if self.current_char.isspace():
-                tokens.append(self.collect_whitespace())
+                tok = self.collect_whitespace()
+                if not skip_trivia:
+                    yield tok
             elif self.current_char == '/' and self.peek() == '/':
-                tokens.append(self.collect_comment())
+                tok = self.collect_comment()
+                if comments is not None:
+                    comments.add(tok.offset, self.pos, tok.line, tok.column)
+                if not skip_trivia:
+                    yield tok
             elif self.current_char.isalpha() or self.current_char == '_':
-                tokens.append(self.collect_identifier())
-            elif self.current_char.isdigit():
-                tokens.append(self.collect_number())
+                yield self.collect_identifier()
+            elif self.current_char.isascii() and self.current_char.isdigit():
+                yield self.collect_number()
             elif self.current_char == '"':
-                tokens.append(self.collect_string())
+                yield self.collect_string()
             else:
                 two = self.current_char + (self.peek() or '')
                 if two in self.TWO_CHAR_TOKENS:
                     tt = self.TWO_CHAR_TOKENS[two]
-                    start_line, start_col = self.line, self.column
+                    start, start_line, start_col = self.pos, self.line, self.column
                     self.advance(); self.advance()
-                    tokens.append(Token(tt, two, None, start_line, start_col))
+                    yield Token(tt, two, None, start_line, start_col, start)
                 elif self.current_char in self.SINGLE_CHAR_TOKENS:
                     tt = self.SINGLE_CHAR_TOKENS[self.current_char]
                     lex = self.current_char
-                    start_line, start_col = self.line, self.column
+                    start, start_line, start_col = self.pos, self.line, self.column
                     self.advance()
-                    tokens.append(Token(tt, lex, None, start_line, start_col))
+                    yield Token(tt, lex, None, start_line, start_col, start)
                 else:
                     raise LexerError(f"Unknown character '{self.current_char}' at line {self.line}, column {self.column}")
-        tokens.append(Token(TokenType.T_EOF, '', None, self.line, self.column))
-        return tokens
+        yield Token(TokenType.T_EOF, '', None, self.line, self.column, self.pos)
+
+    def _scan_regex(self, read=None, chunk_size: int = CHUNK_SIZE):
+        """
+        Same token stream as the char engine, but each lexeme is found by a
+        single TOKEN_RE match instead of growing it one character at a time.
+        Line/column bookkeeping only looks inside the token kinds that can
+        span lines (whitespace, comments, strings).
+
+        With `read`, the scan runs over a sliding buffer refilled from
+        read(n). A match that reaches the end of the buffer may still grow
+        (a string or comment split across chunks, '-' before '>', 'println'
+        before '!'), and so may a failed one at a '"' (a string not closed
+        yet), at the last character ('&' before '&') or at a '0x' ending the
+        buffer (its digits not read yet); then the buffer is
+        refilled and the same position is matched again. Any other failed
+        match is an unknown character, reported without reading further.
+        Each refill at least doubles the pending tail, so a token spanning
+        many chunks is rescanned O(1) times.
+        """
+        keywords = self.KEYWORDS
+        operators = {**self.SINGLE_CHAR_TOKENS, **self.TWO_CHAR_TOKENS}
+        symtab = self.symbol_table
+        comments = self.comments
+        match = self.TOKEN_RE.match
+        T_Id = TokenType.T_Id
+        T_Decimal = TokenType.T_Decimal
+        T_Hexadecimal = TokenType.T_Hexadecimal
+        multiline = {'T_Whitespace': TokenType.T_Whitespace,
+                     'T_Comment': TokenType.T_Comment,
+                     'T_String': TokenType.T_String}
+        trivia = ('T_Whitespace', 'T_Comment') if self.skip_trivia else ()
+
+        if read is None:
+            buf, pos, base, eof = self.text, self.pos, 0, True
+        else:
+            buf, pos, base, eof = '', 0, self.pos, False
+        end = len(buf)
+        line = self.line
+        line_start = base + pos - self.column + 1   # absolute offset of column 1
+        while True:
+            m = match(buf, pos)
+            if m is None or (not eof and m.end() == end):
+                if eof or (m is None and pos + 1 < end and buf[pos] != '"' and
+                           not (pos + 2 == end and buf[pos] == '0')):
+                    break
+                chunk = read(max(chunk_size, end - pos))
+                if not chunk:
+                    eof = True
+                    if pos == end:
+                        break
+                    continue
+                base += pos
+                buf = buf[pos:] + chunk
+                pos = 0
+                end = len(buf)
+                continue
+            kind = m.lastgroup
+            lexeme = m.group()
+            col = base + pos - line_start + 1
+            if kind == 'OP':
+                yield Token(operators[lexeme], lexeme, None, line, col, base + pos)
+            elif kind == 'T_Id':
+                tok_type = keywords.get(lexeme, T_Id)
+                sid = None
+                if tok_type is T_Id and symtab is not None:
+                    sid = symtab.add(lexeme, (line, col))
+                yield Token(tok_type, lexeme, sid, line, col, base + pos)
+            elif kind in multiline:
+                if kind == 'T_Comment' and comments is not None:
+                    comments.add(base + pos, base + m.end(), line, col)
+                if kind not in trivia:
+                    yield Token(multiline[kind], lexeme, None, line, col, base + pos)
+                newlines = lexeme.count('\n')
+                if newlines:
+                    line += newlines
+                    line_start = base + pos + lexeme.rindex('\n') + 1
+            elif kind == 'T_Decimal':
+                yield Token(T_Decimal, lexeme, int(lexeme), line, col, base + pos)
+            elif kind == 'T_Hexadecimal':
+                yield Token(T_Hexadecimal, lexeme, int(lexeme, 16), line, col, base + pos)
+            else:
+                yield Token(TokenType.T_Print, lexeme, None, line, col, base + pos)
+            pos = m.end()
+
+        col = base + pos - line_start + 1
+        if pos < end:
+            if buf[pos] == '"':
+                raise LexerError(f"Unterminated string literal at line {line}, column {col}")
+            if buf.startswith(('0x', '0X'), pos):
+                raise LexerError(f"Hexadecimal literal '{buf[pos:pos + 2]}' without digits at line {line}, column {col}")
+            raise LexerError(f"Unknown character '{buf[pos]}' at line {line}, column {col}")
+        self.pos = base + pos
+        self.line = line
+        self.column = col
+        self.current_char = None
+        yield Token(TokenType.T_EOF, '', None, line, col, base + pos)
 
     def collect_whitespace(self):
-        start_line, start_col = self.line, self.column
+        start, start_line, start_col = self.pos, self.line, self.column
         lexeme = ''
         while self.current_char is not None and self.current_char.isspace():
             lexeme += self.current_char
             self.advance()
-        return Token(TokenType.T_Whitespace, lexeme, None, start_line, start_col)
+        return Token(TokenType.T_Whitespace, lexeme, None, start_line, start_col, start)
 
     def collect_comment(self):
-        start_line, start_col = self.line, self.column
+        start, start_line, start_col = self.pos, self.line, self.column
         lexeme = ''
         lexeme += self.current_char; self.advance()
         lexeme += self.current_char; self.advance()
@@ -208,25 +896,27 @@ class Lexer:
             lexeme += self.current_char; self.advance()
         if self.current_char == '\n':
             lexeme += self.current_char; self.advance()
-        return Token(TokenType.T_Comment, lexeme, None, start_line, start_col)
+        return Token(TokenType.T_Comment, lexeme, None, start_line, start_col, start)
 
     def collect_number(self):
-        start_line, start_col = self.line, self.column
+        start, start_line, start_col = self.pos, self.line, self.column
         lexeme = ''
         if self.current_char == '0' and self.peek() in ('x', 'X'):
             lexeme += self.current_char; self.advance()
             lexeme += self.current_char; self.advance()
-            while self.current_char is not None and (self.current_char.isdigit() or self.current_char.lower() in 'abcdef'):
+            while self.current_char is not None and self.current_char.isascii() and (self.current_char.isdigit() or self.current_char.lower() in 'abcdef'):
                 lexeme += self.current_char; self.advance()
+            if len(lexeme) == 2:
+                raise LexerError(f"Hexadecimal literal '{lexeme}' without digits at line {start_line}, column {start_col}")
             value = int(lexeme, 16)
-            return Token(TokenType.T_Hexadecimal, lexeme, value, start_line, start_col)
-        while self.current_char is not None and self.current_char.isdigit():
+            return Token(TokenType.T_Hexadecimal, lexeme, value, start_line, start_col, start)
+        while self.current_char is not None and self.current_char.isascii() and self.current_char.isdigit():
             lexeme += self.current_char; self.advance()
         value = int(lexeme)
-        return Token(TokenType.T_Decimal, lexeme, value, start_line, start_col)
+        return Token(TokenType.T_Decimal, lexeme, value, start_line, start_col, start)
 
     def collect_string(self):
-        start_line, start_col = self.line, self.column
+        start, start_line, start_col = self.pos, self.line, self.column
         lexeme = ''
         lexeme += self.current_char; self.advance()
         while self.current_char is not None and self.current_char != '"':
@@ -240,10 +930,10 @@ class Lexer:
             lexeme += self.current_char; self.advance()
         else:
             raise LexerError(f"Unterminated string literal at line {start_line}, column {start_col}")
-        return Token(TokenType.T_String, lexeme, None, start_line, start_col)
+        return Token(TokenType.T_String, lexeme, None, start_line, start_col, start)
 
     def collect_identifier(self):
-        start_line, start_col = self.line, self.column
+        start, start_line, start_col = self.pos, self.line, self.column
         lexeme = ''
         while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
             lexeme += self.current_char; self.advance()
@@ -255,8 +945,328 @@ class Lexer:
         else:
             tok_type = TokenType.T_Id
             if self.symbol_table is not None:
-                self.symbol_table.add(lexeme, (start_line, start_col))
-        return Token(tok_type, lexeme, None, start_line, start_col)
+                sid = self.symbol_table.add(lexeme, (start_line, start_col))
+                return Token(tok_type, lexeme, sid, start_line, start_col, start)
+        return Token(tok_type, lexeme, None, start_line, start_col, start)
+
+def _lex_shard(job):
+    """
+    Process-pool worker for Lexer.tokenize_parallel: lex one shard as if a
+    token started at its first character. Unless it is the last shard, the
+    final token is dropped (it may continue into the next shard) and the
+    shard stops at its start. Returns the shard's kind/start/end columns,
+    T_Id indices and comment spans, with offsets made global, and the
+    offset it stopped at.
+    """
+    text, base, final, skip_trivia = job
+    kinds, starts, ends = array('B'), array('I'), array('I')
+    ids, comment_spans = [], []
+    stop, last = Lexer._scan_span(text, 0, skip_trivia, kinds, starts, ends, ids, comment_spans)
+    if stop == len(text) and not final:
+        if starts and starts[-1] == last:
+            del kinds[-1], starts[-1], ends[-1]
+            if ids and ids[-1] == len(kinds):
+                ids.pop()
+        if comment_spans and comment_spans[-1][0] == last:
+            comment_spans.pop()
+        stop = last
+    if base:
+        starts = array('I', [x + base for x in starts])
+        ends = array('I', [x + base for x in ends])
+        comment_spans = [(a + base, b + base) for a, b in comment_spans]
+    return kinds, starts, ends, ids, comment_spans, stop + base
+
+class BytesLexer:
+    """
+    Lexer over UTF-8 bytes (bytes or an mmap) that fills a TokenBuffer of
+    byte offsets without decoding the source. Each token is dispatched on
+    a 256-entry class table for its first byte and matched by a small
+    per-class bytes pattern. Only non-ASCII text outside strings and
+    comments (Unicode identifiers, digits or spaces) takes a slow path that
+    decodes a short window and matches it with Lexer.TOKEN_RE, so the
+    token stream is the same as Lexer's for the same characters.
+
+    The bytes are lexed as stored: unlike a text-mode read, '\\r\\n' is
+    not translated, so it shows up inside whitespace and comment lexemes.
+    """
+    # first-byte classes
+    C_BAD, C_SPACE, C_IDENT, C_DIGIT, C_SLASH, C_QUOTE, C_OP, C_NONASCII = range(8)
+
+    @staticmethod
+    def _first_byte_classes():
+        op_starts = set(Lexer.SINGLE_CHAR_TOKENS) | {op[0] for op in Lexer.TWO_CHAR_TOKENS}
+        classes = bytearray(256)
+        for b in range(256):
+            c = chr(b)
+            if b >= 0x80:
+                classes[b] = BytesLexer.C_NONASCII
+            elif c.isspace():
+                classes[b] = BytesLexer.C_SPACE
+            elif c.isalpha() or c == '_':
+                classes[b] = BytesLexer.C_IDENT
+            elif c.isdigit():
+                classes[b] = BytesLexer.C_DIGIT
+            elif c == '/':
+                classes[b] = BytesLexer.C_SLASH
+            elif c == '"':
+                classes[b] = BytesLexer.C_QUOTE
+            elif c in op_starts:
+                classes[b] = BytesLexer.C_OP
+        return classes
+
+    # every character str.isspace() accepts, as UTF-8 alternatives
+    SPACES = ('\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004'
+              '\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000')
+    SPACE_RE = re.compile(b'(?:' + b'|'.join(re.escape(c.encode('utf-8')) for c in SPACES) + b')+')
+    IDENT_RE = re.compile(rb'[A-Za-z_][A-Za-z0-9_]*')
+    DECIMAL_RE = re.compile(rb'[0-9]+')
+    HEX_RE = re.compile(rb'0[xX][0-9a-fA-F]*')
+    COMMENT_RE = re.compile(rb'//[^\n]*\n?')
+    STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+    WORD_RUN_RE = re.compile(rb'[A-Za-z0-9_\x80-\xff]*')
+
+    KEYWORDS = {k.encode('ascii'): v.value for k, v in Lexer.KEYWORDS.items()}
+    TWO_CHAR_TOKENS = {k.encode('ascii'): v.value for k, v in Lexer.TWO_CHAR_TOKENS.items()}
+    SINGLE_CHAR_TOKENS = {ord(k): v.value for k, v in Lexer.SINGLE_CHAR_TOKENS.items()}
+
+    def __init__(self, data, symbol_table: SymbolTable = None, comments: CommentTable = None):
+        self.data = data
+        self.symbol_table = symbol_table
+        self.comments = comments
+
+    def tokenize_buffer(self, skip_trivia: bool = False) -> TokenBuffer:
+        data = self.data
+        end = len(data)
+        buf = TokenBuffer(data)
+        kinds, starts, ends = buf.kinds, buf.starts, buf.ends
+        classes = self.CLASSES
+        space = self.SPACE_RE.match
+        ident = self.IDENT_RE.match
+        keywords = self.KEYWORDS
+        two_char = self.TWO_CHAR_TOKENS
+        single_char = self.SINGLE_CHAR_TOKENS
+        T_Whitespace = TokenType.T_Whitespace.value
+        T_Comment = TokenType.T_Comment.value
+        T_Id = TokenType.T_Id.value
+        T_Print = TokenType.T_Print.value
+        T_Decimal = TokenType.T_Decimal.value
+        T_Hexadecimal = TokenType.T_Hexadecimal.value
+        T_String = TokenType.T_String.value
+        C_SPACE, C_IDENT, C_DIGIT, C_SLASH, C_QUOTE, C_OP, C_NONASCII = range(1, 8)
+        ids = []
+        comment_spans = []
+
+        pos = 0
+        while pos < end:
+            cls = classes[data[pos]]
+            if cls == C_SPACE:
+                stop = space(data, pos).end()
+                kind = T_Whitespace
+            elif cls == C_IDENT:
+                stop = ident(data, pos).end()
+                if stop < end and data[stop] >= 0x80:
+                    kind, stop = self._slow_token(pos)
+                else:
+                    word = data[pos:stop]
+                    kind = keywords.get(word, T_Id)
+                    if kind == T_Print and word == b'println' and stop < end and data[stop] == 0x21:
+                        stop += 1      # println!
+            elif cls == C_OP:
+                two = data[pos:pos + 2]
+                kind = two_char.get(two)
+                if kind is None:
+                    kind = single_char.get(data[pos])
+                    if kind is None:
+                        self._unknown(pos)      # lone '&' or '|'
+                    stop = pos + 1
+                else:
+                    stop = pos + 2
+            elif cls == C_DIGIT:
+                if data[pos] == 0x30 and pos + 1 < end and data[pos + 1] in b'xX':
+                    stop = self.HEX_RE.match(data, pos).end()
+                    kind = T_Hexadecimal
+                    if stop == pos + 2:
+                        self._unknown(pos)      # bare '0x'
+                else:
+                    stop = self.DECIMAL_RE.match(data, pos).end()
+                    kind = T_Decimal
+                if stop < end and data[stop] >= 0x80:
+                    kind, stop = self._slow_token(pos)
+            elif cls == C_SLASH:
+                if pos + 1 < end and data[pos + 1] == 0x2F:
+                    stop = self.COMMENT_RE.match(data, pos).end()
+                    kind = T_Comment
+                else:
+                    stop = pos + 1
+                    kind = single_char[0x2F]
+            elif cls == C_QUOTE:
+                m = self.STRING_RE.match(data, pos)
+                if m is None:
+                    line, col = self._locate(pos)
+                    raise LexerError(f"Unterminated string literal at line {line}, column {col}")
+                stop = m.end()
+                kind = T_String
+            elif cls == C_NONASCII:
+                m = space(data, pos)
+                if m is not None:
+                    stop = m.end()
+                    kind = T_Whitespace
+                else:
+                    kind, stop = self._slow_token(pos)
+            else:
+                self._unknown(pos)
+
+            if kind == T_Id:
+                ids.append(len(kinds))
+            elif kind == T_Comment:
+                comment_spans.append((pos, stop))
+                if skip_trivia:
+                    pos = stop
+                    continue
+            elif skip_trivia and kind == T_Whitespace:
+                pos = stop
+                continue
+            kinds.append(kind)
+            starts.append(pos)
+            ends.append(stop)
+            pos = stop
+
+        buf.append(TokenType.T_EOF, pos, pos)
+        if self.symbol_table is not None:
+            buf.symbols = self.symbol_table
+            for i in ids:
+                self.symbol_table.add(buf.lexeme(i), buf.position(i))
+        if self.comments is not None:
+            for start, end in comment_spans:
+                self.comments.add(start, end, *buf.locate(start))
+        return buf
+
+    def _slow_token(self, pos: int):
+        """
+        Lex the single token at pos with the str pattern. The window runs
+        over identifier-ish and non-ASCII bytes plus one byte after them,
+        so the token cannot be cut short (that byte covers println!).
+        """
+        data = self.data
+        stop = self.WORD_RUN_RE.match(data, pos).end()
+        stop = min(stop + 1, len(data))
+        with memoryview(data) as view:
+            window = str(view[pos:stop], 'utf-8')
+        m = Lexer.TOKEN_RE.match(window)
+        if m is None:
+            self._unknown(pos)
+        lexeme = m.group()
+        kind = m.lastgroup
+        if kind == 'T_Id':
+            tok_type = Lexer.KEYWORDS.get(lexeme, TokenType.T_Id)
+        else:
+            tok_type = TokenType[kind]
+        return tok_type.value, pos + len(lexeme.encode('utf-8'))
+
+    def _locate(self, pos: int) -> tuple:
+        data = self.data
+        line_start = data.rfind(b'\n', 0, pos) + 1
+        with memoryview(data) as view:
+            col = len(str(view[line_start:pos], 'utf-8')) + 1
+        return data[:pos].count(b'\n') + 1, col
+
+    def _unknown(self, pos: int):
+        data = self.data
+        line, col = self._locate(pos)
+        if data[pos:pos + 2] in (b'0x', b'0X'):
+            raise LexerError(f"Hexadecimal literal '{data[pos:pos + 2].decode()}' without digits at line {line}, column {col}")
+        with memoryview(data) as view:
+            char = str(view[pos:pos + 4], 'utf-8', 'replace')[0]
+        raise LexerError(f"Unknown character '{char}' at line {line}, column {col}")
+
+BytesLexer.CLASSES = BytesLexer._first_byte_classes()
+
+def lex_file(path: str, symbol_table: SymbolTable = None, skip_trivia: bool = False,
+             comments: CommentTable = None) -> TokenBuffer:
+    """
+    Lex a UTF-8 file through an mmap with BytesLexer. The returned buffer
+    keeps the mapping as its source, so pages are read in by the OS as
+    tokens are scanned and lexemes decoded; call buffer.close() when done.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            data = b''
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return BytesLexer(data, symbol_table, comments).tokenize_buffer(skip_trivia)
+
+# --- Binary token file -----------------------------------------------------
+# Layout (all integers little-endian, sections padded to 4 bytes):
+#   header   TOKEN_FILE_HEADER: magic, version, kind count, token count,
+#            string count, pool size, position stream size
+#   kinds    per kind: u8 name length + ASCII TokenType name
+#   tokens   u8 index into the kind table, one per token
+#   lexemes  u32 string id, one per token
+#   offsets  u32 start of each string in the pool, plus the pool end
+#   pool     UTF-8 bytes of every distinct lexeme
+#   lines    per token a zigzag varint line delta, then a zigzag varint
+#            column (absolute after a line change, else a column delta)
+# Parser.load_token_file reads it back through an mmap.
+TOKEN_FILE_MAGIC = b'TRTK'
+TOKEN_FILE_VERSION = 1
+TOKEN_FILE_HEADER = struct.Struct('<4sHHIIII')
+
+def _pad4(out: bytearray):
+    out.extend(bytes(-len(out) % 4))
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _varint(out: bytearray, value: int):
+    value = (value << 1) if value >= 0 else ((-value << 1) - 1)     # zigzag
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def write_token_file(path: str, tokens):
+    """Write tokens (a TokenBuffer or an iterable of Token) as a binary token file."""
+    if isinstance(tokens, TokenBuffer):
+        tokens = map(tokens.token, range(len(tokens)))
+    kind_ids = {}
+    string_ids = {}
+    kinds = bytearray()
+    lexemes = array('I')
+    positions = bytearray()
+    prev_line, prev_col = 1, 1
+    for tok in tokens:
+        kinds.append(kind_ids.setdefault(tok.type, len(kind_ids)))
+        lexemes.append(string_ids.setdefault(tok.lexeme, len(string_ids)))
+        _varint(positions, tok.line - prev_line)
+        _varint(positions, tok.column if tok.line != prev_line else tok.column - prev_col)
+        prev_line, prev_col = tok.line, tok.column
+
+    offsets = array('I', [0])
+    pool = bytearray()
+    for text in string_ids:
+        pool += text.encode('utf-8')
+        offsets.append(len(pool))
+
+    out = bytearray(TOKEN_FILE_HEADER.pack(TOKEN_FILE_MAGIC, TOKEN_FILE_VERSION, len(kind_ids),
+                                           len(kinds), len(string_ids), len(pool), len(positions)))
+    for kind in kind_ids:
+        name = kind.name.encode('ascii')
+        out.append(len(name))
+        out += name
+    _pad4(out)
+    out += kinds
+    _pad4(out)
+    out += _le(lexemes)
+    out += _le(offsets)
+    out += pool
+    _pad4(out)
+    out += positions
+    with open(path, 'wb') as f:
+        f.write(out)
+    return len(kinds)
 
 if __name__ == "__main__":
     # 1. Grab filenames from command line (or defaults)
@@ -268,7 +1278,7 @@ if __name__ == "__main__":
     if len(sys.argv) >= 3:
         output_name = sys.argv[2]
     else:
-        output_name = "tokens.txt"
+        output_name = "tokens.bin"
 
     # 2. Compute the base directory where this script lives
     script_dir = os.path.dirname(os.path.realpath(__file__))
@@ -284,21 +1294,22 @@ if __name__ == "__main__":
     os.makedirs(syntax_dir, exist_ok=True)
     output_path = os.path.join(syntax_dir, output_name)
 
-    # 5. Read the source
-    with open(input_path, 'r', encoding='utf-8') as f:
-        source = f.read()
-
-    # 6. Lex, write tokens...
+    # 5. Lex the mapped file; lexemes are decoded only as tokens are written.
+    #    Whitespace and comments are never read by the parser, so skip them.
     symtab = SymbolTable()
-    lexer = Lexer(source, symbol_table=symtab)
-    tokens = lexer.tokenize()
-
-    with open(output_path, 'w', encoding='utf-8') as out:
-        for tok in tokens:
-            out.write(repr(tok) + '\n')
-        out.write("\nSymbol Table:\n")
-        for name, info in symtab.symbols.items():
-            out.write(f"{name}: {info['positions']}\n")
-
-    print(f"Lexing complete. {len(tokens)} tokens written to '{output_path}'.")
-    print("Symbol Table entries:", len(symtab.symbols))
+    buffer = lex_file(input_path, symbol_table=symtab, skip_trivia=True)
+    #    A '.txt' output name keeps the old one-repr-per-line text dump.
+    count = len(buffer)
+    if output_name.endswith('.txt'):
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for i in range(count):
+                out.write(repr(buffer.token(i)) + '\n')
+            out.write("\nSymbol Table:\n")
+            for name, positions in symtab.items():
+                out.write(f"{name}: {positions}\n")
+    else:
+        write_token_file(output_path, buffer)
+    buffer.close()
+
+    print(f"Lexing complete. {count} tokens written to '{output_path}'.")
+    print("Symbol Table entries:", len(symtab))
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import tracemalloc
+
+from Lexer import BytesLexer, Lexer
+
+# Measures lexer throughput (MB/s of source text) for every engine on a
+# corpus built by repeating the sample inputs until it reaches TARGET_MB,
+# and checks that all engines agree token-for-token. Also reports the
+# memory held per token by a Token list versus a TokenBuffer.
+
+TARGET_MB = 4
+ROUNDS = 3
+
+
+def load_corpus(paths, target_mb=TARGET_MB):
+    sample = ''
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            sample += f.read() + '\n'
+    repeat = max(1, int(target_mb * 1024 * 1024 / max(1, len(sample.encode('utf-8')))))
+    return sample * repeat
+
+
+def token_key(tok):
+    return (tok.type, tok.lexeme, tok.literal, tok.line, tok.column)
+
+
+def bench(source, engine, rounds=ROUNDS):
+    best = None
+    tokens = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        tokens = Lexer(source, engine=engine).tokenize()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, tokens
+
+
+def bytes_per_token(build):
+    tracemalloc.start()
+    tokens = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held / len(tokens)
+
+
+def main():
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    names = sys.argv[1:] or sorted(n for n in os.listdir(script_dir)
+                                   if n.startswith('input') and n.endswith('.txt'))
+    # only repeat inputs that lex cleanly, otherwise every engine just
+    # stops at the first bad character
+    paths = []
+    for name in names:
+        path = os.path.join(script_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                Lexer(f.read()).tokenize()
+        except Exception as e:
+            print(f"skipping {name}: {e}")
+            continue
+        paths.append(path)
+
+    source = load_corpus(paths)
+    size_mb = len(source.encode('utf-8')) / (1024 * 1024)
+    print(f"corpus: {len(paths)} files, {size_mb:.2f} MB")
+
+    reference = None
+    for engine in Lexer.ENGINES:
+        elapsed, tokens = bench(source, engine)
+        keys = [token_key(t) for t in tokens]
+        if reference is None:
+            reference = keys
+        status = 'identical' if keys == reference else 'MISMATCH'
+        print(f"{engine:>6}: {size_mb / elapsed:8.2f} MB/s  ({elapsed:.3f}s, {len(tokens)} tokens, {status})")
+
+    start = time.perf_counter()
+    tokens = Lexer(source, engine='regex', skip_trivia=True).tokenize()
+    elapsed = time.perf_counter() - start
+    print(f"  skip: {size_mb / elapsed:8.2f} MB/s  ({elapsed:.3f}s, {len(tokens)} tokens, regex without trivia)")
+
+    start = time.perf_counter()
+    buf = Lexer(source).tokenize_buffer()
+    elapsed = time.perf_counter() - start
+    keys = [token_key(buf.token(i)) for i in range(len(buf))]
+    status = 'identical' if keys == reference else 'MISMATCH'
+    print(f"buffer: {size_mb / elapsed:8.2f} MB/s  ({elapsed:.3f}s, {len(buf)} tokens, {status})")
+
+    start = time.perf_counter()
+    buf = Lexer(source).tokenize_parallel()
+    elapsed = time.perf_counter() - start
+    keys = [token_key(buf.token(i)) for i in range(len(buf))]
+    status = 'identical' if keys == reference else 'MISMATCH'
+    print(f"  pool: {size_mb / elapsed:8.2f} MB/s  ({elapsed:.3f}s, {len(buf)} tokens, {status}, {os.cpu_count()} workers)")
+
+    data = source.encode('utf-8')
+    start = time.perf_counter()
+    buf = BytesLexer(data).tokenize_buffer()
+    elapsed = time.perf_counter() - start
+    keys = [token_key(buf.token(i)) for i in range(len(buf))]
+    status = 'identical' if keys == reference else 'MISMATCH'
+    print(f" bytes: {size_mb / elapsed:8.2f} MB/s  ({elapsed:.3f}s, {len(buf)} tokens, {status})")
+
+    per_token = bytes_per_token(lambda: Lexer(source, engine='regex').tokenize())
+    print(f"memory: Token list  {per_token:6.1f} bytes/token")
+    per_token = bytes_per_token(lambda: Lexer(source).tokenize_buffer())
+    print(f"memory: TokenBuffer {per_token:6.1f} bytes/token")
+
+
+if __name__ == '__main__':
+    main()
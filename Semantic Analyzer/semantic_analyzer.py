@@ -2,25 +2,20 @@ import json
 import sys
 import os
 
-class Node:
-    def __init__(self, typ, value=None):
-        self.typ = typ
-        self.value = value
-        self.children = []
-        self.parent = None
-        
-
-    def add_child(self, node):
-        node.parent = self
-        self.children.append(node)
-
-    def __repr__(self):
-        return f"Node({self.typ}, {self.value}, children={len(self.children)})"
+# the arena AST (Node views over an AST) lives with the parser
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'SyntaxAnalyzer'))
+from ast_arena import ANNOTATIONS, AST, NODE_TYPES, Node, is_ast_file
 
 def parse_tree_from_file(path: str) -> Node:
+    # a binary AST file (Parser.py's parse_tree.bin) or a box-drawing dump
+    if is_ast_file(path):
+        ast = AST.load(path)
+        return ast.node(ast.root)
     with open(path, 'r', encoding='utf-8') as f:
         lines = [line.rstrip('\n') for line in f if line.strip()]
-    root = None
+    values = []
+    ast = AST(values)
+    kids = {}
     stack = []
     for line in lines:
         first = None
@@ -36,33 +31,136 @@ def parse_tree_from_file(path: str) -> Node:
         if len(parts) == 2:
             raw = parts[1].strip()
             value = raw[1:-1] if raw.startswith("'") and raw.endswith("'") else raw
-        node = Node(label, value)
+        token = -1
+        if value is not None:
+            token = len(values)
+            values.append(value)
+        node = ast.new(label, token)
         while stack and stack[-1][0] >= indent:
             stack.pop()
         if stack:
-            stack[-1][1].add_child(node)
+            kids.setdefault(stack[-1][1], []).append(node)
         else:
-            root = node
+            ast.root = node
         stack.append((indent, node))
-    return root
+    for node, children in kids.items():
+        ast.set_children(node, children)
+    return ast.node(ast.root)
+
+class Type:
+    """
+    A Trust type: a primitive (i32, bool, str), an array [elem;size] or a
+    tuple (elems). Types are interned - make them with primitive_type,
+    array_type and tuple_type - so equal types are the same object and
+    compare with `is`. str() is the type as the diagnostics spell it;
+    ctype, size and struct_name are what annotate_var records for it
+    (see c_type_parts), worked out once per type.
+    """
+    __slots__ = ('name', 'elem', 'size', 'elems', 'text', 'ctype', 'struct_name', 'c_name')
+
+    def __init__(self, name=None, elem=None, size=None, elems=None):
+        put = super().__setattr__
+        put('name', name)       # primitives only
+        put('elem', elem)       # arrays only
+        put('size', size)
+        put('elems', elems)     # tuples only
+        if elems is not None:
+            text = "(" + ",".join(e.text for e in elems) + ")"
+            struct_name = 'tuple_' + '_'.join(e.c_name for e in elems)
+            ctype = c_name = struct_name
+        elif elem is not None:
+            text = f"[{elem.text};{size}]"
+            struct_name = None
+            ctype = elem.ctype
+            c_name = f"arr{size}_{elem.c_name}"
+        else:
+            text = ctype = c_name = name
+            struct_name = None
+        put('text', text)
+        put('ctype', ctype)
+        put('struct_name', struct_name)
+        put('c_name', c_name)   # the type's part of an enclosing struct's name
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Type is immutable")
+
+    def __reduce__(self):
+        # copies and unpickled types are interned too
+        if self.elems is not None:
+            return tuple_type, (self.elems,)
+        if self.elem is not None:
+            return array_type, (self.elem, self.size)
+        return primitive_type, (self.name,)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        # as the type strings were, so a fn's (params, ret) in a diagnostic
+        # reads the same
+        return repr(self.text)
+
+# the intern table: primitive name, (elem, size) or elems tuple -> Type
+_TYPES = {}
+
+def primitive_type(name: str) -> Type:
+    typ = _TYPES.get(name)
+    if typ is None:
+        typ = _TYPES[name] = Type(name=name)
+    return typ
+
+def array_type(elem: Type, size: int) -> Type:
+    key = (elem, size)
+    typ = _TYPES.get(key)
+    if typ is None:
+        typ = _TYPES[key] = Type(elem=elem, size=size)
+    return typ
+
+def tuple_type(elems) -> Type:
+    key = tuple(elems)
+    typ = _TYPES.get(key)
+    if typ is None:
+        typ = _TYPES[key] = Type(elems=key)
+    return typ
+
+I32 = primitive_type('i32')
+BOOL = primitive_type('bool')
+STR = primitive_type('str')
+
+def type_text(typ):
+    """A symbol's type for the symbols table: the type's text, or for a fn [param types, return type]."""
+    if isinstance(typ, tuple):
+        params, ret = typ
+        return [type_text(p) for p in params], type_text(ret)
+    return None if typ is None else str(typ)
+
 
 class SemanticAnalyzer:
     def __init__(self, tree: Node):
         self.tree = tree
         self.errors = []
-        self.scopes = [{}]        # global scope
+        # the symbol table: every declaration gets a dense symbol id (its
+        # entry's index in symbols); bindings keeps per name the stack of
+        # ids in scope, innermost last, and scopes per open scope the
+        # names declared in it (name -> id), global scope first
+        self.symbols = []
+        self.bindings = {}
+        self.scopes = [{}]
         self.current_fn = None    # (name, return_type)
         self.in_format = False
+        # per-node type slots of infer_type: node id -> inferred type, and
+        # node id -> the errors inferring it reported (replayed whenever
+        # the memoized type is used again, so diagnostics stay as if the
+        # node were re-inferred). They belong to one arena, typed_ast.
+        self.typed_ast = None
+        self.types = {}
+        self.type_errors = {}
+        # program-wide tables for the indexed syntax_tree.bin (see
+        # index_tables): each function's annotated signature, in source
+        # order, and each tuple struct's element types, by first use
+        self.signatures = []
+        self.structs = {}
     
-    def _inside_print(self, node: Node) -> bool:
-        # climb up until root; if we see a PrintStmt, we’re in formatting context
-        while node:
-            if node.typ == 'PrintStmt':
-                return True
-            node = node.parent
-        return False
-
-
     def error(self, msg, node=None):
         ctx = f" [at {node.typ} '{node.value}']" if node and node.value is not None else ''
         self.errors.append(msg + ctx)
@@ -71,46 +169,52 @@ class SemanticAnalyzer:
         self.scopes.append({})
 
     def exit_scope(self):
-        self.scopes.pop()
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            stack = bindings[name]
+            stack.pop()
+            if not stack:
+                del bindings[name]
 
     def declare(self, name, kind, typ, mutable=False, node=None):
+        # returns the new symbol id (None for a missing name)
         if not name:
-            return
+            return None
         sym = self.scopes[-1]
+        sid = len(self.symbols)
+        self.symbols.append({'name': name, 'kind': kind, 'type': typ, 'mutable': mutable})
         if name in sym:
             self.error(f"Redeclaration of {kind} '{name}'", node)
-        sym[name] = {'kind': kind, 'type': typ, 'mutable': mutable}
+            # the redeclaration replaces the binding
+            self.bindings[name][-1] = sid
+        else:
+            self.bindings.setdefault(name, []).append(sid)
+        sym[name] = sid
+        return sid
 
     def lookup(self, name, node=None):
-        if not name:
+        # the innermost binding's entry; the referring node is annotated
+        # with its symbol id (the first resolution of a node stands, which
+        # for a LetDecl initializer is the one made before its own vars
+        # were declared)
+        stack = self.bindings.get(name) if name else None
+        if not stack:
             self.error(f"Use of undeclared identifier '{name}'", node)
             return None
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
-        self.error(f"Use of undeclared identifier '{name}'", node)
-        return None
+        sid = stack[-1]
+        if node is not None and node.id not in node.ast.symbol:
+            node.ast.annotate(node.id, symbol=sid)
+        return self.symbols[sid]
 
     def check(self, node: Node):
-        method = getattr(self, f"check_{node.typ}", self.generic_check)
-        return method(node)
+        # jump through CHECKS on the node's kind id (see the end of the class)
+        kind = node.ast.kinds[node.id]
+        if kind < len(CHECKS):
+            return CHECKS[kind](self, node)
+        return self.generic_check(node)
 
     def generic_check(self, node: Node):
-        # special‐case PrintStmt so that its own logic runs (and sets in_format)
-        if node.typ == 'PrintStmt':
-            return self.check_PrintStmt(node)
-
-        # special checks for these node types
-        if node.typ == 'BinaryOp':
-            self.check_BinaryOp(node)
-        elif node.typ == 'UnaryOp':
-            self.check_UnaryOp(node)
-        elif node.typ == 'ArrayIndex':
-            self.check_ArrayIndex(node)
-        elif node.typ == 'Call':
-            self.check_Call(node)
-
-        # then recurse
+        # no checks of its own: recurse
         for c in node.children:
             self.check(c)
 
@@ -123,7 +227,7 @@ class SemanticAnalyzer:
         # 1) must be an i32
         idx_expr = node.children[0]
         idx_type = self.infer_type(idx_expr)
-        if idx_type != 'i32':
+        if idx_type is not I32:
             self.error("Array index must be of type i32", node)
 
         # 2) if the index is a literal, enforce > 0
@@ -186,9 +290,14 @@ class SemanticAnalyzer:
         for c in node.children:
             self.check(c)
 
-        # 2) now enforce the special "main" rule without using lookup()
-        global_scope = self.scopes[0]
-        main_sym = global_scope.get('main')
+        # 2) now enforce the special "main" rule
+        self.check_main()
+
+    def check_main(self):
+        # run after the last top-level item has been checked; reads the
+        # global scope directly instead of using lookup()
+        main_id = self.scopes[0].get('main')
+        main_sym = self.symbols[main_id] if main_id is not None else None
 
         # main must exist, be a function, and take zero parameters
         if (not main_sym
@@ -221,18 +330,15 @@ class SemanticAnalyzer:
             if type_node.children:
                 base = type_node.children[0]    # e.g. ASTNode('TypeI32', token=…)
                 # 2a) simple builtins:
-                # instead of `if base.token and ...: declared = base.token.lexeme` do:
                 if base.value is not None:
-                    declared = base.value
+                    declared = primitive_type(base.value)
                 # 2b) array annotations [T;N]:
                 elif base.typ == 'ArrayType' and len(base.children) >= 2:
-                    # subtype at children[0].children[0].token.lexeme
+                    # subtype at children[0].children[0].value
                     sub = base.children[0]
                     size = base.children[1]
-                    if sub.children and sub.children[0].token and size.token:
-                        tlex = sub.children[0].token.lexeme
-                        nlex = size.token.lexeme
-                        declared = f"[{tlex};{nlex}]"
+                    if sub.children and sub.children[0].value is not None and size.value is not None:
+                        declared = array_type(primitive_type(sub.children[0].value), int(size.value, 0))
 
         # 3) infer initializer’s type
         expr = next((c for c in node.children if c.typ == 'Expr'), None)
@@ -250,30 +356,18 @@ class SemanticAnalyzer:
                 if has_init:
                     self.error("Cannot assign to wildcard '_'", var)
                 continue
-            if declared and inferred and declared != inferred:
+            if declared and inferred and declared is not inferred:
                 self.error(f"Type mismatch: declared '{declared}' vs initialized '{inferred}'", var)
             # declare in symbol table
             self.declare(name, 'var', declared or inferred, mutable, var)
             # annotate the VarPattern node so codegen can read it:
-            var.ctype      = declared or inferred     # e.g. "i32", "[i32;5]", "(i32,bool)"
-            var.carray_sz  = None
-            var.ctuple_name = None
-            # if it’s an array type, extract its size
-            if isinstance(var.ctype, str) and var.ctype.startswith('['):
-                # var.ctype is "[i32;5]"
-                inner, sz = var.ctype.strip('[]').split(';')
-                var.ctype = inner       # "i32"
-                var.carray_sz = int(sz)  # 5
-            # if it’s a tuple type, build a struct_name
-            elif isinstance(var.ctype, str) and var.ctype.startswith('('):
-                # var.ctype is "(i32,bool)"
-                types = var.ctype.strip('()').split(',')
-                name = 'tuple_' + '_'.join(types)
-                var.ctuple_name = name
-                var.ctype = name
+            self.annotate_var(var, declared or inferred)
         # **new**: descend into the Expr so ArrayIndex / other checks happen
         expr = next((c for c in node.children if c.typ=='Expr'), None)
         if expr:
+            # its types were inferred before the vars above were declared;
+            # an initializer naming one of them resolves differently now
+            self.forget_types(expr, {var.value for var in vars})
             # expr.children[0] is the real value node (ArrayIndex, Number, etc.)
             self.check(expr.children[0])
 
@@ -296,7 +390,7 @@ class SemanticAnalyzer:
             fn_entry = self.lookup(rhs_expr.value, rhs_expr)
             if fn_entry and fn_entry['kind']=='fn':
                 ret = fn_entry['type'][1]
-                if ltype and ret and ltype != ret:
+                if ltype and ret and ltype is not ret:
                     self.error(
                         f"Assignment type mismatch: lhs is '{ltype}' but '{rhs_expr.value}' returns '{ret}'",
                         node
@@ -305,7 +399,7 @@ class SemanticAnalyzer:
 
         # Otherwise, do the usual type‐check
         rtype = self.infer_type(node.children[2])
-        if ltype and rtype and ltype != rtype:
+        if ltype and rtype and ltype is not rtype:
             self.error(f"Type mismatch in assignment: '{ltype}' vs '{rtype}'", node)
 
 
@@ -319,7 +413,7 @@ class SemanticAnalyzer:
 
         # infer its type
         t = self.infer_type(cond_expr)
-        if t != 'bool':
+        if t is not BOOL:
             self.error("If condition must be bool", cond_expr)
 
         # now continue checking inside the then/else blocks
@@ -372,45 +466,51 @@ class SemanticAnalyzer:
         return False
     
 
-    def _stringify_type_node(self, type_wrapper: Node) -> str:
+    def c_type_parts(self, typ):
         """
-        Given an ASTNode('Type', children=[…]), produce exactly
-        the 'i32', 'bool', '[i32;3]', '(i32,bool)' strings
-        that infer_type() would produce.
+        What codegen needs of a type: (ctype, array size, tuple struct
+        name), e.g. i32 -> ("i32", None, None), [i32;5] -> ("i32", 5,
+        None), (i32,bool) -> ("tuple_i32_bool", None, "tuple_i32_bool").
+        A tuple's struct is registered on first use.
         """
-        base = type_wrapper.children[0]
-
+        if not isinstance(typ, Type):
+            return type_text(typ), None, None
+        if typ.struct_name:
+            self.structs.setdefault(typ.struct_name, typ.elems)
+        return typ.ctype, typ.size, typ.struct_name
+
+    def annotate_var(self, var: Node, typ):
+        # record a VarPattern's C type, array size or tuple struct in the
+        # AST side tables
+        ctype, size, struct_name = self.c_type_parts(typ)
+        var.ast.annotate(var.id, ctype=ctype, size=size, struct_name=struct_name)
+
+    def type_of_node(self, type_wrapper: Node):
+        """The Type of a Type node (children=[…]), None if malformed."""
+        return self.type_of(type_wrapper.children[0])
+
+    def type_of(self, base: Node):
         # primitives
         if base.typ == 'TypeI32':
-            return 'i32'
+            return I32
         if base.typ == 'TypeBool':
-            return 'bool'
+            return BOOL
 
         # array [T;N]
         if base.typ == 'ArrayType':
-            # The first child of ArrayType is itself a Type node
-            subtype_type_node = Node('Type')
-            subtype_type_node.children.append(base.children[0])
-            subtype = self._stringify_type_node(subtype_type_node)
-
+            # The first child of ArrayType is the element type
+            subtype = self.type_of(base.children[0])
             size = base.children[1].value
-            return f"[{subtype};{size}]"
+            return array_type(subtype, int(size, 0)) if subtype is not None else None
 
         # tuple (T1,T2,…)
         if base.typ == 'TupleType':
-            elems = []
-            for elem_type in base.children:
-                # wrap each element in a fake 'Type' node
-                wrapper = Node('Type')
-                wrapper.children.append(elem_type)
-                elems.append(self._stringify_type_node(wrapper))
-            return "(" + ",".join(elems) + ")"
+            elems = [self.type_of(elem_type) for elem_type in base.children]
+            return tuple_type(elems) if None not in elems else None
 
         # fallback—shouldn’t happen
         return None
 
- 
-
 
     def check_FunctionDecl(self, node: Node):
         # 1) Find the function’s name and signature
@@ -424,9 +524,9 @@ class SemanticAnalyzer:
             vp    = next((c for c in p.children if c.typ == 'VarPattern'), None)
             pname = vp.value if (vp and vp.value) else None
 
-            # b) type string e.g. "i32", "[i32;5]", "(i32,bool)"
+            # b) type e.g. i32, [i32;5], (i32,bool)
             tnode = next((c for c in p.children if c.typ == 'Type'), None)
-            ptype = self._stringify_type_node(tnode) if (tnode and tnode.children) else None
+            ptype = self.type_of_node(tnode) if (tnode and tnode.children) else None
 
             param_names.append(pname)
             param_types.append(ptype)
@@ -435,31 +535,17 @@ class SemanticAnalyzer:
         ret = None
         rnode = next((c for c in node.children if c.typ == 'ReturnType'), None)
         if rnode and rnode.children:
-            ret = self._stringify_type_node(rnode.children[0])
+            ret = self.type_of_node(rnode.children[0])
 
         # 3) Declare the function in the enclosing scope
-        self.declare(name_node.value, 'fn', (param_types, ret), False, name_node)
+        sid = self.declare(name_node.value, 'fn', (param_types, ret), False, name_node)
+        if sid is not None:
+            name_node.ast.annotate(name_node.id, symbol=sid)
 
         # --- NEW: annotate function node with its return C‐type ---
         # map Trust‑style ret ("i32","[i32;4]","(i32,bool)") → C‑type name
-        node.cret = ret
-        if isinstance(ret, str) and ret.startswith('['):
-            # array return; extract inner type/size
-            inner, sz = ret.strip('[]').split(';')
-            node.return_ctype = inner      # e.g. "i32"
-            node.return_size  = int(sz)    # e.g. 4
-        elif isinstance(ret, str) and ret.startswith('('):
-            # tuple return
-            types = ret.strip('()').split(',')
-            struct_name = 'tuple_' + '_'.join(types)
-            node.return_ctype   = struct_name
-            node.return_size    = None
-            node.return_struct  = struct_name
-        else:
-            # primitive or void
-            node.return_ctype = ret or None
-            node.return_size  = None
-            node.return_struct = None
+        ctype, size, struct_name = self.c_type_parts(ret)
+        node.ast.annotate(node.id, return_ctype=ctype, size=size, struct_name=struct_name)
 
         # 4) Enter the function’s own scope
         prev_fn = self.current_fn
@@ -475,18 +561,12 @@ class SemanticAnalyzer:
             # find the VarPattern node
             vp = next(c for c in params_node.children[i].children if c.typ=='VarPattern')
             # annotate ctype, array size or tuple struct
-            vp.ctype      = ptype
-            vp.carray_sz  = None
-            vp.ctuple_name = None
-            if isinstance(ptype, str) and ptype.startswith('['):
-                inner, sz = ptype.strip('[]').split(';')
-                vp.ctype     = inner
-                vp.carray_sz = int(sz)
-            elif isinstance(ptype, str) and ptype.startswith('('):
-                elems = ptype.strip('()').split(',')
-                struct_name = 'tuple_' + '_'.join(elems)
-                vp.ctype       = struct_name
-                vp.ctuple_name = struct_name
+            self.annotate_var(vp, ptype)
+        self.signatures.append(dict(
+            self.annotations(node), value=name_node.value,
+            params=[dict(self.annotations(vp), value=vp.value)
+                    for p in params_node.children
+                    for vp in p.children if vp.typ == 'VarPattern']))
 
         # 6) Type‑check the body
         body_wrapper = next(c for c in node.children if c.typ == 'Body')
@@ -517,7 +597,7 @@ class SemanticAnalyzer:
 
         # Existing: typed functions must match
         rtype = self.infer_type(node.children[0]) if node.children else None
-        if ret and rtype and ret != rtype:
+        if ret and rtype and ret is not rtype:
             self.error(f"Return type '{rtype}' does not match '{ret}'", node)
 
 
@@ -526,7 +606,10 @@ class SemanticAnalyzer:
             self.error("Missing function name in call", node)
             return
         entry = self.lookup(node.value, node)
-        if not entry or entry['kind'] != 'fn':
+        if not entry:
+            return
+        if entry['kind'] != 'fn':
+            self.error(f"'{node.value}' is not a function", node)
             return
 
         params, ret = entry['type']
@@ -542,7 +625,7 @@ class SemanticAnalyzer:
             if p is None and a is not None:
                 # first call: fix parameter i’s type
                 params[i] = a
-            elif p is not None and a is not None and p != a:
+            elif p is not None and a is not None and p is not a:
                 # now that p is fixed, mismatched argument triggers an error
                 self.error(
                     f"Function '{node.value}' parameter {i} was inferred as '{p}', got '{a}'",
@@ -554,10 +637,10 @@ class SemanticAnalyzer:
         op = node.value
 
         # 1) If we're anywhere inside a PrintStmt, suppress operand‑type errors
-        if self._inside_print(node):
-            if op in ('+','-','*','/','%'):       return 'i32'
-            if op in ('&&','||'):                 return 'bool'
-            if op in ('<','<=','>','>=','==','!='): return 'bool'
+        if self.in_format:
+            if op in ('+','-','*','/','%'):       return I32
+            if op in ('&&','||'):                 return BOOL
+            if op in ('<','<=','>','>=','==','!='): return BOOL
             return None
 
         # 2) Pull in each side’s type (this may recurse and first‑use infer)
@@ -567,26 +650,26 @@ class SemanticAnalyzer:
         # 3) If either side is still unknown, defer the check until later
         if lt is None or rt is None:
             # still return a plausible result type
-            if op in ('+','-','*','/','%'):       return 'i32'
-            if op in ('&&','||'):                 return 'bool'
-            if op in ('<','<=','>','>=','==','!='): return 'bool'
+            if op in ('+','-','*','/','%'):       return I32
+            if op in ('&&','||'):                 return BOOL
+            if op in ('<','<=','>','>=','==','!='): return BOOL
             return None
 
         # 4) Now both operand types are known—enforce the rules
         if op in ('+','-','*','/','%'):
-            if lt != 'i32' or rt != 'i32':
+            if lt is not I32 or rt is not I32:
                 self.error("Arithmetic operators require i32 operands", node)
-            return 'i32'
+            return I32
 
         if op in ('&&','||'):
-            if lt != 'bool' or rt != 'bool':
+            if lt is not BOOL or rt is not BOOL:
                 self.error("Logical operators require bool operands", node)
-            return 'bool'
+            return BOOL
 
         if op in ('<','<=','>','>=','==','!='):
-            if lt != 'i32' or rt != 'i32':
+            if lt is not I32 or rt is not I32:
                 self.error("Relational operators require i32 operands", node)
-            return 'bool'
+            return BOOL
 
         return None
 
@@ -600,15 +683,15 @@ class SemanticAnalyzer:
 
         # unary plus/minus must apply to an i32
         if op in ('+', '-'):
-            if t != 'i32':
+            if t is not I32:
                 self.error("Unary + or - requires i32 operand", node)
-            return 'i32'
+            return I32
 
         # logical not must apply to a bool
         if op == '!':
-            if t != 'bool':
+            if t is not BOOL:
                 self.error("Logical not requires bool operand", node)
-            return 'bool'
+            return BOOL
 
         # (Trust has no other prefix ops) — fall back to passing the operand type through
         return t
@@ -617,115 +700,165 @@ class SemanticAnalyzer:
 
 
     def infer_type(self, expr: Node):
-        # 1) direct dispatch on the node kind
-        if expr.typ == 'Expr':
-            # unwrap the single child
-            return self.infer_type(expr.children[0])
-        
-        if expr.typ == 'LValue':
+        # memoized per node: the first call infers through INFERS (see the
+        # end of the class), later calls replay what it reported
+        ast, n = expr.ast, expr.id
+        if ast is not self.typed_ast:
+            self.typed_ast, self.types, self.type_errors = ast, {}, {}
+        elif n in self.types:
+            if n in self.type_errors:
+                self.errors.extend(self.type_errors[n])
+            return self.types[n]
+        start = len(self.errors)
+        kind = ast.kinds[n]
+        typ = INFERS[kind](self, expr) if kind < len(INFERS) else None
+        self.types[n] = typ
+        if len(self.errors) > start:
+            self.type_errors[n] = self.errors[start:]
+        return typ
+
+    def forget_types(self, expr: Node, names):
+        """
+        Drop the memoized types of expr's subtree if an Id, Call or
+        ArrayIndex in it refers to one of `names` (which were declared
+        after the subtree was inferred).
+        """
+        ast = expr.ast
+        if ast is not self.typed_ast:
+            return
+        refs = (ast.kind_ids['Id'], ast.kind_ids['Call'], ast.kind_ids['ArrayIndex'])
+        subtree, stack, stale = [], [expr.id], False
+        while stack:
+            n = stack.pop()
+            subtree.append(n)
+            if ast.kinds[n] in refs and ast.value(n) in names:
+                stale = True
+            stack.extend(ast.children(n))
+        if stale:
+            for n in subtree:
+                self.types.pop(n, None)
+                self.type_errors.pop(n, None)
+
+    # --- infer_type's handlers, one per expression kind ---
+    def infer_Expr(self, expr: Node):
+        # unwrap the single child
+        return self.infer_type(expr.children[0])
+
+    def infer_LValue(self, expr: Node):
         # LValue → either Id or ArrayIndex
-            return self.infer_type(expr.children[0])
-
-        if expr.typ == 'Number':
-            return 'i32'
-        if expr.typ == 'BoolLiteral':
-            return 'bool'
-
-        if expr.typ == 'String':
-            # Trust’s println! can take strings without further checks
-            return 'str'
-
-        if expr.typ == 'Id':
-            entry = self.lookup(expr.value, expr)
-            return entry['type'] if entry else None
-
-        if expr.typ == 'UnaryOp':
-            return self.check_UnaryOp(expr)
-
-        if expr.typ == 'BinaryOp':
-            return self.check_BinaryOp(expr)
-
-        if expr.typ == 'Call':
-            entry = self.lookup(expr.value, expr)
-            return entry['type'][1] if entry else None
-
-        if expr.typ == 'ArrayLiteral':
-            # [e,e,e]
-            elms = [self.infer_type(c) for c in expr.children]
-            if None in elms:
-                return None
-            if not all(t == elms[0] for t in elms):
-                self.error("Heterogeneous array literal types", expr)
-                return None
-            return f"[{elms[0]};{len(elms)}]"
-
-        if expr.typ == 'ArrayRepeat':
-            # [element; count]
-            elm_t = self.infer_type(expr.children[0])
-            # now extract a literal integer from expr.children[1]:
-            cnt_node = expr.children[1]
-            lit = None
-            if cnt_node.typ == 'Number':
-                lit = int(cnt_node.value, 0)
-            elif cnt_node.typ == 'UnaryOp' and cnt_node.children:
-                # handle unary minus/plus around a Number
-                child = cnt_node.children[0]
-                if child.typ == 'Number':
-                    val = int(child.value, 0)
-                    lit = -val if cnt_node.value == '-' else val
-            if elm_t is not None and lit is not None and lit > 0:
-                return f"[{elm_t};{lit}]"
-            # otherwise fall back to unknown-length
+        return self.infer_type(expr.children[0])
+
+    def infer_Number(self, expr: Node):
+        return I32
+
+    def infer_BoolLiteral(self, expr: Node):
+        return BOOL
+
+    def infer_String(self, expr: Node):
+        # Trust’s println! can take strings without further checks
+        return STR
+
+    def infer_Id(self, expr: Node):
+        entry = self.lookup(expr.value, expr)
+        return entry['type'] if entry else None
+
+    infer_UnaryOp = check_UnaryOp
+    infer_BinaryOp = check_BinaryOp
+
+    def infer_Call(self, expr: Node):
+        # a fn's return type; calling a variable is an error
+        entry = self.lookup(expr.value, expr)
+        if not entry:
             return None
+        if entry['kind'] != 'fn':
+            self.error(f"'{expr.value}' is not a function", expr)
+            return None
+        return entry['type'][1]
 
-        if expr.typ == 'ArrayIndex':
-            # arr[idx]
-            arr_sym = self.lookup(expr.value, expr)
-            if not arr_sym: return None
-            arr_t = arr_sym['type']
-            # expects "[T;N]"
-            if isinstance(arr_t, str) and arr_t.startswith('['):
-                return arr_t[arr_t.index('[')+1 : arr_t.index(';')]
+    def infer_ArrayLiteral(self, expr: Node):
+        # [e,e,e]
+        elms = [self.infer_type(c) for c in expr.children]
+        if not all(isinstance(t, Type) for t in elms):
+            return None
+        if not all(t is elms[0] for t in elms):
+            self.error("Heterogeneous array literal types", expr)
             return None
+        return array_type(elms[0], len(elms))
 
-        if expr.typ == 'TupleLiteral':
-            # produce exactly "(T1,T2,…)" so it lines up with _stringify_type_node
-            parts = [self.infer_type(c) for c in expr.children]
-            return "(" + ",".join(parts) + ")"
+    def infer_ArrayRepeat(self, expr: Node):
+        # [element; count]
+        elm_t = self.infer_type(expr.children[0])
+        # now extract a literal integer from expr.children[1]:
+        cnt_node = expr.children[1]
+        lit = None
+        if cnt_node.typ == 'Number':
+            lit = int(cnt_node.value, 0)
+        elif cnt_node.typ == 'UnaryOp' and cnt_node.children:
+            # handle unary minus/plus around a Number
+            child = cnt_node.children[0]
+            if child.typ == 'Number':
+                val = int(child.value, 0)
+                lit = -val if cnt_node.value == '-' else val
+        if isinstance(elm_t, Type) and lit is not None and lit > 0:
+            return array_type(elm_t, lit)
+        # otherwise fall back to unknown-length
+        return None
 
+    def infer_ArrayIndex(self, expr: Node):
+        # arr[idx]
+        arr_sym = self.lookup(expr.value, expr)
+        if not arr_sym: return None
+        arr_t = arr_sym['type']
+        # expects [T;N]
+        if isinstance(arr_t, Type) and arr_t.elem is not None:
+            return arr_t.elem
+        return None
+
+    def infer_TupleLiteral(self, expr: Node):
+        # (T1,T2,…), the same Type a TupleType annotation gives
+        parts = [self.infer_type(c) for c in expr.children]
+        if not all(isinstance(t, Type) for t in parts):
+            return None
+        return tuple_type(parts)
 
-        # anything else—pattern nodes, type nodes, print‐stmt wrappers, etc.—
-        # is not a real expression to type‐check:
+    def infer_other(self, expr: Node):
+        # pattern nodes, type nodes, print‐stmt wrappers, etc. are not real
+        # expressions to type‐check
         return None
-    
+
     def node_to_dict(self, node: Node) -> dict:
-        d = {
-            "typ": node.typ,
-            "value": node.value,
-            "children": [self.node_to_dict(c) for c in node.children]
-        }
-        # if this node was a variable binding, emit its C‐type info:
-        if hasattr(node, 'ctype') and node.ctype is not None:
-            d['ctype'] = node.ctype
-        if hasattr(node, 'carray_sz') and node.carray_sz is not None:
-            d['size'] = node.carray_sz
-        if hasattr(node, 'ctuple_name') and node.ctuple_name is not None:
-            d['struct_name'] = node.ctuple_name
-        # if this is a FunctionDecl, emit its return type
-        if node.typ == 'FunctionDecl' and hasattr(node, 'cret'):
-            # the canonical C return type (primitive, array base, or tuple struct)
-            d['return_ctype'] = node.return_ctype  
-            # if this was an array-return, emit its size
-            if getattr(node, 'return_size', None) is not None:
-                d['size'] = node.return_size
-            # if this was a tuple-return, emit its struct name
-            if getattr(node, 'return_struct', None) is not None:
-                d['struct_name'] = node.return_struct
-        return d
-
-
-
-def report_errors(errors, tree):
+        # nested dicts with the codegen annotations (see AST.to_dict)
+        return node.ast.to_dict(node.id)
+
+    @staticmethod
+    def annotations(node: Node) -> dict:
+        return {name: node[name] for name in ANNOTATIONS if name in node}
+
+    def index_tables(self) -> dict:
+        """
+        The header of the indexed syntax_tree.bin: the signature table
+        (per function its annotations, name and annotated parameters), the
+        struct registry ([name, element types] pairs), so the code
+        generator can declare every function and struct before decoding
+        any item, and the symbol array (row i is the entry of symbol id i,
+        which the symbol annotations refer to).
+        """
+        return {'signatures': self.signatures,
+                'structs': [[name, [str(e) for e in elems]] for name, elems in self.structs.items()],
+                'symbols': [dict(entry, type=type_text(entry['type'])) for entry in self.symbols]}
+
+
+# kind id -> handler, over NODE_TYPES (the start of every arena's kind
+# table). A BinaryOp or UnaryOp is checked by inferring its type, which
+# shares the memoized result with the enclosing statement's inference.
+CHECKS = [getattr(SemanticAnalyzer, f"check_{name}", SemanticAnalyzer.generic_check)
+          for name in NODE_TYPES]
+CHECKS[NODE_TYPES.index('BinaryOp')] = CHECKS[NODE_TYPES.index('UnaryOp')] = SemanticAnalyzer.infer_type
+INFERS = [getattr(SemanticAnalyzer, f"infer_{name}", SemanticAnalyzer.infer_other)
+          for name in NODE_TYPES]
+
+
+def report_errors(errors, tree, out_name='syntax_tree.bin', analyzer=None):
     if errors:
         for e in errors:
             print(f"Semantic error: {e}")
@@ -733,12 +866,21 @@ def report_errors(errors, tree):
 
     print("Program was compiled successfully")
 
-    # write out the full syntax tree in JSON format into the Code Generator directory (sibling of this script)
+    # write out the annotated syntax tree into the Code Generator directory
+    # (sibling of this script): an indexed AST file with the analyzer's
+    # tables (a plain binary AST file without an analyzer), or JSON for a
+    # '.json' name
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     codegen_dir = os.path.join(project_root, 'Code Generator')
     os.makedirs(codegen_dir, exist_ok=True)
-    out_path = os.path.join(codegen_dir, 'syntax_tree.json')
+    out_path = os.path.join(codegen_dir, out_name)
+    if not out_name.endswith('.json'):
+        if analyzer is not None:
+            tree.ast.save_indexed(out_path, analyzer.index_tables())
+        else:
+            tree.ast.save(out_path)
+        return
 
     # Convert the AST to a nested dict
     analyzer = None
@@ -759,12 +901,20 @@ def report_errors(errors, tree):
         json.dump(tree_dict, f, indent=2)
 
 if __name__ == '__main__':
+    # Usage: python semantic_analyzer.py [parse tree file] [output name]
+    # The parse tree defaults to parse_tree.bin (Parser.py's binary AST),
+    # else the older parse_tree.txt; the output, to syntax_tree.bin.
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    fn = sys.argv[1] if len(sys.argv)>1 else 'parse_tree.txt'
+    if len(sys.argv)>1:
+        fn = sys.argv[1]
+    else:
+        fn = 'parse_tree.bin'
+        if not os.path.exists(os.path.join(script_dir, fn)):
+            fn = 'parse_tree.txt'
     inp = os.path.join(script_dir, fn)
     if not os.path.exists(inp):
         print(f"Parse tree file '{inp}' not found."); sys.exit(1)
     tree = parse_tree_from_file(inp)
     analyzer = SemanticAnalyzer(tree)
     analyzer.check(tree)
-    report_errors(analyzer.errors, tree)
\ No newline at end of file
+    report_errors(analyzer.errors, tree, *sys.argv[2:3], analyzer=analyzer)
\ No newline at end of file
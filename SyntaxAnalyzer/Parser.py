@@ -1,43 +1,67 @@
+import mmap
 import os
+import struct
 import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, repeat
+from multiprocessing.shared_memory import SharedMemory
+from operator import add, itemgetter
 
-# --- AST Node -------------------------------------------------------------
-class ASTNode:
-    def __init__(self, nodetype, token=None, children=None):
-        self.nodetype = nodetype
-        self.token    = token
-        self.children = children or []
+LEXER_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'Lexer')
+if LEXER_DIR not in sys.path:
+    sys.path.insert(0, LEXER_DIR)
 
-    def __repr__(self):
-        return self._to_tree('', True)
+from ast_arena import AST, TokenPool
+from Lexer import TokenType
+from ll1_table import DONE, EMPTY, GROUP, MORE, RULE, load_predict_table
 
-    def _to_tree(self, prefix, is_last):
-        # Any token-bearing node shows its lexeme (operators included)
-        if self.token and hasattr(self.token, 'lexeme'):
-            label = f"{self.nodetype}: '{self.token.lexeme}'"
-        else:
-            label = self.nodetype
+# --- Token ---------------------------------------------------------------
+Token = namedtuple('Token', ['type','lexeme','line','col'])
 
-        branch = '└── ' if is_last else '├── '
-        line = prefix + branch + label
+# --- Token kinds ---------------------------------------------------------
+# The Parser compares tokens by kind: the Lexer's TokenType value as a
+# plain int (Parser.kinds holds one byte per token). KIND_NAMES maps a kind
+# back to its name (index 0, None, stands for a type the Lexer does not
+# define), the same table as TokenBuffer.KIND_NAMES.
+KIND_NAMES = (None,) + tuple(t.name for t in TokenType)   # TokenType values start at 1
+KIND = {t.name: t.value for t in TokenType}
 
-        new_prefix = prefix + ('    ' if is_last else '│   ')
-        lines = [line]
-        for idx, child in enumerate(self.children):
-            if isinstance(child, ASTNode):
-                last = (idx == len(self.children) - 1)
-                lines.append(child._to_tree(new_prefix, last))
-        return '\n'.join(lines)
+T_Bool, T_Break, T_Continue = TokenType.T_Bool.value, TokenType.T_Break.value, TokenType.T_Continue.value
+T_Else, T_False, T_Fn = TokenType.T_Else.value, TokenType.T_False.value, TokenType.T_Fn.value
+T_Int, T_If, T_Let = TokenType.T_Int.value, TokenType.T_If.value, TokenType.T_Let.value
+T_Loop, T_Mut, T_Print = TokenType.T_Loop.value, TokenType.T_Mut.value, TokenType.T_Print.value
+T_Return, T_True = TokenType.T_Return.value, TokenType.T_True.value
+T_AOp_Trust, T_AOp_MN = TokenType.T_AOp_Trust.value, TokenType.T_AOp_MN.value
+T_AOp_ML, T_AOp_DV, T_AOp_RM = TokenType.T_AOp_ML.value, TokenType.T_AOp_DV.value, TokenType.T_AOp_RM.value
+T_ROp_L, T_ROp_G, T_ROp_LE = TokenType.T_ROp_L.value, TokenType.T_ROp_G.value, TokenType.T_ROp_LE.value
+T_ROp_GE, T_ROp_NE, T_ROp_E = TokenType.T_ROp_GE.value, TokenType.T_ROp_NE.value, TokenType.T_ROp_E.value
+T_LOp_AND, T_LOp_OR, T_LOp_NOT = TokenType.T_LOp_AND.value, TokenType.T_LOp_OR.value, TokenType.T_LOp_NOT.value
+T_Assign, T_Colon, T_Arrow = TokenType.T_Assign.value, TokenType.T_Colon.value, TokenType.T_Arrow.value
+T_LP, T_RP, T_LC, T_RC = TokenType.T_LP.value, TokenType.T_RP.value, TokenType.T_LC.value, TokenType.T_RC.value
+T_LB, T_RB = TokenType.T_LB.value, TokenType.T_RB.value
+T_Semicolon, T_Comma = TokenType.T_Semicolon.value, TokenType.T_Comma.value
+T_Id, T_Decimal, T_Hexadecimal = TokenType.T_Id.value, TokenType.T_Decimal.value, TokenType.T_Hexadecimal.value
+T_String, T_EOF = TokenType.T_String.value, TokenType.T_EOF.value
 
 
-# --- Token ---------------------------------------------------------------
-Token = namedtuple('Token', ['type','lexeme','line','col'])
+def kind_table(entries, default=None):
+    """A list indexed by kind (0..len(KIND_NAMES)-1) from a {kind: value} dict."""
+    table = [default] * len(KIND_NAMES)
+    for kind, value in entries.items():
+        table[kind] = value
+    return table
 
 # --- Loader --------------------------------------------------------------
 def load_tokens(path):
     if not os.path.isfile(path):
         raise FileNotFoundError(f"Could not find tokens file '{path}'")
+    # Binary token files (Lexer.write_token_file) are mapped, not parsed
+    with open(path, 'rb') as f:
+        if f.read(len(TOKEN_FILE_MAGIC)) == TOKEN_FILE_MAGIC:
+            return load_token_file(path)
     tokens = []
     with open(path, encoding='utf-8') as f:
         for line in f:
@@ -72,346 +96,1306 @@ def load_tokens(path):
     tokens.append(Token('T_EOF', '', last.line, last.col + 1))
     return tokens
 
+# --- Binary token file ---------------------------------------------------
+# Must match the layout written by Lexer.write_token_file.
+TOKEN_FILE_MAGIC = b'TRTK'
+TOKEN_FILE_VERSION = 1
+TOKEN_FILE_HEADER = struct.Struct('<4sHHIIII')
+
+class FileToken:
+    """A view of token `index` in a TokenFile; same fields as Token."""
+    __slots__ = ('file', 'index')
+
+    def __init__(self, file, index):
+        self.file = file
+        self.index = index
+
+    @property
+    def type(self): return self.file.type_name(self.index)
+
+    @property
+    def lexeme(self): return self.file.lexeme(self.index)
+
+    @property
+    def line(self): return self.file.position(self.index)[0]
+
+    @property
+    def col(self): return self.file.position(self.index)[1]
+
+    @property
+    def symbol_id(self): return self.file.symbol_id(self.index)
+
+    def __repr__(self):
+        return f"Token({self.type}, {self.lexeme!r}, line={self.line}, col={self.col})"
+
+
+class TokenFile:
+    """
+    Memory-mapped binary token file. Kinds and string ids are read in place
+    from the map, lexemes are decoded on first use, and the line/column
+    varint stream is only decoded when a position is first asked for
+    (normally only for error messages).
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        (magic, version, n_kinds, n_tokens, n_strings,
+         pool_size, pos_size) = TOKEN_FILE_HEADER.unpack_from(view)
+        if magic != TOKEN_FILE_MAGIC or version != TOKEN_FILE_VERSION:
+            raise ValueError(f"Unsupported token file '{path}' (version {version})")
+        at = TOKEN_FILE_HEADER.size
+        self.kind_names = []
+        for _ in range(n_kinds):
+            size = view[at]
+            self.kind_names.append(bytes(view[at+1:at+1+size]).decode('ascii'))
+            at += 1 + size
+        at += -at % 4
+        self._kinds = view[at:at+n_tokens]
+        at += n_tokens + (-n_tokens % 4)
+        self._lexemes = self._u32(view[at:at+4*n_tokens])
+        at += 4*n_tokens
+        self._offsets = self._u32(view[at:at+4*(n_strings+1)])
+        at += 4*(n_strings+1)
+        self._pool = view[at:at+pool_size]
+        at += pool_size + (-pool_size % 4)
+        self._pos_stream = view[at:at+pos_size]
+        self._strings = [None] * n_strings
+        self._lines = self._cols = None
+        self._count = n_tokens
+
+    @staticmethod
+    def _u32(view):
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        arr = array('I', bytes(view))
+        arr.byteswap()
+        return arr
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [FileToken(self, j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('token index out of range')
+        return FileToken(self, i)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield FileToken(self, i)
+
+    def type_name(self, i):
+        return self.kind_names[self._kinds[i]]
+
+    def lexeme(self, i):
+        sid = self._lexemes[i]
+        text = self._strings[sid]
+        if text is None:
+            text = self._strings[sid] = str(self._pool[self._offsets[sid]:self._offsets[sid+1]], 'utf-8')
+        return text
+
+    def symbol_id(self, i):
+        # string-pool ids are dense and one per distinct lexeme, so they
+        # double as identifier ids: equal names <=> equal ints
+        if self.kind_names[self._kinds[i]] != 'T_Id':
+            return None
+        return self._lexemes[i]
+
+    def position(self, i):
+        if self._lines is None:
+            self._decode_positions()
+        return self._lines[i], self._cols[i]
+
+    def _decode_positions(self):
+        lines, cols = array('I'), array('I')
+        stream = self._pos_stream
+        line = col = 1
+        value = shift = 0
+        first = True
+        for byte in stream:
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+                continue
+            value = (value >> 1) ^ -(value & 1)                 # un-zigzag
+            if first:
+                line += value
+                new_line = value != 0
+            else:
+                col = value if new_line else col + value
+                lines.append(line)
+                cols.append(col)
+            first = not first
+            value = shift = 0
+        self._lines, self._cols = lines, cols
+
+    def close(self):
+        self._kinds = self._lexemes = self._offsets = self._pool = self._pos_stream = None
+        self._map.close()
+
+
+def load_token_file(path):
+    """Map a binary token file for the Parser (no per-line parsing)."""
+    tokens = TokenFile(path)
+    kinds = tokens.kind_names
+    if 'T_Whitespace' in kinds or 'T_Comment' in kinds or not len(tokens) \
+            or tokens.type_name(len(tokens) - 1) != 'T_EOF':
+        # Written with trivia or without an EOF: fall back to a filtered list
+        listed = [Token(t.type, t.lexeme, t.line, t.col) for t in tokens
+                  if t.type not in ('T_Whitespace', 'T_Comment', 'T_EOF')]
+        last = listed[-1] if listed else Token('', '', 0, 0)
+        listed.append(Token('T_EOF', '', last.line, last.col + 1))
+        return listed
+    return tokens
+
+# --- Streaming parse -----------------------------------------------------
+class StreamParser:
+    """
+    Parses a token iterator (ending with T_EOF, in the Parser's format) one
+    top-level item at a time. Tokens are buffered only up to the next `fn`
+    at brace depth 0; each such chunk is parsed on its own, with that `fn`
+    as lookahead, and iterating yields the root Node of each of its items,
+    so one chunk's tokens and tree are alive at a time. A chunk with
+    errors yields nothing: its errors go to self.errors, and later chunks
+    are parsed only for theirs. The first error is the one parse()
+    reports; later ones differ only if a recovery runs into the next
+    top-level fn.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.errors = []
+
+    def __iter__(self):
+        chunk = []
+        depth = 0
+        for tok in self.tokens:
+            typ = tok.type
+            if typ == 'T_EOF' or (typ == 'T_Fn' and depth == 0 and chunk):
+                yield from self._parse_chunk(chunk, tok)
+                if typ == 'T_EOF':
+                    return
+                chunk = []
+            elif typ == 'T_LC':
+                depth += 1
+            elif typ == 'T_RC':
+                depth -= 1
+            chunk.append(tok)
+
+    def _parse_chunk(self, chunk, end):
+        if not chunk:
+            return
+        # `end` (the next chunk's fn, or EOF) is only looked at
+        stop = len(chunk)
+        chunk.append(end)
+        if end.type != 'T_EOF':
+            chunk.append(Token('T_EOF', '', end.line, end.col))
+        p = Parser(chunk)
+        p.items = []
+        p.parse_items(stop)
+        p.finish_program()
+        if p.errors or self.errors:
+            self.errors.extend(p.errors)
+            return
+        yield from p.ast.node(p.ast.root).children
+
+# --- Shared token columns --------------------------------------------------
+# Parser.parse_parallel hands its workers the token sequence without
+# pickling it: a TokenFile is mapped again from its path, and a Lexer
+# TokenBuffer has its columns and source copied once into a SharedMemory
+# block that SharedTokens reads in place.
+
+# Parser.parse_parallel never cuts shards smaller than this many tokens
+MIN_SHARD_TOKENS = 20_000
+
+class SharedTokens:
+    """
+    A TokenBuffer's kind/start/end columns and UTF-8 source in shared
+    memory. Layout: header (tokens, source bytes, source was str), starts
+    and ends as u32, kinds as u8 TokenBuffer.KIND_NAMES indexes, source.
+    Tokens are FileToken views, as for a TokenFile.
+    """
+    HEADER = struct.Struct('III')
+
+    def __init__(self, name, kind_names):
+        self._shm = SharedMemory(name)
+        view = self._shm.buf
+        n, size, is_text = self.HEADER.unpack_from(view)
+        at = self.HEADER.size
+        self._starts = view[at:at+4*n].cast('I')
+        self._ends = view[at+4*n:at+8*n].cast('I')
+        self._kinds = view[at+8*n:at+9*n]
+        self._source = view[at+9*n:at+9*n+size]
+        # offsets of a str source count characters, so decode it whole
+        self.text = str(self._source, 'utf-8') if is_text else None
+        self.kind_names = kind_names
+        self._line_starts = None
+        self._count = n
+
+    @classmethod
+    def create(cls, buffer):
+        """Copy a TokenBuffer into a new SharedMemory block; the caller closes and unlinks it."""
+        source = buffer.source
+        is_text = isinstance(source, str)
+        data = source.encode('utf-8') if is_text else source
+        n = len(buffer)
+        at = cls.HEADER.size
+        shm = SharedMemory(create=True, size=at + 9*n + len(data) or 1)
+        view = shm.buf
+        cls.HEADER.pack_into(view, 0, n, len(data), is_text)
+        view[at:at+4*n] = memoryview(buffer.starts).cast('B')
+        view[at+4*n:at+8*n] = memoryview(buffer.ends).cast('B')
+        view[at+8*n:at+9*n] = buffer.kinds
+        view[at+9*n:at+9*n+len(data)] = data
+        del view
+        return shm
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [FileToken(self, j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('token index out of range')
+        return FileToken(self, i)
+
+    def type_name(self, i):
+        return self.kind_names[self._kinds[i]]
+
+    def lexeme(self, i):
+        if self.text is not None:
+            return self.text[self._starts[i]:self._ends[i]]
+        return str(self._source[self._starts[i]:self._ends[i]], 'utf-8')
+
+    def symbol_id(self, i):
+        return None             # the SymbolTable stays in the parent
+
+    def position(self, i):
+        # as TokenBuffer.locate; only needed for error messages
+        source = self.text if self.text is not None else bytes(self._source)
+        if self._line_starts is None:
+            newline = '\n' if self.text is not None else b'\n'
+            self._line_starts = array('I', [0])
+            nl = source.find(newline)
+            while nl != -1:
+                self._line_starts.append(nl + 1)
+                nl = source.find(newline, nl + 1)
+        offset = self._starts[i]
+        line = bisect_right(self._line_starts, offset)
+        line_start = self._line_starts[line - 1]
+        if self.text is None:
+            return line, len(str(source[line_start:offset], 'utf-8')) + 1
+        return line, offset - line_start + 1
+
+    def close(self):
+        self._starts = self._ends = self._kinds = self._source = None
+        self._shm.close()
+
+
+def _token_kinds(tokens):
+    """(kinds as bytes, kind names) of a TokenFile or TokenBuffer; None for token lists."""
+    if isinstance(tokens, TokenFile):
+        return bytes(tokens._kinds), tokens.kind_names
+    names = getattr(tokens, 'KIND_NAMES', None)
+    if names is not None and hasattr(tokens, 'starts'):
+        return tokens.kinds.tobytes(), names
+    return None
+
+
+def token_kinds(tokens) -> bytearray:
+    """The kind (TokenType value, see KIND_NAMES) of each token, one byte per token."""
+    columns = _token_kinds(tokens)
+    if columns is None:
+        get = KIND.get
+        return bytearray([get(tok.type, 0) for tok in tokens])
+    kinds, names = columns
+    if tuple(names) == KIND_NAMES:
+        return bytearray(kinds)
+    # a token file lists its own kind names: translate its codes
+    table = bytes([KIND.get(name, 0) for name in names]).ljust(256, b'\0')
+    return bytearray(kinds.translate(table))
+
+
+def _share(tokens):
+    """(what workers pass to _open_source, SharedMemory block to release or None)."""
+    if isinstance(tokens, TokenFile):
+        return ('file', tokens.path), None
+    shm = SharedTokens.create(tokens)
+    return ('shared', shm.name, tokens.KIND_NAMES), shm
+
+
+def _open_source(source):
+    if source[0] == 'file':
+        return TokenFile(source[1])
+    return SharedTokens(source[1], source[2])
+
+
+def split_top_level(kinds: bytes, kind_names, target: int):
+    """
+    Cut points (token indexes) for parse_parallel: top-level `fn` tokens,
+    i.e. at brace depth 0, taken about every `target` tokens. Braces are
+    only counted between consecutive `fn` tokens, so the scan runs at
+    bytes.find/count speed.
+    """
+    if 'T_Fn' not in kind_names:
+        return []
+    fn = kind_names.index('T_Fn')
+    lc = kind_names.index('T_LC') if 'T_LC' in kind_names else -1
+    rc = kind_names.index('T_RC') if 'T_RC' in kind_names else -1
+    cuts = []
+    depth = last = at = 0
+    i = kinds.find(fn)
+    while i != -1:
+        if lc >= 0:
+            depth += kinds.count(lc, at, i)
+        if rc >= 0:
+            depth -= kinds.count(rc, at, i)
+        at = i
+        if depth == 0 and i - last >= target:
+            cuts.append(i)
+            last = i
+        i = kinds.find(fn, i + 1)
+    return cuts
+
+# --- Error recovery ------------------------------------------------------
+# After a syntax error the Parser skips ahead (panic mode) to a token that
+# can follow the statement or top-level item it was in, using the FOLLOW
+# sets the grammar compiles to (ll1_table, see first_follow.txt). Until it
+# is back in step, further errors are cascades of the first and dropped,
+# and after max_errors errors parsing stops, so a garbage input costs
+# one pass over its tokens.
+
+# errors Parser records before it gives up (None: no limit)
+MAX_ERRORS = 100
+
+_sync_tables = {}
+
+
+def sync_tables(table):
+    """
+    Panic-mode sync sets as kind tables (1 = resume there) for statements
+    and for top-level items: FOLLOW(Statement) and FOLLOW(TopLevel) from
+    the predict table, less FIRST(Expression). Tokens that start an
+    expression follow statements too, but they are also what the skipped
+    garbage is made of.
+    """
+    sync = _sync_tables.get(table.digest)
+    if sync is None:
+        expression = table.first['Expression']
+        sync = _sync_tables[table.digest] = tuple(
+            bytes(kind_table({KIND[t]: 1 for t in table.follow[A] - expression if t in KIND}, 0))
+            for A in ('Statement', 'TopLevel'))
+    return sync
+
 # --- Parser --------------------------------------------------------------
 class Parser:
-    def __init__(self, tokens):
+    # `tokens` is any indexable sequence of trivia-free tokens exposing
+    # .type (TokenType name), .lexeme, .line and .col: the list from
+    # load_tokens, or a Lexer TokenBuffer (Lexer.tokenize_buffer(skip_trivia=True))
+    # used directly, without re-wrapping each token. The parse itself only
+    # reads their kinds (self.kinds, TokenType values); tokens are looked
+    # at for error messages.
+    # Nodes are allocated in self.ast (see ast_arena): the parse_* methods
+    # return node ids and reference tokens by their index in `tokens`.
+    def __init__(self, tokens, max_errors=MAX_ERRORS):
         self.tokens = tokens
         self.pos    = 0
         self.errors = []
+        self.max_errors = max_errors
+        self.panicking  = False     # an error not recovered from yet
+        self.sync   = None          # sync_tables, loaded on the first error
+        self.ast    = AST(tokens)
+        # top-level items of the last parse, for reparse: (root node, token
+        # count, index of the first token in ast.tokens, node count); an
+        # item's nodes are the node count ids ending at its root
+        self.items  = None
+        self.build_bracket_index()
+
+    def node(self, typ, token=-1, children=()):
+        return self.ast.add(typ, token, children)
+
+    def build_bracket_index(self, start=0, stop=None):
+        # One pass over the tokens: match[i] is the distance from the '(' or
+        # '[' at i to its closing bracket (0 if unclosed or not an opener),
+        # and tuple_comma[i] is 1 when the '(' at i has a comma directly
+        # inside it (not nested in an inner bracket pair). kinds[i] is the
+        # kind of token i (see token_kinds). Distances stay valid when
+        # tokens before them are inserted or removed, so reparse only
+        # re-indexes tokens[start:stop] (with the arrays already resized).
+        if stop is None:
+            n = len(self.tokens)
+            self.match = array('i', [0]) * n
+            self.tuple_comma = bytearray(n)
+            self.kinds = token_kinds(self.tokens)
+            stop = n
+        kinds = self.kinds
+        closers = {T_RP: T_LP, T_RB: T_LB}
+        stack = []
+        for i, kind in enumerate(kinds[start:stop], start):
+            if kind == T_LP or kind == T_LB:
+                stack.append(i)
+            elif kind in closers:
+                if stack and kinds[stack[-1]] == closers[kind]:
+                    opener = stack.pop()
+                    self.match[opener] = i - opener
+            elif kind == T_Comma and stack:
+                self.tuple_comma[stack[-1]] = 1
 
     def current(self): return self.tokens[self.pos]
-    def peek(self): return self.tokens[self.pos+1] if self.pos+1<len(self.tokens) else Token('T_EOF','',0,0)
 
-    def eat(self, typ):
-        tok = self.current()
-        if tok.type == typ:
+    def eat(self, kind):
+        # returns the index of the (expected) token, consumed only if it matches
+        if self.kinds[self.pos] == kind:
             self.pos += 1
-            return tok
-        self.errors.append(f"Expected {typ} at {tok.line}:{tok.col}, got {tok.type}")
-        return tok
+            return self.pos - 1
+        tok = self.current()
+        self.error(self.pos, f"Expected {KIND_NAMES[kind]} at {tok.line}:{tok.col}, got {tok.type}")
+        return self.pos
+
+    def error(self, pos, message):
+        # one error per statement: whatever else goes wrong before recover
+        # resynchronizes follows from the first one. At max_errors,
+        # parsing stops: pos jumps to the EOF, where every parse loop ends.
+        if self.panicking:
+            return
+        self.panicking = True
+        self.errors.append(message)
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            tok = self.tokens[pos]
+            self.errors.append(f"Too many errors, parsing stopped at {tok.line}:{tok.col}")
+            self.pos = len(self.kinds) - 1
+
+    def sync_sets(self):
+        # (statement, top-level) sync tables
+        if self.sync is None:
+            self.sync = sync_tables(load_predict_table())
+        return self.sync
+
+    def recover(self, start, sync):
+        # panic mode, after an error in the statement or item that began
+        # at token `start`: skip to the next token in `sync`, taking at
+        # least one so the caller's loop moves on. The EOF is in every
+        # sync set.
+        kinds = self.kinds
+        pos = self.pos
+        if pos == start and kinds[pos] != T_EOF:
+            pos += 1
+        while not sync[kinds[pos]]:
+            pos += 1
+        self.pos = pos
+        self.panicking = False
 
     def is_assign_stmt(self):
-        if self.current().type != 'T_Id': return False
+        kinds = self.kinds
+        if kinds[self.pos] != T_Id: return False
         i = self.pos+1
-        while i<len(self.tokens) and self.tokens[i].type=='T_LB':
-            depth=1; i+=1
-            while i<len(self.tokens) and depth>0:
-                if self.tokens[i].type=='T_LB': depth+=1
-                elif self.tokens[i].type=='T_RB': depth-=1
-                i+=1
-        return i<len(self.tokens) and self.tokens[i].type=='T_Assign'
+        # skip each [...] index group in one jump via the bracket index
+        while i<len(kinds) and kinds[i]==T_LB:
+            if not self.match[i]: return False
+            i += self.match[i]+1
+        return i<len(kinds) and kinds[i]==T_Assign
+
+    def is_named_arg(self):
+        # `name = expr` argument of println! (a T_Id is never the last token)
+        return self.kinds[self.pos] == T_Id and self.kinds[self.pos+1] == T_Assign
 
     # --- Entry point ---
     def parse(self):
-        root = ASTNode('Program')
-        while self.current().type!='T_EOF':
-            root.children.append(self.parse_top_level())
-        return root
+        self.items = []
+        self.parse_items()
+        return self.finish_program()
+
+    def parse_items(self, stop=None):
+        # top-level items from self.pos to EOF (or the first one starting
+        # at or after token `stop`), recorded in self.items
+        while self.kinds[self.pos] != T_EOF and (stop is None or self.pos < stop):
+            start, first_node = self.pos, len(self.ast)
+            root = self.parse_top_level()
+            if self.panicking:
+                self.recover(start, self.sync_sets()[1])
+            self.items.append((root, self.pos - start, start, len(self.ast) - first_node))
+
+    def finish_program(self):
+        self.ast.root = self.node('Program', children=[root for root, _, _, _ in self.items])
+        return self.ast.node(self.ast.root)
+
+    # --- Parallel parse ---
+    def parse_parallel(self, workers: int = None):
+        """
+        parse() for large inputs: the tokens are cut at top-level `fn`
+        items (split_top_level) and the shards are parsed in a process
+        pool, reading the tokens from shared memory (see SharedTokens).
+        Shard subtrees are appended to self.ast in source order. From the
+        first shard that reports errors on, parsing continues here
+        sequentially, so errors and recovery are exactly those of parse().
+        Token lists, and inputs too small to split, are parsed sequentially.
+        """
+        workers = workers or os.cpu_count() or 1
+        columns = _token_kinds(self.tokens) if workers > 1 else None
+        if columns is None:
+            return self.parse()
+        kinds, kind_names = columns
+        target = max(MIN_SHARD_TOKENS, len(kinds) // (4 * workers))
+        cuts = [0] + split_top_level(kinds, kind_names, target) + [len(kinds) - 1]
+        if len(cuts) <= 2:
+            return self.parse()
+        self.items = []
+        source, shm = _share(self.tokens)
+        try:
+            jobs = [(source, a, b) for a, b in zip(cuts, cuts[1:])]
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                for (_, start, stop), shard in zip(jobs, pool.map(_parse_shard, jobs)):
+                    if shard[-1]:
+                        self.pos = start        # errors: redo the rest here
+                        break
+                    self.append_shard(shard)
+                    self.pos = stop
+            self.parse_items()
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        return self.finish_program()
+
+    def append_shard(self, shard):
+        # a _parse_shard result: offset its node and child ids past ours
+        kind_names, kinds, token, first, count, parent, child_ids, items, _ = shard
+        ast = self.ast
+        node_base, child_base = len(ast), len(ast.child_ids)
+        if kind_names != ast.kind_names[:len(kind_names)]:
+            remap = [ast.kind_id(name) for name in kind_names]
+            kinds = array('B', [remap[k] for k in kinds])
+        ast.kinds.extend(kinds)
+        ast.token.extend(token)
+        ast.first.extend(map(add, first, repeat(child_base)))
+        ast.count.extend(count)
+        ast.parent.extend(map(add, parent, repeat(node_base)))
+        ast.child_ids.extend(map(add, child_ids, repeat(node_base)))
+        for root, size, base, nodes in items:
+            ast.parent[root + node_base] = -1
+            self.items.append((root + node_base, size, base, nodes))
+
+    # --- Incremental reparse ---
+    def reparse(self, tokens, first, stop):
+        """
+        Parse `tokens`, an edit of the sequence parsed last, reusing the
+        top-level items the edit did not touch. tokens[first:stop] are the
+        changed tokens (the range Lexer.relex returns); tokens before
+        `first` are the old ones and tokens from `stop` on are the old
+        suffix, shifted. Reused subtrees keep reading their tokens from the
+        old sequence (ast.tokens becomes a TokenPool over it), so it must
+        not be modified in place. Falls back to a full parse if the old
+        or the new parse has errors.
+        """
+        items = self.items
+        if items is None or self.errors or self.ast.root < 0:
+            return self._parse_fresh(tokens)
+        ast = self.ast
+        if not isinstance(ast.tokens, TokenPool):
+            ast.use_tokens(TokenPool(ast.tokens))
+        pool = ast.tokens
+        delta = len(tokens) - len(self.kinds)
+        old_stop = stop - delta
+
+        # items[:k] end before the edit (and before the token after them
+        # changed), items[m:] start after it; items[k:m] are dirty
+        starts = list(accumulate(map(itemgetter(1), items), initial=0))
+        k = bisect_left(starts, first, 1, len(starts)) - 1
+        m = max(k, bisect_left(starts, old_stop, 0, len(items)))
+        lo = starts[k]
+        old_hi = max(starts[m], old_stop)
+        new_hi = old_hi + delta
+
+        # dirty items that start before the edit may still be intact: keep
+        # their old start and the kind of the token that followed them
+        dirty = {starts[i]: (i, self.kinds[starts[i+1]]) for i in range(k, m) if starts[i] < first}
+
+        # re-index the replaced region; everything else only moved
+        self.tokens = tokens
+        self.kinds[lo:old_hi] = token_kinds(tokens[lo:new_hi])
+        self.match[lo:old_hi] = array('i', [0]) * (new_hi - lo)
+        self.tuple_comma[lo:old_hi] = bytes(new_hi - lo)
+        self.build_bracket_index(lo, new_hi)
+
+        # Program's child range is the last one in the arena; drop it so the
+        # new one takes its place instead of leaving a dead copy behind
+        ast.set_children(ast.root, ())
+        kept = items[:k]
+        parsed = []
+        self.pos = lo
+        j = m
+        while self.kinds[self.pos] != T_EOF:
+            pos = self.pos
+            # back in step with the old suffix: the rest is unchanged
+            while j < len(items) and starts[j] + delta < pos:
+                j += 1
+            if j < len(items) and starts[j] + delta == pos:
+                kept.extend(items[j:])
+                break
+            # a dirty item whose lexemes (and the token after) did not
+            # change, e.g. after a whitespace edit: point it at the new
+            # tokens, which may have moved
+            old = dirty.get(pos)
+            if old is not None and self._same_item(items[old[0]], pos, old[1]):
+                root, size, old_base, nodes = items[old[0]]
+                base = pool.extend(tokens[pos:pos + size])
+                self._rebase_tokens(root - nodes + 1, root + 1, base - old_base)
+                kept.append((root, size, base, nodes))
+                self.pos = pos + size
+                continue
+            first_node = len(ast)
+            root = self.parse_top_level()
+            if self.errors:
+                # (before moving on: an item with errors may not have moved pos)
+                return self._parse_fresh(tokens)
+            base = pool.extend(tokens[pos:self.pos])
+            self._rebase_tokens(first_node, len(ast), base - pos)
+            kept.append((root, self.pos - pos, base, len(ast) - first_node))
+            parsed.append(root)
+
+        self.items = kept
+        # a full parse once dead nodes from earlier reparses outnumber live ones
+        if len(ast) > 2 * (sum(map(itemgetter(3), kept)) + 1) + 1024:
+            return self._parse_fresh(tokens)
+        ast.relink_children(ast.root, list(map(itemgetter(0), kept)), parsed)
+        return ast.node(ast.root)
+
+    def _same_item(self, item, pos, next_kind):
+        # the old item's tokens (in ast.tokens) against tokens[pos:], and
+        # the kind of the token after it, which decides where it ended
+        _, size, base, _ = item
+        if pos + size >= len(self.kinds) or self.kinds[pos + size] != next_kind:
+            return False
+        lexeme = self.ast.tokens.lexeme
+        tokens = self.tokens
+        return all(lexeme(base + i) == tokens[pos + i].lexeme for i in range(size))
+
+    def _rebase_tokens(self, start, stop, shift):
+        token = self.ast.token
+        for n in range(start, stop):
+            if token[n] >= 0:
+                token[n] += shift
+
+    def _parse_fresh(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.errors = []
+        self.panicking = False
+        self.ast = AST(tokens)
+        self.build_bracket_index()
+        return self.parse()
 
     def parse_top_level(self):
-        if self.current().type=='T_Fn':
+        if self.kinds[self.pos] == T_Fn:
             node = self.parse_function_decl()
         else:
             node = self.parse_statement()
         # optional semicolon
-        if self.current().type=='T_Semicolon': self.eat('T_Semicolon')
+        if self.kinds[self.pos] == T_Semicolon: self.eat(T_Semicolon)
         return node
 
     # --- Statements & Declarations ---
     def parse_statement(self):
-        t = self.current().type
-        if t == 'T_Return':
-            return self.parse_return_stmt()
-        if t == 'T_Break':
-            return self.parse_break_stmt()
-        if t == 'T_Continue':
-            return self.parse_continue_stmt()
-        # # implicit declaration starting with type (no 'let')
-        # if t in ('T_Bool','T_Int','T_LB','T_LP'):
-        #     return self.parse_type_decl()
-        # if t == 'T_Mut':
-        #     return self.parse_let_decl()  # allow "mut x: T = ..."
-        if self.is_assign_stmt():
+        # STATEMENTS (below) picks the statement parser by the first
+        # token's kind; an identifier starts an assignment only if
+        # is_assign_stmt says so, anything else is an expression statement
+        kind = self.kinds[self.pos]
+        if kind == T_Id and self.is_assign_stmt():
             return self.parse_assign_stmt()
-        if t == 'T_Let':
-            return self.parse_let_decl()
-        if t == 'T_If':
-            return self.parse_if_stmt()
-        if t == 'T_Loop':
-            return self.parse_loop_stmt()
-        if t == 'T_Print':
-            return self.parse_print_stmt()
-        return ASTNode('ExprStmt', children=[self.parse_expression()])
+        parse = self.STATEMENTS[kind]
+        if parse is not None:
+            return parse(self)
+        return self.node('ExprStmt', children=[self.parse_expression()])
 
 
     def parse_return_stmt(self):
-        node = ASTNode('ReturnStmt', token=self.eat('T_Return'))
-        if self.current().type not in ('T_Semicolon','T_RC','T_EOF'):
-            node.children.append(self.parse_expression())
-        return node
+        tok = self.eat(T_Return)
+        children = []
+        if self.kinds[self.pos] not in (T_Semicolon,T_RC,T_EOF):
+            children.append(self.parse_expression())
+        return self.node('ReturnStmt', tok, children)
 
     def parse_break_stmt(self):
-        node = ASTNode('BreakStmt', token=self.eat('T_Break'))
-        return node
+        return self.node('BreakStmt', token=self.eat(T_Break))
 
     def parse_continue_stmt(self):
-        node = ASTNode('ContinueStmt', token=self.eat('T_Continue'))
-        return node
+        return self.node('ContinueStmt', token=self.eat(T_Continue))
 
     def parse_let_decl(self):
         # must start with ‘let’
-        if self.current().type != 'T_Let':
+        if self.kinds[self.pos] != T_Let:
            tok = self.current()
-           self.errors.append(f"Expected T_Let at {tok.line}:{tok.col}, got {tok.type}")
+           self.error(self.pos, f"Expected T_Let at {tok.line}:{tok.col}, got {tok.type}")
            # abort—and try to resynchronize
-           return ASTNode('Error')
-        node = ASTNode('LetDecl')
+           return self.node('Error')
+        children = []
         # support both "let mut x" and "mut x"
-        if self.current().type == 'T_Let':
-            node.children.append(ASTNode('LetKw', self.eat('T_Let')))
-        if self.current().type == 'T_Mut':
-            node.children.append(ASTNode('MutKw', self.eat('T_Mut')))
+        if self.kinds[self.pos] == T_Let:
+            children.append(self.node('LetKw', self.eat(T_Let)))
+        if self.kinds[self.pos] == T_Mut:
+            children.append(self.node('MutKw', self.eat(T_Mut)))
         # pattern: identifier or tuple
         pat = self.parse_pattern()
-        node.children.append(ASTNode('Pattern', children=[pat]))
+        children.append(self.node('Pattern', children=[pat]))
         # optional type annotation
-        if self.current().type == 'T_Colon':
-            node.children.append(ASTNode('Colon', self.eat('T_Colon')))
+        if self.kinds[self.pos] == T_Colon:
+            children.append(self.node('Colon', self.eat(T_Colon)))
             # __here__: pass the parse_type() node *as a child*, not as token
-            node.children.append(ASTNode('Type', children=[self.parse_type()]))
+            children.append(self.node('Type', children=[self.parse_type()]))
         # optional initializer
-        if self.current().type == 'T_Assign':
-            node.children.append(ASTNode('Assign', self.eat('T_Assign')))
-            node.children.append(ASTNode('Expr', children=[self.parse_expression()]))
-        return node
+        if self.kinds[self.pos] == T_Assign:
+            children.append(self.node('Assign', self.eat(T_Assign)))
+            children.append(self.node('Expr', children=[self.parse_expression()]))
+        return self.node('LetDecl', children=children)
 
     def parse_assign_stmt(self):
-        node=ASTNode('AssignStmt')
-        node.children.append(self.parse_lvalue())
-        node.children.append(ASTNode('Assign',self.eat('T_Assign')))
-        node.children.append(ASTNode('Expr',children=[self.parse_expression()]))
-        return node
+        children=[self.parse_lvalue()]
+        children.append(self.node('Assign',self.eat(T_Assign)))
+        children.append(self.node('Expr',children=[self.parse_expression()]))
+        return self.node('AssignStmt', children=children)
 
     def parse_pattern(self):
-        if self.current().type=='T_Id': return ASTNode('VarPattern',self.eat('T_Id'))
-        self.eat('T_LP'); pats=[self.parse_pattern()]
-        while self.current().type=='T_Comma': self.eat('T_Comma'); pats.append(self.parse_pattern())
-        self.eat('T_RP'); return ASTNode('TuplePattern',children=pats)
+        if self.kinds[self.pos] == T_Id: return self.node('VarPattern',self.eat(T_Id))
+        # neither a name nor a tuple: report the name it should have been
+        if self.kinds[self.pos] != T_LP: self.eat(T_Id); return self.node('Error')
+        self.eat(T_LP); pats=[self.parse_pattern()]
+        while self.kinds[self.pos] == T_Comma: self.eat(T_Comma); pats.append(self.parse_pattern())
+        self.eat(T_RP); return self.node('TuplePattern',children=pats)
 
     def parse_lvalue(self):
-        node = ASTNode('LValue')
-        base = ASTNode('Id', self.eat('T_Id'))
-        while self.current().type == 'T_LB':
-            self.eat('T_LB')
+        name = self.eat(T_Id)
+        base = self.node('Id', name)
+        while self.kinds[self.pos] == T_LB:
+            self.eat(T_LB)
             idx = self.parse_expression()
-            self.eat('T_RB')
-            base = ASTNode('ArrayIndex', token=base.token, children=[base, idx])
-        node.children.append(base)
-        return node
+            self.eat(T_RB)
+            base = self.node('ArrayIndex', token=name, children=[base, idx])
+        return self.node('LValue', children=[base])
 
     def parse_if_stmt(self):
-        node = ASTNode('IfStmt')
-        node.children.append(ASTNode('IfKw', self.eat('T_If')))
+        children = [self.node('IfKw', self.eat(T_If))]
         # parse full boolean expression condition
         condition = self.parse_expression()
-        node.children.append(ASTNode('Cond', children=[condition]))
+        children.append(self.node('Cond', children=[condition]))
         # then block
-        node.children.append(ASTNode('Then', children=[self.parse_block()]))
+        children.append(self.node('Then', children=[self.parse_block()]))
         # optional else
-        if self.current().type == 'T_Else':
-            node.children.append(ASTNode('ElseKw', self.eat('T_Else')))
-            if self.current().type == 'T_If':
-                node.children.append(self.parse_if_stmt())
+        if self.kinds[self.pos] == T_Else:
+            children.append(self.node('ElseKw', self.eat(T_Else)))
+            if self.kinds[self.pos] == T_If:
+                children.append(self.parse_if_stmt())
             else:
-                node.children.append(ASTNode('Else', children=[self.parse_block()]))
-        return node
+                children.append(self.node('Else', children=[self.parse_block()]))
+        return self.node('IfStmt', children=children)
 
     def parse_loop_stmt(self):
-        node = ASTNode('LoopStmt')
-        node.children.append(ASTNode('LoopKw', self.eat('T_Loop')))
-        node.children.append(ASTNode('Block', children=[self.parse_block()]))
-        return node
+        children = [self.node('LoopKw', self.eat(T_Loop))]
+        children.append(self.node('Block', children=[self.parse_block()]))
+        return self.node('LoopStmt', children=children)
 
     def parse_print_stmt(self):
-        node=ASTNode('PrintStmt'); node.children.append(ASTNode('PrintKw',self.eat('T_Print')))
-        self.eat('T_LP'); node.children.append(ASTNode('FormatStr',self.eat('T_String')))
-        args=[]
-        while self.current().type=='T_Comma':
-            self.eat('T_Comma')
-            if self.current().type=='T_Id' and self.peek().type=='T_Assign':
-                name=self.eat('T_Id'); self.eat('T_Assign'); val=self.parse_expression()
-                args.append(ASTNode('NamedArg',token=name,children=[ASTNode('Value',children=[ASTNode('Expr',children=[val])])]))
+        children=[self.node('PrintKw',self.eat(T_Print))]
+        self.eat(T_LP); children.append(self.node('FormatStr',self.eat(T_String)))
+        while self.kinds[self.pos] == T_Comma:
+            self.eat(T_Comma)
+            if self.is_named_arg():
+                name=self.eat(T_Id); self.eat(T_Assign); val=self.parse_expression()
+                value=self.node('Value',children=[self.node('Expr',children=[val])])
+                children.append(self.node('NamedArg',token=name,children=[value]))
             else:
-                expr=self.parse_expression(); args.append(ASTNode('Expr',children=[expr]))
-        node.children.extend(args); self.eat('T_RP'); return node
+                expr=self.parse_expression(); children.append(self.node('Expr',children=[expr]))
+        self.eat(T_RP); return self.node('PrintStmt', children=children)
 
     def parse_block(self):
-        self.eat('T_LC'); stmts=[]
-        while self.current().type not in ('T_RC','T_EOF'):
+        # without its '{' the block is left empty rather than reading what
+        # follows as its statements; after it, the parser is back in step.
+        # `fn` cannot start a statement, so it ends a block whose '}' is
+        # missing
+        if self.kinds[self.pos] != T_LC: self.eat(T_LC); return self.node('Block')
+        self.eat(T_LC); stmts=[]; self.panicking=False
+        while self.kinds[self.pos] not in (T_RC,T_EOF,T_Fn):
+            start = self.pos
             stmts.append(self.parse_statement())
-            if self.current().type=='T_Semicolon': self.eat('T_Semicolon')
-        self.eat('T_RC'); return ASTNode('Block',children=stmts)
+            if self.panicking: self.recover(start, self.sync_sets()[0])
+            if self.kinds[self.pos] == T_Semicolon: self.eat(T_Semicolon)
+        self.eat(T_RC); return self.node('Block',children=stmts)
 
     def parse_function_decl(self):
-        node = ASTNode('FunctionDecl')
-        node.children.append(ASTNode('FnKw', self.eat('T_Fn')))
-        node.children.append(ASTNode('Id',   self.eat('T_Id')))
+        children = [self.node('FnKw', self.eat(T_Fn))]
+        children.append(self.node('Id',   self.eat(T_Id)))
 
-        self.eat('T_LP')
+        self.eat(T_LP)
         params = []
-        if self.current().type != 'T_RP':
+        if self.kinds[self.pos] != T_RP:
             params = self.parse_param_list()
-        self.eat('T_RP')
-        node.children.append(ASTNode('Params', children=params))
+        self.eat(T_RP)
+        children.append(self.node('Params', children=params))
 
-        if self.current().type == 'T_Arrow':
-            node.children.append(ASTNode('Arrow', self.eat('T_Arrow')))
+        if self.kinds[self.pos] == T_Arrow:
+            children.append(self.node('Arrow', self.eat(T_Arrow)))
             # **changed**: always wrap parse_type() in a Type node
             ret_ty = self.parse_type()
-            node.children.append(ASTNode('ReturnType',
-                                         children=[ ASTNode('Type', children=[ret_ty]) ]))
+            children.append(self.node('ReturnType',
+                                      children=[ self.node('Type', children=[ret_ty]) ]))
 
-        node.children.append(ASTNode('Body', children=[self.parse_block()]))
-        return node
+        children.append(self.node('Body', children=[self.parse_block()]))
+        return self.node('FunctionDecl', children=children)
 
 
     def parse_param_list(self):
         params=[self.parse_param()]
-        while self.current().type=='T_Comma': self.eat('T_Comma'); params.append(self.parse_param())
+        while self.kinds[self.pos] == T_Comma: self.eat(T_Comma); params.append(self.parse_param())
         return params
 
     def parse_param(self):
         # consume the parameter name...
-        name = self.eat('T_Id')
+        name = self.eat(T_Id)
         # ...and wrap it in a VarPattern child so that the semantic phase
         # can see and declare it
-        node = ASTNode('Param')
-        node.children.append(ASTNode('VarPattern', token=name))
+        children = [self.node('VarPattern', token=name)]
         # optional type annotation
-        if self.current().type == 'T_Colon':
-            self.eat('T_Colon')
-            node.children.append(ASTNode('Type', children=[self.parse_type()]))
-        return node
+        if self.kinds[self.pos] == T_Colon:
+            self.eat(T_Colon)
+            children.append(self.node('Type', children=[self.parse_type()]))
+        return self.node('Param', children=children)
 
 
     def parse_type(self):
-        t=self.current().type
-        if t=='T_Bool': return ASTNode('TypeBool',self.eat('T_Bool'))
-        if t=='T_Int':  return ASTNode('TypeI32',self.eat('T_Int'))
-        if t=='T_LB':
-            self.eat('T_LB'); subtype=self.parse_type(); size=None
-            if self.current().type=='T_Semicolon': self.eat('T_Semicolon'); size=ASTNode('Size',self.eat('T_Decimal'))
-            self.eat('T_RB'); children=[subtype]+([size] if size else []); return ASTNode('ArrayType',children=children)
-        if t=='T_LP':
-            self.eat('T_LP'); types=[self.parse_type()]
-            while self.current().type=='T_Comma': self.eat('T_Comma'); types.append(self.parse_type())
-            self.eat('T_RP'); return ASTNode('TupleType',children=types)
-        self.errors.append(f"Unexpected type {t} at {self.current().line}:{self.current().col}")
-        return ASTNode('TypeError')
-
-    PREC={
-        'T_LOp_OR':1,'T_LOp_AND':2,'T_ROp_E':3,'T_ROp_NE':3,'T_ROp_L':4,'T_ROp_LE':4,'T_ROp_G':4,'T_ROp_GE':4,
-        'T_AOp_Trust':5,'T_AOp_MN':5,'T_AOp_ML':6,'T_AOp_DV':6,'T_AOp_RM':6,
-    }
+        t=self.kinds[self.pos]
+        if t==T_Bool: return self.node('TypeBool',self.eat(T_Bool))
+        if t==T_Int:  return self.node('TypeI32',self.eat(T_Int))
+        if t==T_LB:
+            self.eat(T_LB); subtype=self.parse_type(); size=None
+            if self.kinds[self.pos] == T_Semicolon: self.eat(T_Semicolon); size=self.node('Size',self.eat(T_Decimal))
+            self.eat(T_RB); children=[subtype]+([size] if size is not None else []); return self.node('ArrayType',children=children)
+        if t==T_LP:
+            self.eat(T_LP); types=[self.parse_type()]
+            while self.kinds[self.pos] == T_Comma: self.eat(T_Comma); types.append(self.parse_type())
+            self.eat(T_RP); return self.node('TupleType',children=types)
+        tok=self.current()
+        self.error(self.pos, f"Unexpected type {tok.type} at {tok.line}:{tok.col}")
+        return self.node('TypeError')
+
+    # --- kind-indexed jump tables (see kind_table) ---
+    STATEMENTS = kind_table({
+        T_Return: parse_return_stmt, T_Break: parse_break_stmt, T_Continue: parse_continue_stmt,
+        T_Let: parse_let_decl, T_If: parse_if_stmt, T_Loop: parse_loop_stmt, T_Print: parse_print_stmt,
+    })
+
+    # binary operator precedence, 0 for tokens that are not binary operators
+    PREC = kind_table({
+        T_LOp_OR:1,T_LOp_AND:2,T_ROp_E:3,T_ROp_NE:3,T_ROp_L:4,T_ROp_LE:4,T_ROp_G:4,T_ROp_GE:4,
+        T_AOp_Trust:5,T_AOp_MN:5,T_AOp_ML:6,T_AOp_DV:6,T_AOp_RM:6,
+    }, 0)
+
+    # prefix operators: the min_prec of their operand (0 = not a prefix operator)
+    UNARY_PREC = kind_table({T_LOp_NOT: 7, T_AOp_Trust: 5, T_AOp_MN: 5}, 0)
+
+    # primaries that are a single leaf node
+    LEAVES = kind_table({
+        T_Decimal: 'Number', T_Hexadecimal: 'Number', T_String: 'String',
+        T_True: 'BoolLiteral', T_False: 'BoolLiteral',
+    })
 
     def parse_expression(self,min_prec=1):
-        tok=self.current()
-        if tok.type in('T_LOp_NOT','T_AOp_Trust','T_AOp_MN'):
-            op=self.eat(tok.type); rhs=self.parse_expression(self.PREC.get(op.type,7)); lhs=ASTNode('UnaryOp',token=op,children=[rhs])
-        else: lhs=self.parse_primary()
+        # Pratt/precedence-climbing without recursion. `operands` holds built
+        # nodes; `frames` holds what is still open: (min_prec, kind, token,
+        # operand base). Each frame accepts a binary operator whose PREC is
+        # >= its min_prec (a binary op's right side takes prec+1, a unary's
+        # operand UNARY_PREC[op], bracketed sub-expressions 1). A weaker
+        # token closes frames innermost-first. This builds the same trees
+        # the recursive version did, at constant Python stack depth.
+        # frame kinds
+        TOP, UNARY, BINARY, GROUP, INDEX, CALL, TUPLE, ARRAY_FIRST, ARRAY, REPEAT = range(10)
+        prec_of = self.PREC
+        unary_prec = self.UNARY_PREC
+        leaves = self.LEAVES
+        add = self.ast.add
+        kinds = self.kinds
+        frames = [(min_prec, TOP, -1, 0)]
+        operands = []
         while True:
-            op_tok=self.current(); prec=self.PREC.get(op_tok.type,0)
-            if prec<min_prec: break
-            op=self.eat(op_tok.type); rhs=self.parse_expression(prec+1); lhs=ASTNode('BinaryOp',token=op,children=[lhs,rhs])
-        return lhs
-
-    def parse_primary(self):
-        tok = self.current()
-        # numeric literals
-        if tok.type in ('T_Decimal', 'T_Hexadecimal'):
-            return ASTNode('Number', self.eat(tok.type))
-        # string literals
-        if tok.type == 'T_String':
-            return ASTNode('String', self.eat('T_String'))
-        # boolean literals
-        if tok.type in ('T_True', 'T_False'):
-            return ASTNode('BoolLiteral', self.eat(tok.type))
-        # identifiers: variable, function call, or array index
-        if tok.type == 'T_Id':
-            idt = self.eat('T_Id')
-            # function call
-            if self.current().type == 'T_LP':
-                self.eat('T_LP')
-                args = []
-                if self.current().type != 'T_RP':
-                    args = self.parse_expression_list()
-                self.eat('T_RP')
-                return ASTNode('Call', token=idt, children=args)
-            # array indexing
-            if self.current().type == 'T_LB':
-                self.eat('T_LB')
-                idx = self.parse_expression()
-                self.eat('T_RB')
-                return ASTNode('ArrayIndex', token=idt, children=[idx])
-            # simple identifier
-            return ASTNode('Id', token=idt)
-        # tuple literal or grouped expression
-        if tok.type == 'T_LP':
-            # look ahead to see if tuple
-            ahead = [t.type for t in self.tokens[self.pos+1:]]
-            if 'T_Comma' in ahead[:ahead.index('T_RP')]:
-                self.eat('T_LP')
-                elems = self.parse_expression_list()
-                self.eat('T_RP')
-                return ASTNode('TupleLiteral', children=elems)
-            # grouped expression
-            self.eat('T_LP')
-            expr = self.parse_expression()
-            self.eat('T_RP')
-            return expr
+            # --- operand position: prefix operators, then a primary ---
+            # (a token whose kind was just checked is consumed by moving pos;
+            # the stream always ends in T_EOF, so pos+1/pos+2 are in range)
+            pos = self.pos
+            tk = kinds[pos]
+            self.pos = pos + 1
+            if unary_prec[tk]:
+                frames.append((unary_prec[tk], UNARY, pos, 0))
+                continue
+            leaf = leaves[tk]
+            if leaf is not None:
+                operands.append(add(leaf, pos))
+            elif tk == T_Id:
+                nxt = kinds[pos + 1]
+                if nxt == T_LP:
+                    # function call
+                    if kinds[pos + 2] != T_RP:
+                        self.pos = pos + 2
+                        frames.append((1, CALL, pos, len(operands)))
+                        continue
+                    self.pos = pos + 3
+                    operands.append(add('Call', pos))
+                elif nxt == T_LB:
+                    # array indexing
+                    self.pos = pos + 2
+                    frames.append((1, INDEX, pos, 0))
+                    continue
+                else:
+                    operands.append(add('Id', pos))
+            elif tk == T_LP:
+                # tuple if this paren group has a comma at its own level
+                kind = TUPLE if self.tuple_comma[pos] else GROUP
+                frames.append((1, kind, -1, len(operands)))
+                continue
+            elif tk == T_LB:
                 # array literal or repetition [elem; count]
-        if tok.type == 'T_LB':
-            self.eat('T_LB')
-            if self.current().type == 'T_RB':
-                # empty array
-                self.eat('T_RB')
-                return ASTNode('ArrayLiteral', children=[])
-            # parse first element
-            first = self.parse_expression()
-            # repetition syntax [expr; count]
-            if self.current().type == 'T_Semicolon':
-                self.eat('T_Semicolon')
-                count = self.parse_expression()
-                self.eat('T_RB')
-                return ASTNode('ArrayRepeat', children=[first, count])
-            # normal comma-separated literal
-            elems = [first]
-            while self.current().type == 'T_Comma':
-                self.eat('T_Comma')
-                elems.append(self.parse_expression())
-            self.eat('T_RB')
-            return ASTNode('ArrayLiteral', children=elems)
-        # error recovery
-        self.errors.append(f"Unexpected {tok.type} at {tok.line}:{tok.col}")
-        self.pos += 1
-        return ASTNode('Error')
-
-    def parse_expression_list(self):
-        es=[self.parse_expression()]
-        while self.current().type=='T_Comma': self.eat('T_Comma'); es.append(self.parse_expression())
-        return es
+                if kinds[pos + 1] == T_RB:
+                    self.pos = pos + 2
+                    operands.append(add('ArrayLiteral'))
+                else:
+                    frames.append((1, ARRAY_FIRST, -1, len(operands)))
+                    continue
+            else:
+                # error: an Error operand that takes the token, unless the
+                # enclosing statement can resume there (see recover)
+                if self.sync_sets()[0][tk]:
+                    self.pos = pos
+                tok = self.tokens[pos]
+                self.error(pos, f"Unexpected {tok.type} at {tok.line}:{tok.col}")
+                operands.append(add('Error'))
+
+            # --- operator position: shift a binary op or close frames ---
+            while True:
+                pos = self.pos
+                op_kind = kinds[pos]
+                prec = prec_of[op_kind]
+                frame_prec, kind, ftok, base = frames[-1]
+                if prec >= frame_prec:
+                    self.pos = pos + 1
+                    frames.append((prec+1, BINARY, pos, 0))
+                    break
+                if kind == BINARY:
+                    frames.pop(); rhs = operands.pop()
+                    operands[-1] = add('BinaryOp', ftok, [operands[-1], rhs])
+                elif kind == UNARY:
+                    frames.pop()
+                    operands[-1] = add('UnaryOp', ftok, [operands[-1]])
+                elif kind == TOP:
+                    return operands.pop()
+                elif kind == GROUP:
+                    frames.pop(); self.eat(T_RP)
+                elif kind == INDEX:
+                    frames.pop(); self.eat(T_RB)
+                    operands[-1] = add('ArrayIndex', ftok, [operands[-1]])
+                elif op_kind == T_Comma and kind != REPEAT:
+                    self.eat(T_Comma)
+                    if kind == ARRAY_FIRST:
+                        frames[-1] = (1, ARRAY, -1, base)
+                    break
+                elif kind == ARRAY_FIRST and op_kind == T_Semicolon:
+                    self.eat(T_Semicolon)
+                    frames[-1] = (1, REPEAT, -1, base)
+                    break
+                else:
+                    # end of a call / tuple / array list
+                    frames.pop()
+                    items = operands[base:]; del operands[base:]
+                    if kind == CALL:
+                        self.eat(T_RP); operands.append(add('Call', ftok, items))
+                    elif kind == TUPLE:
+                        self.eat(T_RP); operands.append(add('TupleLiteral', children=items))
+                    elif kind == REPEAT:
+                        self.eat(T_RB); operands.append(add('ArrayRepeat', children=items))
+                    else:
+                        self.eat(T_RB); operands.append(add('ArrayLiteral', children=items))
+
+class TableParser(Parser):
+    # Table-driven LL(1) engine over the predict table compiled from
+    # Trust_Grammar.txt (ll1_table.load_predict_table). A single explicit
+    # stack holds grammar symbols and reduce markers (~production); the
+    # value stack collects token indexes and finished values. Reducing a
+    # grammar rule's production calls its BUILDERS method, which makes the
+    # same nodes the recursive-descent methods above do; generated
+    # group/optional/star nonterminals reduce to (alt, values) / None /
+    # reversed lists of (alt, values). Expressions and the two lookahead
+    # decisions reuse Parser's parse_expression, is_assign_stmt and
+    # is_named_arg. Parsing stops at the first error the table detects.
+    BUILDERS = {
+        'Program': 'build_program', 'TopLevel': 'build_top_level',
+        'LetDecl': 'build_let_decl', 'Pattern': 'build_pattern',
+        'PatternList': 'build_list', 'AssignStmt': 'build_assign_stmt',
+        'LValue': 'build_lvalue', 'ReturnStmt': 'build_return_stmt',
+        'BreakStmt': 'build_break_stmt', 'ContinueStmt': 'build_continue_stmt',
+        'IfStmt': 'build_if_stmt', 'LoopStmt': 'build_loop_stmt',
+        'Block': 'build_block', 'PrintStmt': 'build_print_stmt',
+        'ExprStmt': 'build_expr_stmt', 'FunctionDecl': 'build_function_decl',
+        'ParamList': 'build_list', 'Param': 'build_param', 'Type': 'build_type',
+        'TypeList': 'build_list',
+    }
+
+    def __init__(self, tokens, table=None, max_errors=MAX_ERRORS):
+        super().__init__(tokens, max_errors)
+        self.table = table if table is not None else load_predict_table()
+
+    def parse(self):
+        t = self.table
+        ncols = t.n_cols
+        other = ncols - 1
+        cells = t.table
+        column_of = t.column_of
+        column = kind_table({KIND[name]: col for name, col in column_of.items() if name in KIND}, other)
+        cols = [column[k] for k in self.kinds]
+        # per production: what to push when it is predicted, and how to reduce it
+        expand = [tuple(reversed(rhs)) for _, _, _, _, rhs in t.productions]
+        reduce = [(len(rhs), kind, alt,
+                   getattr(self, self.BUILDERS.get(t.nonterminals[origin], 'build_pass')))
+                  for _, kind, alt, origin, rhs in t.productions]
+        predicates = [(getattr(self, m), yes, no) for m, yes, no in t.predicates]
+        externals = {sym: getattr(self, m) for sym, m in t.externals.items()}
+
+        stack = [t.symbol('Program')]
+        values = []
+        pos = 0
+        failed = False
+        while stack:
+            sym = stack.pop()
+            if sym < 0:
+                # reduce
+                n, kind, alt, action = reduce[~sym]
+                vals = values[-n:]; del values[-n:]
+                if kind == RULE:
+                    values.append(action(alt, vals))
+                elif kind == GROUP:
+                    values.append((alt, vals))
+                else:
+                    rest = vals.pop(); rest.append((alt, vals)); values.append(rest)
+            elif sym < ncols:
+                # terminal
+                if cols[pos] != sym:
+                    tok = self.tokens[pos]
+                    self.errors.append(f"Expected {t.terminals[sym]} at {tok.line}:{tok.col}, got {tok.type}")
+                    failed = True
+                    break
+                values.append(pos)
+                pos += 1
+            elif sym in externals:
+                self.pos = pos
+                values.append(externals[sym]())
+                pos = self.pos
+            else:
+                p = cells[(sym - ncols) * ncols + cols[pos]]
+                if p < 0:
+                    if p == -1:
+                        tok = self.tokens[pos]
+                        self.errors.append(f"Unexpected {tok.type} at {tok.line}:{tok.col}")
+                        failed = True
+                        break
+                    test, yes, no = predicates[-2 - p]
+                    self.pos = pos
+                    p = yes if test() else no
+                rhs = expand[p]
+                if rhs:
+                    stack.append(~p)
+                    stack.extend(rhs)
+                else:
+                    # ε: reduce right away
+                    n, kind, alt, action = reduce[p]
+                    values.append([] if kind == DONE else None if kind == EMPTY else action(alt, []))
+        self.pos = pos
+        self.ast.root = self.node('Error') if failed else values[0]
+        return self.ast.node(self.ast.root)
+
+    # --- builders: (alternative, values of its right-hand side) -> value ---
+    @staticmethod
+    def rounds(star):
+        return [vals for _, vals in reversed(star)]
+
+    def build_pass(self, alt, v):
+        return v[0] if len(v) == 1 else v
+
+    def build_list(self, alt, v):
+        # X ("," X)*
+        return [v[0]] + [x for _, x in self.rounds(v[1])]
+
+    def build_program(self, alt, v):
+        return self.node('Program', children=[item for item, in self.rounds(v[0])])
+
+    def build_top_level(self, alt, v):
+        return v[0]
+
+    def build_let_decl(self, alt, v):
+        let, mut, pat, colon, assign = v
+        children = [self.node('LetKw', let)]
+        if mut:
+            children.append(self.node('MutKw', mut[1][0]))
+        children.append(self.node('Pattern', children=[pat]))
+        if colon:
+            tok, typ = colon[1]
+            children.append(self.node('Colon', tok))
+            children.append(self.node('Type', children=[typ]))
+        if assign:
+            tok, expr = assign[1]
+            children.append(self.node('Assign', tok))
+            children.append(self.node('Expr', children=[expr]))
+        return self.node('LetDecl', children=children)
+
+    def build_pattern(self, alt, v):
+        if alt == 0:
+            return self.node('VarPattern', v[0])
+        return self.node('TuplePattern', children=v[1])
+
+    def build_assign_stmt(self, alt, v):
+        lvalue, tok, expr = v
+        return self.node('AssignStmt', children=[
+            lvalue, self.node('Assign', tok), self.node('Expr', children=[expr])])
+
+    def build_lvalue(self, alt, v):
+        name, star = v
+        base = self.node('Id', name)
+        for _, idx, _ in self.rounds(star):
+            base = self.node('ArrayIndex', token=name, children=[base, idx])
+        return self.node('LValue', children=[base])
+
+    def build_return_stmt(self, alt, v):
+        tok, expr = v
+        return self.node('ReturnStmt', tok, [expr[1][0]] if expr else [])
+
+    def build_break_stmt(self, alt, v):
+        return self.node('BreakStmt', v[0])
+
+    def build_continue_stmt(self, alt, v):
+        return self.node('ContinueStmt', v[0])
+
+    def build_if_stmt(self, alt, v):
+        tok, cond, block, tail = v
+        children = [self.node('IfKw', tok),
+                    self.node('Cond', children=[cond]),
+                    self.node('Then', children=[block])]
+        if tail:
+            else_tok, (which, (branch,)) = tail[1]
+            children.append(self.node('ElseKw', else_tok))
+            children.append(branch if which == 0 else self.node('Else', children=[branch]))
+        return self.node('IfStmt', children=children)
+
+    def build_loop_stmt(self, alt, v):
+        return self.node('LoopStmt', children=[
+            self.node('LoopKw', v[0]), self.node('Block', children=[v[1]])])
+
+    def build_block(self, alt, v):
+        return self.node('Block', children=[stmt for stmt, _ in self.rounds(v[1])])
+
+    def build_print_stmt(self, alt, v):
+        tok, _, fmt, star, _ = v
+        children = [self.node('PrintKw', tok), self.node('FormatStr', fmt)]
+        for _, (which, arg) in self.rounds(star):
+            if which == 0:
+                children.append(self.node('Expr', children=arg))
+            else:
+                name, _, expr = arg
+                value = self.node('Value', children=[self.node('Expr', children=[expr])])
+                children.append(self.node('NamedArg', token=name, children=[value]))
+        return self.node('PrintStmt', children=children)
+
+    def build_expr_stmt(self, alt, v):
+        return self.node('ExprStmt', children=v)
+
+    def build_function_decl(self, alt, v):
+        tok, name, _, params, _, ret, body = v
+        children = [self.node('FnKw', tok), self.node('Id', name),
+                    self.node('Params', children=params[1][0] if params else [])]
+        if ret:
+            arrow, typ = ret[1]
+            children.append(self.node('Arrow', arrow))
+            children.append(self.node('ReturnType',
+                                      children=[self.node('Type', children=[typ])]))
+        children.append(self.node('Body', children=[body]))
+        return self.node('FunctionDecl', children=children)
+
+    def build_param(self, alt, v):
+        name, typ = v
+        children = [self.node('VarPattern', token=name)]
+        if typ:
+            children.append(self.node('Type', children=[typ[1][1]]))
+        return self.node('Param', children=children)
+
+    def build_type(self, alt, v):
+        if alt == 0:
+            return self.node('TypeBool', v[0])
+        if alt == 1:
+            return self.node('TypeI32', v[0])
+        if alt == 2:
+            return self.node('TupleType', children=v[1])
+        _, subtype, size, _ = v
+        children = [subtype] + ([self.node('Size', size[1][1])] if size else [])
+        return self.node('ArrayType', children=children)
+
+def _parse_shard(job):
+    """
+    Process-pool worker for Parser.parse_parallel: parse tokens[start:stop]
+    of the shared sequence, followed by its EOF. Returns the shard's arena
+    columns without the Program node, token indexes made global and item
+    roots' parents set to 0 (the parent process relinks them), its items
+    and its errors.
+    """
+    source, start, stop = job
+    tokens = _open_source(source)
+    try:
+        eof = len(tokens) - 1
+        p = Parser(tokens[start:stop] + [tokens[eof]])
+        p.parse()
+    finally:
+        tokens.close()
+    ast = p.ast
+    end, last = ast.root, ast.first[ast.root]
+    shard_eof = stop - start
+    token = array('i', [-1 if t < 0 else (eof if t == shard_eof else t + start) for t in ast.token[:end]])
+    parent = ast.parent[:end]
+    for root, _, _, _ in p.items:
+        parent[root] = 0
+    items = [(root, size, base + start, nodes) for root, size, base, nodes in p.items]
+    return (ast.kind_names, ast.kinds[:end], token, ast.first[:end], ast.count[:end],
+            parent, ast.child_ids[:last], items, p.errors)
+
 
 if __name__=='__main__':
-    # Determine tokens file: use argument or fallback to tokens.txt next to script
+    # Determine tokens file: use argument or fallback to tokens.bin (written by
+    # the Lexer) or the older tokens.txt next to script. --table parses with
+    # the table-driven TableParser instead of recursive descent;
+    # --max-errors N changes how many errors the parser reports before it
+    # gives up (0: no limit).
     script_dir = os.path.dirname(os.path.realpath(__file__))
-    tokens_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, 'tokens.txt')
+    args = [a for a in sys.argv[1:] if a != '--table']
+    engine = TableParser if '--table' in sys.argv[1:] else Parser
+    max_errors = MAX_ERRORS
+    if '--max-errors' in args:
+        i = args.index('--max-errors')
+        try:
+            max_errors = int(args[i + 1]) or None
+        except (IndexError, ValueError):
+            sys.exit("--max-errors needs a number")
+        del args[i:i + 2]
+    if len(args) > 0:
+        tokens_file = args[0]
+    else:
+        tokens_file = os.path.join(script_dir, 'tokens.bin')
+        if not os.path.isfile(tokens_file):
+            tokens_file = os.path.join(script_dir, 'tokens.txt')
     try:
         tokens = load_tokens(tokens_file)
     except FileNotFoundError as e:
         print(e)
-        print("Usage: python Parser.py [tokens_file] [output_filename]")
+        print("Usage: python Parser.py [tokens_file] [output_filename] [--table] [--max-errors N]")
         sys.exit(1)
-    p = Parser(tokens)
+    p = engine(tokens, max_errors=max_errors)
     tree = p.parse()
 
     # --- New saving logic: place output into "../Semantic Analyzer/" directory ---
@@ -419,21 +1403,26 @@ if __name__=='__main__':
     semantic_dir = os.path.abspath(os.path.join(script_dir, os.pardir, "Semantic Analyzer"))
     os.makedirs(semantic_dir, exist_ok=True)
 
-    # Determine output filename (second arg) or default "parser_output.txt"
-    output_name = sys.argv[2] if len(sys.argv) > 2 else 'parse_tree.txt'
+    # Determine output filename (second arg) or default "parse_tree.bin", a
+    # binary AST file (AST.save); a '.txt' name keeps the box-drawing dump
+    output_name = args[1] if len(args) > 1 else 'parse_tree.bin'
     # Place it inside semantic_dir
     output_file = os.path.join(semantic_dir, output_name)
 
     try:
-        with open(output_file, 'w', encoding='utf-8') as out:
-            if p.errors:
+        if p.errors:
+            with open(output_file, 'w', encoding='utf-8') as out:
                 out.write('Errors:\n')
                 for e in p.errors:
                     out.write(e + '\n')
-                print(f"Found {len(p.errors)} errors. See '{output_file}'")
+            print(f"Found {len(p.errors)} errors. See '{output_file}'")
+        else:
+            if output_name.endswith('.txt'):
+                with open(output_file, 'w', encoding='utf-8') as out:
+                    out.write(p.ast.to_tree())
             else:
-                out.write(tree.__repr__())
-                print(f"Parse successful. AST written to '{output_file}'")
+                p.ast.save(output_file)
+            print(f"Parse successful. AST written to '{output_file}'")
     except Exception as e:
         print(f"Failed to write output file '{output_file}': {e}")
         sys.exit(1)
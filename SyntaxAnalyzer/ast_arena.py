@@ -0,0 +1,592 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+# --- Arena AST ---------------------------------------------------------------
+# One syntax tree shared by the parser, the semantic analyzer and the code
+# generator. Nodes are ints indexing flat arrays:
+#   kinds[n]    node type as a small int (AST.kind_names[kind] is its name)
+#   token[n]    index of the node's token in AST.tokens, or -1
+#   first[n]    start of n's children in child_ids
+#   count[n]    number of children
+#   parent[n]   parent node, or -1 for the root
+# Annotations written by the semantic analyzer live in side tables keyed by
+# node: ctype, size (array length), struct_name (tuple struct),
+# return_ctype (FunctionDecl only, None for void) and symbol (on Id, Call
+# and ArrayIndex: the id of the declaration the name resolved to, an index
+# into the analyzer's symbol array).
+#
+# Node is a two-slot view of one entry. It reads like the old per-stage
+# classes: attributes (.typ, .value, .children, .parent) for the semantic
+# analyzer and mapping access (node['typ'], node.get('children', []),
+# 'size' in node) for the code generator's former dict-of-dicts.
+
+NODE_TYPES = (
+    'Program', 'FunctionDecl', 'FnKw', 'Id', 'Params', 'Param', 'VarPattern', 'Type',
+    'Arrow', 'ReturnType', 'Body', 'Block', 'LetDecl', 'LetKw', 'MutKw', 'Pattern',
+    'TuplePattern', 'Colon', 'Assign', 'Expr', 'AssignStmt', 'LValue', 'ArrayIndex',
+    'ReturnStmt', 'BreakStmt', 'ContinueStmt', 'IfStmt', 'IfKw', 'Cond', 'Then',
+    'ElseKw', 'Else', 'LoopStmt', 'LoopKw', 'PrintStmt', 'PrintKw', 'FormatStr',
+    'NamedArg', 'Value', 'ExprStmt', 'UnaryOp', 'BinaryOp', 'Number', 'String',
+    'BoolLiteral', 'Call', 'TupleLiteral', 'ArrayLiteral', 'ArrayRepeat', 'TypeBool',
+    'TypeI32', 'ArrayType', 'Size', 'TupleType', 'TypeError', 'Error',
+)
+
+# side tables, in the key order node_to_dict has always emitted them
+ANNOTATIONS = ('ctype', 'return_ctype', 'size', 'struct_name', 'symbol')
+# the side tables holding numbers; the others hold strings (or None)
+NUMERIC_ANNOTATIONS = ('size', 'symbol')
+
+# --- Binary AST file ---------------------------------------------------------
+# How the stage scripts hand a tree to the next one (parse_tree.bin,
+# syntax_tree.bin). Layout (integers little-endian, sections padded to 8
+# bytes):
+#   header       AST_FILE_HEADER: magic, version, kind count, node count,
+#                child id count, string count, pool size, root, and the
+#                entry count of each side table (in ANNOTATIONS order)
+#   kinds        per kind: u8 name length + ASCII name (AST.kind_names)
+#   nodes        the arena columns: kinds u8, token i32 (a string id, or
+#                -1), first u32, count u32, parent i32; then child_ids u32
+#   offsets      u32 start of each string in the pool, plus the pool end
+#   annotations  per side table: node ids u32, then values i64 (size and
+#                symbol: the number; the others: a string id, or -1 for
+#                None)
+#   pool         UTF-8 bytes of every distinct string: token text and
+#                annotation values
+# AST.save writes it and AST.load reads it back.
+AST_FILE_MAGIC = b'TRAS'
+AST_FILE_VERSION = 2
+AST_FILE_HEADER = struct.Struct('<4sHHIIIIi5I')
+
+# --- Indexed AST file --------------------------------------------------------
+# syntax_tree.bin as the semantic analyzer writes it: the checked program
+# cut at its top-level items, so the code generator can map the file and
+# decode one item at a time. Layout (integers little-endian, sections
+# padded to 8 bytes):
+#   header   INDEX_FILE_HEADER: magic, version, item count, tables size
+#   tables   rows of the program-wide tables given by the writer (the
+#            analyzer's signature table and struct registry), one UTF-8
+#            JSON line `[table name, row]` per row, so a reader can decode
+#            them one at a time
+#   index    INDEX_ENTRY per item: file offset and size of its subtree, and
+#            its node type (index into NODE_TYPES, INDEX_NO_KIND if none)
+#   items    each item's subtree as a binary AST file (the layout above)
+# AST.save_indexed writes it; IndexedASTFile maps it.
+INDEX_FILE_MAGIC = b'TRAI'
+INDEX_FILE_VERSION = 1
+INDEX_FILE_HEADER = struct.Struct('<4sHxxII')
+INDEX_ENTRY = struct.Struct('<QQH6x')
+INDEX_NO_KIND = 0xFFFF
+
+
+class AST:
+    def __init__(self, tokens=None):
+        # tokens: what token[n] indexes - the parser's token sequence (Token
+        # list, TokenBuffer or TokenFile) or, for trees loaded from a dump,
+        # a plain list of value strings
+        self.use_tokens(tokens if tokens is not None else [])
+        self.kind_names = list(NODE_TYPES)
+        self.kind_ids = {name: i for i, name in enumerate(self.kind_names)}
+        self.kinds = array('B')
+        self.token = array('i')
+        self.first = array('I')
+        self.count = array('I')
+        self.parent = array('i')
+        self.child_ids = array('I')
+        self.root = -1
+        for name in ANNOTATIONS:
+            setattr(self, name, {})
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def use_tokens(self, tokens):
+        """Make token[n] index `tokens` (same indexes, e.g. a TokenPool over the old sequence)."""
+        self.tokens = tokens
+        if callable(getattr(tokens, 'lexeme', None)):
+            self.lexeme = tokens.lexeme
+        else:
+            self.__dict__.pop('lexeme', None)
+
+    def lexeme(self, t: int) -> str:
+        tok = self.tokens[t]
+        return tok if isinstance(tok, str) else tok.lexeme
+
+    # --- building ---
+    def kind_id(self, name: str) -> int:
+        kind = self.kind_ids.get(name)
+        if kind is None:
+            kind = self.kind_ids[name] = len(self.kind_names)
+            self.kind_names.append(name)
+        return kind
+
+    def new(self, typ: str, token: int = -1) -> int:
+        """Allocate a childless node; give it children later with set_children."""
+        n = len(self.kinds)
+        self.kinds.append(self.kind_id(typ))
+        self.token.append(token)
+        self.first.append(0)
+        self.count.append(0)
+        self.parent.append(-1)
+        return n
+
+    def set_children(self, n: int, children):
+        """Store `children` as n's contiguous child range (replacing any old one)."""
+        self.relink_children(n, children, children)
+
+    def relink_children(self, n: int, children, adopted):
+        """set_children when only `adopted` (a subset of children) may not have n as parent yet."""
+        if self.count[n] and self.first[n] + self.count[n] == len(self.child_ids):
+            del self.child_ids[self.first[n]:]     # the old range is last: reuse its space
+        self.first[n] = len(self.child_ids)
+        self.child_ids.extend(children)
+        self.count[n] = len(self.child_ids) - self.first[n]
+        for c in adopted:
+            self.parent[c] = n
+
+    def add(self, typ: str, token: int = -1, children=()) -> int:
+        n = self.new(typ, token)
+        if children:
+            self.set_children(n, children)
+        return n
+
+    def annotate(self, n: int, **values):
+        """Set side-table entries of node n; None removes any but return_ctype."""
+        for name, value in values.items():
+            table = getattr(self, name)
+            if value is None and name != 'return_ctype':
+                table.pop(n, None)
+            else:
+                table[n] = value
+
+    # --- reading ---
+    def typ(self, n: int) -> str:
+        return self.kind_names[self.kinds[n]]
+
+    def value(self, n: int):
+        t = self.token[n]
+        return None if t < 0 else self.lexeme(t)
+
+    def children(self, n: int):
+        start = self.first[n]
+        return self.child_ids[start:start + self.count[n]]
+
+    def node(self, n: int):
+        return None if n < 0 else Node(self, n)
+
+    # --- interchange ---
+    def to_tree(self, n: int = None) -> str:
+        """Box-drawing text dump, the format parse_tree_from_file reads."""
+        lines = []
+        stack = [(self.root if n is None else n, '', True)]
+        while stack:
+            n, prefix, is_last = stack.pop()
+            label = self.typ(n)
+            if self.token[n] >= 0:
+                label = f"{label}: '{self.value(n)}'"
+            lines.append(prefix + ('└── ' if is_last else '├── ') + label)
+            new_prefix = prefix + ('    ' if is_last else '│   ')
+            kids = self.children(n)
+            for i in range(len(kids) - 1, -1, -1):
+                stack.append((kids[i], new_prefix, i == len(kids) - 1))
+        return '\n'.join(lines)
+
+    def to_dict(self, n: int = None) -> dict:
+        """Nested dicts as written to syntax_tree.json."""
+        n = self.root if n is None else n
+        d = {
+            "typ": self.typ(n),
+            "value": self.value(n),
+            "children": [self.to_dict(c) for c in self.children(n)],
+        }
+        for name in ANNOTATIONS:
+            table = getattr(self, name)
+            if n in table:
+                d[name] = table[n]
+        return d
+
+    def save(self, path: str):
+        """Write the arena (nodes, token text, side tables) as a binary AST file."""
+        with open(path, 'wb') as f:
+            f.write(self.dump())
+
+    def dump(self) -> bytes:
+        """The binary AST file contents for this arena (see save)."""
+        strings = {}
+        string_id = strings.setdefault
+        lexeme = self.lexeme
+        token = array('i', [t if t < 0 else string_id(lexeme(t), len(strings)) for t in self.token])
+        tables = []
+        for name in ANNOTATIONS:
+            table = getattr(self, name)
+            if name in NUMERIC_ANNOTATIONS:
+                values = array('q', table.values())
+            else:
+                values = array('q', [-1 if v is None else string_id(v, len(strings))
+                                     for v in table.values()])
+            tables.append((array('I', table), values))
+        encoded = [text.encode('utf-8') for text in strings]
+        offsets = array('I', [0])
+        for raw in encoded:
+            offsets.append(offsets[-1] + len(raw))
+
+        out = bytearray(AST_FILE_HEADER.pack(
+            AST_FILE_MAGIC, AST_FILE_VERSION, len(self.kind_names), len(self.kinds),
+            len(self.child_ids), len(strings), offsets[-1], self.root,
+            *(len(nodes) for nodes, _ in tables)))
+        for name in self.kind_names:
+            raw = name.encode('ascii')
+            out.append(len(raw))
+            out += raw
+        for arr in (self.kinds, token, self.first, self.count, self.parent, self.child_ids,
+                    offsets, *(arr for pair in tables for arr in pair)):
+            out += bytes(-len(out) % 8)
+            out += _le(arr)
+        out += b''.join(encoded)
+        return bytes(out)
+
+    def save_indexed(self, path: str, tables: dict):
+        """
+        Write the tree as an indexed AST file: one binary AST per top-level
+        item, behind an offset index and the program-wide `tables`.
+        """
+        items = self.children(self.root)
+        blobs = [self.subtree(n).dump() for n in items]
+        raw = b''.join(json.dumps([name, row], separators=(',', ':')).encode('utf-8') + b'\n'
+                       for name, rows in tables.items() for row in rows)
+        out = bytearray(INDEX_FILE_HEADER.pack(INDEX_FILE_MAGIC, INDEX_FILE_VERSION,
+                                               len(items), len(raw)))
+        out += raw
+        out += bytes(-len(out) % 8)
+        at = len(out) + INDEX_ENTRY.size * len(items)
+        for n, blob in zip(items, blobs):
+            kind = NODE_TYPES.index(self.typ(n)) if self.typ(n) in NODE_TYPES else INDEX_NO_KIND
+            out += INDEX_ENTRY.pack(at, len(blob), kind)
+            at += len(blob) + (-len(blob) % 8)
+        for blob in blobs:
+            out += blob
+            out += bytes(-len(blob) % 8)
+        with open(path, 'wb') as f:
+            f.write(out)
+
+    @classmethod
+    def load(cls, path: str):
+        """Read a binary AST file (see save), or a whole indexed one, into a new arena."""
+        if is_indexed_ast_file(path):
+            with IndexedASTFile(path) as f:
+                return f.program()
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read(), path)
+
+    @classmethod
+    def from_bytes(cls, data, path: str = '<bytes>'):
+        """Decode binary AST file contents (bytes, or a view into a map) into a new arena."""
+        data = memoryview(data)
+        (magic, version, n_kinds, n_nodes, n_child_ids, n_strings, pool_size,
+         root, *n_entries) = AST_FILE_HEADER.unpack_from(data)
+        if magic != AST_FILE_MAGIC or version != AST_FILE_VERSION:
+            raise ValueError(f"Unsupported AST file '{path}' (version {version})")
+        at = AST_FILE_HEADER.size
+        kind_names = []
+        for _ in range(n_kinds):
+            size = data[at]
+            kind_names.append(str(data[at+1:at+1+size], 'ascii'))
+            at += 1 + size
+
+        def take(typecode, count):
+            nonlocal at
+            at += -at % 8
+            arr = array(typecode)
+            arr.frombytes(data[at:at + arr.itemsize * count])
+            if sys.byteorder == 'big':
+                arr.byteswap()
+            at += arr.itemsize * count
+            return arr
+
+        kinds = take('B', n_nodes)
+        token = take('i', n_nodes)
+        first = take('I', n_nodes)
+        count = take('I', n_nodes)
+        parent = take('i', n_nodes)
+        child_ids = take('I', n_child_ids)
+        offsets = take('I', n_strings + 1)
+        tables = [(take('I', n), take('q', n)) for n in n_entries]
+        pool = data[at:at + pool_size]
+        strings = [str(pool[offsets[i]:offsets[i+1]], 'utf-8') for i in range(n_strings)]
+
+        ast = cls(strings)
+        ast.kind_names = kind_names
+        ast.kind_ids = {name: i for i, name in enumerate(kind_names)}
+        ast.kinds, ast.token, ast.first, ast.count = kinds, token, first, count
+        ast.parent, ast.child_ids, ast.root = parent, child_ids, root
+        for name, (nodes, values) in zip(ANNOTATIONS, tables):
+            if name not in NUMERIC_ANNOTATIONS:
+                values = [None if v < 0 else strings[v] for v in values]
+            setattr(ast, name, dict(zip(nodes, values)))
+        return ast
+
+    def subtree(self, n: int):
+        """A new arena holding a copy of n's subtree (see graft)."""
+        ast = AST([])
+        ast.root = ast.graft(self, n)
+        return ast
+
+    def graft(self, src, n: int) -> int:
+        """
+        Copy the subtree of node n of arena `src` into this one, whose
+        tokens must be a plain list of value strings; returns the copy's
+        id. The copy has no parent until it is given to one.
+        """
+        first, count, child_ids = src.first, src.count, src.child_ids
+        order = []
+        stack = [n]
+        while stack:
+            m = stack.pop()
+            order.append(m)
+            if count[m]:
+                stack.extend(reversed(child_ids[first[m]:first[m] + count[m]]))
+        base = len(self.kinds)
+        copy = {m: base + i for i, m in enumerate(order)}
+
+        kind_map = [self.kind_id(name) for name in src.kind_names]
+        self.kinds.extend([kind_map[src.kinds[m]] for m in order])
+        values = self.tokens
+        token = src.token
+        lexeme = src.lexeme
+        for m in order:
+            t = token[m]
+            if t < 0:
+                self.token.append(-1)
+            else:
+                self.token.append(len(values))
+                values.append(lexeme(t))
+        self.parent.append(-1)
+        self.parent.extend([copy[src.parent[m]] for m in order[1:]])
+        at = len(self.child_ids)
+        kids = []
+        for m in order:
+            c = count[m]
+            self.first.append(at + len(kids) if c else 0)
+            self.count.append(c)
+            if c:
+                kids.extend(child_ids[first[m]:first[m] + c])
+        self.child_ids.extend([copy[c] for c in kids])
+        for name in ANNOTATIONS:
+            source = getattr(src, name)
+            getattr(self, name).update((copy[m], source[m]) for m in order if m in source)
+        return base
+
+    @classmethod
+    def from_dict(cls, tree: dict):
+        """Load syntax_tree.json dicts (see to_dict) into a new arena."""
+        values = []
+        ast = cls(values)
+        pending = [(tree, -1)]
+        order = []
+        while pending:
+            d, parent = pending.pop()
+            token = -1
+            if d.get('value') is not None:
+                token = len(values)
+                values.append(d['value'])
+            n = ast.new(d['typ'], token)
+            for name in ANNOTATIONS:
+                if name in d:
+                    getattr(ast, name)[n] = d[name]
+            order.append((n, parent))
+            for c in reversed(d.get('children', [])):
+                pending.append((c, n))
+        kids = {}
+        for n, parent in order:
+            if parent >= 0:
+                kids.setdefault(parent, []).append(n)
+        for n, children in kids.items():
+            ast.set_children(n, children)
+        ast.root = order[0][0] if order else -1
+        return ast
+
+
+def is_ast_file(path: str) -> bool:
+    """Whether `path` is a binary AST file (AST.save or AST.save_indexed) rather than a text dump."""
+    with open(path, 'rb') as f:
+        return f.read(len(AST_FILE_MAGIC)) in (AST_FILE_MAGIC, INDEX_FILE_MAGIC)
+
+
+def is_indexed_ast_file(path: str) -> bool:
+    """Whether `path` is an indexed AST file (AST.save_indexed)."""
+    with open(path, 'rb') as f:
+        return f.read(len(INDEX_FILE_MAGIC)) == INDEX_FILE_MAGIC
+
+
+class IndexedASTFile:
+    """
+    Memory-mapped indexed AST file. Only the header is read on open;
+    table(name) decodes rows one at a time and item(i) decodes one
+    top-level item into its own small arena, so a reader that drops each
+    row and item after use holds one at a time whatever the size of the
+    program.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, version, n_items, tables_size = INDEX_FILE_HEADER.unpack_from(view)
+        if magic != INDEX_FILE_MAGIC or version != INDEX_FILE_VERSION:
+            raise ValueError(f"Unsupported indexed AST file '{path}' (version {version})")
+        at = INDEX_FILE_HEADER.size
+        self._tables = (at, at + tables_size)
+        at += tables_size + (-tables_size % 8)
+        self._index_at = at
+        self._count = n_items
+        self._view = view
+
+    def __len__(self):
+        return self._count
+
+    def table(self, name: str):
+        """The rows the writer gave for table `name`, decoded as they are read."""
+        at, end = self._tables
+        while at < end:
+            stop = self._map.find(b'\n', at, end)
+            table, row = json.loads(str(self._view[at:stop], 'utf-8'))
+            if table == name:
+                yield row
+            at = stop + 1
+
+    def _entry(self, i: int):
+        # (offset, size, kind), read from the map rather than kept in a list
+        if not 0 <= i < self._count:
+            raise IndexError('item index out of range')
+        return INDEX_ENTRY.unpack_from(self._view, self._index_at + i * INDEX_ENTRY.size)
+
+    def item_type(self, i: int):
+        """Node type of item i (None for a type outside NODE_TYPES), without decoding it."""
+        kind = self._entry(i)[2]
+        return NODE_TYPES[kind] if kind < len(NODE_TYPES) else None
+
+    def item(self, i: int) -> AST:
+        """Decode item i; its node is ast.node(ast.root)."""
+        offset, size, _ = self._entry(i)
+        return AST.from_bytes(self._view[offset:offset + size], self.path)
+
+    def program(self) -> AST:
+        """Every item back under one Program node, as AST.load returns it."""
+        ast = AST([])
+        ast.root = ast.new('Program')
+        ast.set_children(ast.root, [ast.graft(item, item.root) for item in map(self.item, range(len(self)))])
+        return ast
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+class TokenPool:
+    """
+    Append-only token store for an AST that outlives its token sequence.
+    Indexes below len(base) are the original sequence; tokens of later
+    reparses are appended, so existing token[n] references never move.
+    """
+    def __init__(self, base):
+        self.base = base
+        self.split = len(base)
+        self.extra = []
+        if callable(getattr(base, 'lexeme', None)):
+            self._base_lexeme = base.lexeme
+        else:
+            self._base_lexeme = lambda t: self.base[t].lexeme
+
+    def __len__(self):
+        return self.split + len(self.extra)
+
+    def __getitem__(self, t):
+        return self.base[t] if t < self.split else self.extra[t - self.split]
+
+    def lexeme(self, t: int) -> str:
+        if t < self.split:
+            return self._base_lexeme(t)
+        return self.extra[t - self.split].lexeme
+
+    def extend(self, tokens) -> int:
+        """Append tokens; returns the index of the first one."""
+        start = len(self)
+        self.extra.extend(tokens)
+        return start
+
+
+class Node:
+    """Flyweight view of node `id` in an AST."""
+    __slots__ = ('ast', 'id')
+
+    def __init__(self, ast: AST, id: int):
+        self.ast = ast
+        self.id = id
+
+    @property
+    def typ(self): return self.ast.typ(self.id)
+
+    nodetype = typ
+
+    @property
+    def value(self): return self.ast.value(self.id)
+
+    @property
+    def token(self):
+        t = self.ast.token[self.id]
+        return None if t < 0 else self.ast.tokens[t]
+
+    @property
+    def children(self):
+        ast = self.ast
+        return [Node(ast, c) for c in ast.children(self.id)]
+
+    @property
+    def parent(self):
+        return self.ast.node(self.ast.parent[self.id])
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and other.ast is self.ast and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.ast), self.id))
+
+    def __repr__(self):
+        return f"Node({self.typ}, {self.value}, children={self.ast.count[self.id]})"
+
+    # --- mapping access (the code generator's view) ---
+    def __getitem__(self, key):
+        if key == 'typ':
+            return self.typ
+        if key == 'value':
+            return self.value
+        if key == 'children':
+            return self.children
+        if key in ANNOTATIONS:
+            table = getattr(self.ast, key)
+            if self.id in table:
+                return table[self.id]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in ('typ', 'value', 'children'):
+            return True
+        return key in ANNOTATIONS and self.id in getattr(self.ast, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
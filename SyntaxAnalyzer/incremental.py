@@ -0,0 +1,88 @@
+import os
+import re
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+LEXER_DIR = os.path.join(SCRIPT_DIR, os.pardir, 'Lexer')
+if LEXER_DIR not in sys.path:
+    sys.path.insert(0, LEXER_DIR)
+
+from Lexer import Lexer
+from Parser import Parser
+
+# --- Incremental parsing -----------------------------------------------------
+# Keeps a source text, its trivia-free tokens and its tree in step under
+# text edits. An edit relexes only the tokens around it (Lexer.relex) and
+# reparses only the top-level items those tokens fall in (Parser.reparse);
+# every other item keeps its subtree, so the cost of an edit follows the
+# size of the items it touches rather than the size of the file.
+
+
+class ParserToken:
+    """A Lexer Token as the Parser reads it (type name, .col). Positions stay live across relex."""
+    __slots__ = ('tok',)
+
+    def __init__(self, tok):
+        self.tok = tok
+
+    @property
+    def type(self): return self.tok.type.name
+
+    @property
+    def lexeme(self): return self.tok.lexeme
+
+    @property
+    def line(self): return self.tok.line
+
+    @property
+    def col(self): return self.tok.column
+
+
+class IncrementalParser:
+    def __init__(self, source: str):
+        self.lexer = Lexer(source, skip_trivia=True)
+        self.lexed = self.lexer.tokenize()
+        self.parser = Parser([ParserToken(tok) for tok in self.lexed])
+        self.tree = self.parser.parse()
+
+    @property
+    def source(self) -> str:
+        return self.lexer.text
+
+    @property
+    def errors(self) -> list:
+        return self.parser.errors
+
+    def edit(self, offset: int, removed: int, inserted: str):
+        """Replace source[offset:offset+removed] with `inserted`; returns the new tree."""
+        old_count = len(self.lexed)
+        first, stop = self.lexer.relex(self.lexed, offset, removed, inserted)
+        old_stop = stop - (len(self.lexed) - old_count)
+        # a new list: the parser's token pool keeps reading the old one
+        old = self.parser.tokens
+        tokens = old[:first] + [ParserToken(tok) for tok in self.lexed[first:stop]] + old[old_stop:]
+        self.tree = self.parser.reparse(tokens, first, stop)
+        return self.tree
+
+
+if __name__ == '__main__':
+    # Usage: python incremental.py <source file>
+    # Reparses after each edit read from stdin as `offset removed text`
+    # (text may use \n and \\ escapes) and prints the tree or the errors.
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python incremental.py <source file>")
+    with open(sys.argv[1], encoding='utf-8') as f:
+        inc = IncrementalParser(f.read())
+    for line in sys.stdin:
+        parts = line.rstrip('\n').split(' ', 2)
+        if len(parts) < 2:
+            continue
+        # expand only \n and \\, in one pass so '\\n' stays a backslash and an n;
+        # any other text, non-ASCII included, is taken as is
+        text = re.sub(r'\\([n\\])', lambda m: '\n' if m[1] == 'n' else '\\',
+                      parts[2]) if len(parts) > 2 else ''
+        inc.edit(int(parts[0]), int(parts[1]), text)
+        if inc.errors:
+            print('Errors:\n' + '\n'.join(inc.errors))
+        else:
+            print(inc.parser.ast.to_tree())
@@ -0,0 +1,792 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from array import array
+
+# --- LL(1) predict table -----------------------------------------------------
+# Compiles Trust_Grammar.txt into the predict table TableParser runs on.
+#
+# The EBNF is desugared to BNF first: every X? / X* / (...)? / (...)* and
+# every inline group with alternatives becomes a generated nonterminal named
+# after the rule it appears in ('LetDecl.1', 'LetDecl.2', ...); a group with
+# one alternative and no suffix is spliced in place. Rules whose only
+# right-hand side is a /regex/ (<Id>, <Decimal>, ...) are token classes and
+# map to lexer token types like the quoted literals do (TERMINALS).
+#
+# FIRST is computed over the whole grammar, FOLLOW and the table only over
+# the rules reachable from START, both as terminal bitsets solved by
+# worklists (GrammarSets). Each production goes into the cells for
+# FIRST(rhs), plus FOLLOW(lhs) when rhs can derive ε. The grammar is not
+# LL(1) as written; a cell predicted by several productions is resolved by
+#   - greed: the one production predicted by FIRST wins over ε-productions
+#     predicted by FOLLOW (the dangling else), which is what the
+#     recursive-descent parser does;
+#   - PREDICATES: two productions on the same token, one of them named by
+#     (rule, first symbol); a Parser method decides, e.g. an Id starting a
+#     statement is an assignment iff Parser.is_assign_stmt().
+# Anything else raises GrammarError. Where FOLLOW is wider than what the
+# recursive-descent parser accepts after an optional, EMPTY_FOLLOW narrows
+# the tokens its ε is predicted on: `return` takes no <Expression> only
+# before ";", "}" or EOF, so `return let ...` is an error, not two
+# statements. Every cell with more than one
+# candidate is listed in the table's conflict report with how it was
+# resolved; REPORT_FILE (predict_table.json) holds the report with the
+# table, FIRST/FOLLOW and productions for tools (ff-calculator.py and
+# predict-table-generator.py render it for people).
+#
+# EXTERNAL nonterminals are not expanded through the table: the engine calls
+# the named Parser method instead. <Expression> goes to the precedence
+# engine, since `<UnaryExpr> (<BinaryOp> <Expression>)*` carries no
+# precedence (that lives in Parser.PREC).
+#
+# The table also keeps FIRST and FOLLOW of each nonterminal (terminals only):
+# the recursive-descent Parser resynchronizes on them after a syntax error.
+#
+# Compiled tables are cached in binary form (CACHE_FILE) under a SHA-256 of
+# the grammar text and the settings below, so editing the grammar recompiles
+# it on the next load; the report carries the same digest and is only
+# rewritten when it changes.
+
+SCRIPT_DIR   = os.path.dirname(os.path.realpath(__file__))
+GRAMMAR_FILE = os.path.join(SCRIPT_DIR, 'Trust_Grammar.txt')
+CACHE_FILE   = os.path.join(SCRIPT_DIR, '__pycache__', 'predict_table.bin')
+REPORT_FILE  = os.path.join(SCRIPT_DIR, 'predict_table.json')
+
+EPSILON = 'ε'
+START = 'Program'
+
+# grammar spelling -> TokenType name
+TERMINALS = {
+    '"let"': 'T_Let', '"mut"': 'T_Mut', '"fn"': 'T_Fn', '"return"': 'T_Return',
+    '"break"': 'T_Break', '"continue"': 'T_Continue', '"if"': 'T_If',
+    '"else"': 'T_Else', '"loop"': 'T_Loop', '"println!"': 'T_Print',
+    '"bool"': 'T_Bool', '"i32"': 'T_Int', '"true"': 'T_True', '"false"': 'T_False',
+    '"("': 'T_LP', '")"': 'T_RP', '"["': 'T_LB', '"]"': 'T_RB', '"{"': 'T_LC',
+    '"}"': 'T_RC', '","': 'T_Comma', '":"': 'T_Colon', '";"': 'T_Semicolon',
+    '"="': 'T_Assign', '"->"': 'T_Arrow', '"!"': 'T_LOp_NOT', '"||"': 'T_LOp_OR',
+    '"&&"': 'T_LOp_AND', '"=="': 'T_ROp_E', '"!="': 'T_ROp_NE', '"<"': 'T_ROp_L',
+    '"<="': 'T_ROp_LE', '">"': 'T_ROp_G', '">="': 'T_ROp_GE', '"+"': 'T_AOp_Trust',
+    '"-"': 'T_AOp_MN', '"*"': 'T_AOp_ML', '"/"': 'T_AOp_DV', '"%"': 'T_AOp_RM',
+    'Id': 'T_Id', 'Decimal': 'T_Decimal', 'Hexadecimal': 'T_Hexadecimal',
+    'StringLiteral': 'T_String', 'EOF': 'T_EOF',
+}
+
+# nonterminal -> Parser method that parses it
+EXTERNAL = {'Expression': 'parse_expression'}
+
+# (rule, first symbol of the preferred production) -> Parser predicate
+PREDICATES = {
+    ('Statement', 'AssignStmt'): 'is_assign_stmt',
+    ('PrintStmt', 'T_Id'): 'is_named_arg',
+}
+
+# rule -> the only tokens the ε of its optionals is predicted on
+EMPTY_FOLLOW = {
+    'ReturnStmt': ('T_Semicolon', 'T_RC', 'T_EOF'),
+}
+
+# production kinds: how the engine turns a reduced production's values
+# into the value of its left-hand side
+RULE  = 0   # an alternative of a grammar rule: TableParser.BUILDERS
+GROUP = 1   # alternative `alt` of a generated group/optional: (alt, values)
+EMPTY = 2   # the ε of an optional: None
+MORE  = 3   # one more round of a star: appends (alt, values) to the rest
+DONE  = 4   # the end of a star: [] (rounds come out last-first)
+
+TABLE_FILE_MAGIC = b'TRLL'
+TABLE_FILE_VERSION = 3
+TABLE_FILE_HEADER = struct.Struct('<4sH32sHHHHHHHHH')
+
+ERROR = -1  # table cell with no production; predicates are stored as -2 - k
+
+# how a conflict was resolved (PredictTable.conflicts); k >= 0 is predicates[k]
+GREED = -1
+UNRESOLVED = -2
+
+
+class GrammarError(Exception):
+    pass
+
+
+# --- EBNF reader ---------------------------------------------------------------
+RULE_RE = re.compile(r'<([^>]+)>\s*::=(.*)')
+EBNF_TOKEN_RE = re.compile(r'\s*(?:(/(?:[^/\\]|\\.)*/)|("[^"]*")|<([^>]+)>|(\w+)|([()|?*]))')
+
+
+def read_grammar(text):
+    """
+    Rule name -> alternatives, in file order. An alternative is a list of
+    (atom, suffix) items, an atom is ('sym', spelling), ('regex', pattern)
+    or ('group', alternatives), and suffix is '', '?' or '*'.
+    """
+    sources = {}
+    name = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith('//'):
+            continue
+        m = RULE_RE.match(line)
+        if m:
+            name = m.group(1).strip()
+            if name in sources:
+                raise GrammarError(f"Rule <{name}> defined twice")
+            sources[name] = m.group(2)
+        elif name is not None:
+            # continuation line ("| ...") of the rule above
+            sources[name] += ' ' + line
+        else:
+            raise GrammarError(f"Text before the first rule: {line!r}")
+    return {name: _read_alternatives(name, body) for name, body in sources.items()}
+
+
+def _read_alternatives(name, body):
+    tokens = []
+    at = 0
+    body = body.rstrip()
+    while at < len(body):
+        m = EBNF_TOKEN_RE.match(body, at)
+        if not m:
+            raise GrammarError(f"Cannot read <{name}> at {body[at:]!r}")
+        regex, literal, angle, word, punct = m.groups()
+        if regex:
+            tokens.append(('regex', regex[1:-1]))
+        elif literal:
+            tokens.append(('sym', literal))
+        elif angle or word:
+            tokens.append(('sym', angle or word))
+        else:
+            tokens.append(('punct', punct))
+        at = m.end()
+    tokens.append(('punct', 'end'))
+
+    pos = 0
+
+    def alternatives():
+        nonlocal pos
+        alts = [sequence()]
+        while tokens[pos] == ('punct', '|'):
+            pos += 1
+            alts.append(sequence())
+        return alts
+
+    def sequence():
+        nonlocal pos
+        items = []
+        while True:
+            kind, value = tokens[pos]
+            if kind == 'punct' and value == '(':
+                pos += 1
+                atom = ('group', alternatives())
+                if tokens[pos] != ('punct', ')'):
+                    raise GrammarError(f"Unclosed '(' in <{name}>")
+            elif kind == 'punct':
+                return items
+            else:
+                atom = (kind, value)
+            pos += 1
+            suffix = ''
+            if tokens[pos] in (('punct', '?'), ('punct', '*')):
+                suffix = tokens[pos][1]
+                pos += 1
+            items.append((atom, suffix))
+
+    alts = alternatives()
+    if tokens[pos] != ('punct', 'end'):
+        raise GrammarError(f"Unexpected {tokens[pos][1]!r} in <{name}>")
+    return alts
+
+
+# --- Desugaring to BNF -----------------------------------------------------------
+class Grammar:
+    """BNF productions (lhs, rhs, kind, alt, origin rule) of an EBNF grammar."""
+    def __init__(self, rules):
+        self.rules = rules
+        # <Id> ::= /.../ and friends are token classes, not rules
+        self.token_classes = {name for name, alts in rules.items()
+                              if all(len(a) == 1 and a[0][0][0] == 'regex' for a in alts)}
+        self.nonterminals = [name for name in rules if name not in self.token_classes]
+        self.productions = []
+        self._generated = {}
+        for name in list(self.nonterminals):
+            for alt, items in enumerate(rules[name]):
+                self.productions.append((name, self._symbols(items, name), RULE, alt, name))
+
+    def terminal(self, spelling):
+        if spelling in TERMINALS:
+            return TERMINALS[spelling]
+        raise GrammarError(f"No token type for {spelling} (add it to TERMINALS)")
+
+    def _symbol(self, spelling):
+        if spelling in self.rules and spelling not in self.token_classes:
+            return spelling
+        if spelling.startswith('"') or spelling in self.token_classes or spelling in TERMINALS:
+            return self.terminal(spelling)
+        raise GrammarError(f"Undefined symbol <{spelling}>")
+
+    def _fresh(self, origin):
+        n = self._generated[origin] = self._generated.get(origin, 0) + 1
+        name = f"{origin}.{n}"
+        self.nonterminals.append(name)
+        return name
+
+    def _symbols(self, items, origin):
+        out = []
+        for atom, suffix in items:
+            kind, value = atom
+            if kind == 'regex':
+                raise GrammarError(f"Inline /regex/ in <{origin}>; give it a rule of its own")
+            if kind == 'sym' and not suffix:
+                out.append(self._symbol(value))
+                continue
+            if kind == 'group' and not suffix and len(value) == 1:
+                out.extend(self._symbols(value[0], origin))
+                continue
+            alts = value if kind == 'group' else [[(atom, '')]]
+            name = self._fresh(origin)
+            bodies = [self._symbols(a, origin) for a in alts]
+            if suffix == '*':
+                for i, body in enumerate(bodies):
+                    self.productions.append((name, body + [name], MORE, i, origin))
+                self.productions.append((name, [], DONE, 0, origin))
+            else:
+                for i, body in enumerate(bodies):
+                    self.productions.append((name, body, GROUP, i, origin))
+                if suffix == '?':
+                    self.productions.append((name, [], EMPTY, 0, origin))
+            out.append(name)
+        return out
+
+
+# --- FIRST / FOLLOW ----------------------------------------------------------------
+# Sets of terminals are ints with one bit per terminal (GrammarSets.bit),
+# and ε is kept apart as the nullable set. Each is solved by a worklist:
+# the productions are read once into constraints "FIRST(B) feeds
+# FIRST(A)" (resp. FOLLOW), and a set is only pushed on to the sets it
+# feeds when it has grown, instead of sweeping every production until a
+# whole pass changes nothing.
+class GrammarSets:
+    """
+    Nullable nonterminals, FIRST (every nonterminal) and FOLLOW (those in
+    `used`) of a Grammar, as terminal bitsets. Productions of EXTERNAL
+    nonterminals add nothing to FOLLOW: the table never expands them.
+    """
+    def __init__(self, grammar, used, start=START):
+        nts = set(grammar.nonterminals)
+        self.terminals = sorted({s for _, rhs, *_ in grammar.productions for s in rhs if s not in nts}
+                                | {'T_EOF'})
+        self.bit = {t: 1 << i for i, t in enumerate(self.terminals)}
+        self.nullable = self._nullable(grammar.productions)
+        self.first = self._first(grammar)
+        self.follow = self._follow(grammar.productions, used, start)
+
+    def first_of(self, seq):
+        """(FIRST bits, nullable) of a sequence of symbols."""
+        bits = 0
+        for sym in seq:
+            if sym in self.bit:
+                return bits | self.bit[sym], False
+            bits |= self.first[sym]
+            if sym not in self.nullable:
+                return bits, False
+        return bits, True
+
+    def names(self, bits):
+        """The terminals of a bitset, in column order."""
+        names = []
+        while bits:
+            low = bits & -bits
+            names.append(self.terminals[low.bit_length() - 1])
+            bits ^= low
+        return names
+
+    def _nullable(self, productions):
+        # a production is nullable once all its (nonterminal) symbols are
+        remaining = []
+        uses = {}
+        pending = []
+        for p, (lhs, rhs, *_) in enumerate(productions):
+            if any(sym in self.bit for sym in rhs):
+                remaining.append(-1)
+                continue
+            remaining.append(len(rhs))
+            for sym in rhs:
+                uses.setdefault(sym, []).append(p)
+            if not rhs:
+                pending.append(lhs)
+        nullable = set()
+        while pending:
+            A = pending.pop()
+            if A in nullable:
+                continue
+            nullable.add(A)
+            for p in uses.get(A, ()):
+                remaining[p] -= 1
+                if remaining[p] == 0:
+                    pending.append(productions[p][0])
+        return nullable
+
+    def _first(self, grammar):
+        first = dict.fromkeys(grammar.nonterminals, 0)
+        feeds = {}
+        for lhs, rhs, *_ in grammar.productions:
+            for sym in rhs:
+                if sym in self.bit:
+                    first[lhs] |= self.bit[sym]
+                    break
+                feeds.setdefault(sym, set()).add(lhs)
+                if sym not in self.nullable:
+                    break
+        _propagate(first, feeds)
+        return first
+
+    def _follow(self, productions, used, start):
+        follow = dict.fromkeys(used, 0)
+        follow[start] |= self.bit['T_EOF']
+        feeds = {}
+        for lhs, rhs, *_ in productions:
+            if lhs not in used or lhs in EXTERNAL:
+                continue
+            # right to left, carrying FIRST of what follows position i
+            rest, rest_nullable = 0, True
+            for sym in reversed(rhs):
+                if sym in follow:
+                    follow[sym] |= rest
+                    if rest_nullable:
+                        feeds.setdefault(lhs, set()).add(sym)
+                if sym in self.bit:
+                    rest, rest_nullable = self.bit[sym], False
+                elif sym in self.nullable:
+                    rest |= self.first[sym]
+                else:
+                    rest, rest_nullable = self.first[sym], False
+        _propagate(follow, feeds)
+        return follow
+
+
+def _propagate(sets, feeds):
+    """Close `sets` under sets[A] |= sets[B] for every A in feeds[B]."""
+    pending = list(sets)
+    queued = set(pending)
+    while pending:
+        B = pending.pop()
+        queued.discard(B)
+        bits = sets[B]
+        for A in feeds.get(B, ()):
+            if bits & ~sets[A]:
+                sets[A] |= bits
+                if A not in queued:
+                    queued.add(A)
+                    pending.append(A)
+
+
+def reachable(grammar, start=START):
+    by_lhs = {}
+    for p, (lhs, rhs, *_) in enumerate(grammar.productions):
+        by_lhs.setdefault(lhs, []).append(p)
+    seen = {start}
+    pending = [start]
+    while pending:
+        A = pending.pop()
+        if A in EXTERNAL:
+            continue
+        for p in by_lhs[A]:
+            for sym in grammar.productions[p][1]:
+                if sym in by_lhs and sym not in seen:
+                    seen.add(sym)
+                    pending.append(sym)
+    return seen
+
+
+# --- Compiling the table -------------------------------------------------------------
+class PredictTable:
+    """
+    A compiled table: symbols are ints, terminals (token types) first, then
+    one extra column for token types the grammar never mentions, then the
+    nonterminals. table[(A - n_cols) * n_cols + column] is a production
+    index, ERROR, or -2 - k for predicates[k] = (method, if_true, if_false).
+    first and follow map nonterminal names to frozensets of terminal names;
+    nullable is the frozenset of nonterminals that derive ε. conflicts is
+    the LL(1) conflict report: (nonterminal, terminal, productions,
+    resolution) per cell predicted by more than one production, where
+    resolution is GREED, UNRESOLVED or the index of the predicate.
+    """
+    def __init__(self, digest, terminals, nonterminals, productions, table,
+                 predicates, externals, first, follow, nullable=frozenset(), conflicts=()):
+        self.digest = digest
+        self.terminals = terminals
+        self.nonterminals = nonterminals
+        self.n_cols = len(terminals) + 1
+        self.productions = productions          # (lhs, kind, alt, origin, rhs)
+        self.table = table
+        self.predicates = predicates
+        self.externals = externals              # symbol -> Parser method
+        self.column_of = {t: i for i, t in enumerate(terminals)}
+        self.first = first
+        self.follow = follow
+        self.nullable = nullable
+        self.conflicts = list(conflicts)
+
+    def symbol(self, name):
+        if name in self.column_of:
+            return self.column_of[name]
+        return self.n_cols + self.nonterminals.index(name)
+
+    def symbol_name(self, sym):
+        if sym < self.n_cols:
+            return self.terminals[sym] if sym < len(self.terminals) else '?'
+        return self.nonterminals[sym - self.n_cols]
+
+    # --- binary cache ---
+    def save(self, path):
+        names = self.terminals + self.nonterminals + [m for m, _, _ in self.predicates] \
+            + list(self.externals.values())
+        rhs = array('h')
+        offsets = array('h', [0])
+        prods = array('h')
+        for lhs, kind, alt, origin, body in self.productions:
+            prods.extend((lhs, kind, alt, origin))
+            rhs.extend(body)
+            offsets.append(len(rhs))
+        preds = array('h')
+        for _, if_true, if_false in self.predicates:
+            preds.extend((if_true, if_false))
+        ext = array('h', self.externals)
+        # FIRST then FOLLOW of each nonterminal, as terminal columns
+        sets = array('h')
+        set_offsets = array('h', [0])
+        for A in self.nonterminals:
+            for named in (self.first[A], self.follow[A]):
+                sets.extend(sorted(self.column_of[t] for t in named))
+                set_offsets.append(len(sets))
+        nullable = array('h', sorted(self.nonterminals.index(A) for A in self.nullable))
+        # per conflict: row, column, resolution, production count, productions
+        conflicts = array('h')
+        for A, t, chosen, resolution in self.conflicts:
+            conflicts.extend((self.nonterminals.index(A), self.column_of[t], resolution, len(chosen)))
+            conflicts.extend(chosen)
+        parts = [TABLE_FILE_HEADER.pack(
+            TABLE_FILE_MAGIC, TABLE_FILE_VERSION, self.digest, self.n_cols,
+            len(self.nonterminals), len(self.productions), len(rhs),
+            len(self.predicates), len(self.externals), len(sets),
+            len(nullable), len(conflicts))]
+        for name in names:
+            raw = name.encode('utf-8')
+            parts.append(bytes([len(raw)]) + raw)
+        for arr in (prods, offsets, rhs, self.table, preds, ext, set_offsets, sets,
+                    nullable, conflicts):
+            parts.append(_le(arr))
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(b''.join(parts))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, digest):
+        """The cached table at `path`, or None if missing or stale."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < TABLE_FILE_HEADER.size:
+            return None
+        (magic, version, file_digest, n_cols, n_nts, n_prods, n_rhs,
+         n_preds, n_ext, n_sets, n_nullable, n_conflicts) = TABLE_FILE_HEADER.unpack_from(data)
+        if magic != TABLE_FILE_MAGIC or version != TABLE_FILE_VERSION or file_digest != digest:
+            return None
+        at = TABLE_FILE_HEADER.size
+        names = []
+        for _ in range(n_cols - 1 + n_nts + n_preds + n_ext):
+            size = data[at]
+            names.append(data[at+1:at+1+size].decode('utf-8'))
+            at += 1 + size
+
+        def take(count):
+            nonlocal at
+            arr = array('h')
+            arr.frombytes(data[at:at + 2*count])
+            if sys.byteorder != 'little':
+                arr.byteswap()
+            at += 2*count
+            return arr
+
+        prods = take(4*n_prods)
+        offsets = take(n_prods + 1)
+        rhs = take(n_rhs)
+        table = take(n_nts * n_cols)
+        preds = take(2*n_preds)
+        ext = take(n_ext)
+        set_offsets = take(2*n_nts + 1)
+        sets = take(n_sets)
+        nullable = take(n_nullable)
+        packed = take(n_conflicts)
+        terminals = names[:n_cols-1]
+        nonterminals = names[n_cols-1:n_cols-1+n_nts]
+        methods = names[n_cols-1+n_nts:]
+        productions = [(prods[4*p], prods[4*p+1], prods[4*p+2], prods[4*p+3],
+                        list(rhs[offsets[p]:offsets[p+1]])) for p in range(n_prods)]
+        predicates = [(methods[k], preds[2*k], preds[2*k+1]) for k in range(n_preds)]
+        externals = {sym: methods[n_preds+k] for k, sym in enumerate(ext)}
+        named = [frozenset(terminals[c] for c in sets[set_offsets[k]:set_offsets[k+1]])
+                 for k in range(2*n_nts)]
+        first = dict(zip(nonterminals, named[0::2]))
+        follow = dict(zip(nonterminals, named[1::2]))
+        conflicts = []
+        k = 0
+        while k < len(packed):
+            row, column, resolution, count = packed[k:k+4]
+            conflicts.append((nonterminals[row], terminals[column],
+                              tuple(packed[k+4:k+4+count]), resolution))
+            k += 4 + count
+        return cls(digest, terminals, nonterminals, productions, table, predicates, externals,
+                   first, follow, frozenset(nonterminals[A] for A in nullable), conflicts)
+
+
+def _le(arr):
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def grammar_digest(text):
+    settings = repr((TABLE_FILE_VERSION, START, sorted(TERMINALS.items()),
+                     sorted(EXTERNAL.items()), sorted(PREDICATES.items()),
+                     sorted(EMPTY_FOLLOW.items())))
+    return hashlib.sha256(text.encode('utf-8') + b'\0' + settings.encode('utf-8')).digest()
+
+
+def compile_grammar(text, strict=True):
+    """
+    Compile grammar text to (PredictTable, FIRST, FOLLOW); FIRST/FOLLOW by
+    name, FIRST with ε for nullable nonterminals. A conflict neither greed
+    nor a predicate resolves raises GrammarError, or with strict=False is
+    only reported (table.conflicts) and its cell keeps the production
+    listed first.
+    """
+    grammar = Grammar(read_grammar(text))
+    if START not in grammar.rules:
+        raise GrammarError(f"No <{START}> rule")
+    used = reachable(grammar)
+    sets = GrammarSets(grammar, used)
+
+    nonterminals = [A for A in grammar.nonterminals if A in used]
+    keep = [p for p, prod in enumerate(grammar.productions)
+            if prod[0] in used and prod[0] not in EXTERNAL]
+    mentioned = 0
+    for p in keep:
+        for s in grammar.productions[p][1]:
+            mentioned |= sets.bit.get(s, 0)
+    for A in nonterminals:
+        mentioned |= sets.first[A] | sets.follow[A]
+    terminals = sets.names(mentioned)
+    n_cols = len(terminals) + 1
+    col = {t: i for i, t in enumerate(terminals)}
+    row = {A: i for i, A in enumerate(nonterminals)}
+
+    def sym(name):
+        return col[name] if name in col else n_cols + row[name]
+
+    productions = []
+    cells = {}
+    for i, p in enumerate(keep):
+        lhs, rhs, kind, alt, origin = grammar.productions[p]
+        productions.append((sym(lhs), kind, alt, row[origin], [sym(s) for s in rhs]))
+        predicted, nullable = sets.first_of(rhs)
+        for t in sets.names(predicted):
+            cells.setdefault((lhs, t), []).append((i, 'first'))
+        if nullable:
+            follow = sets.follow[lhs]
+            if kind == EMPTY and origin in EMPTY_FOLLOW:
+                follow &= sum(sets.bit.get(t, 0) for t in EMPTY_FOLLOW[origin])
+            for t in sets.names(follow):
+                cells.setdefault((lhs, t), []).append((i, 'follow'))
+
+    table = array('h', [ERROR]) * (len(nonterminals) * n_cols)
+    predicates = []
+    conflicts = []
+    for (A, t), entries in cells.items():
+        chosen = sorted({p for p, _ in entries})
+        entry = chosen[0]
+        if len(chosen) > 1:
+            # greed: prefer the production that actually starts with t
+            by_first = {p for p, how in entries if how == 'first'}
+            if len(by_first) == 1:
+                entry = by_first.pop()
+                resolution = GREED
+            else:
+                resolution = _predicate(A, t, chosen, grammar, keep, predicates)
+                if resolution != UNRESOLVED:
+                    entry = -2 - resolution
+            conflicts.append((A, t, tuple(chosen), resolution))
+        table[row[A] * n_cols + col[t]] = entry
+
+    unresolved = [(A, t, chosen) for A, t, chosen, how in conflicts if how == UNRESOLVED]
+    if strict and unresolved:
+        raise GrammarError('\n'.join(
+            f"LL(1) conflict at {A} on {t}: " + '; '.join(
+                f"{grammar.productions[keep[p]][0]} -> {' '.join(grammar.productions[keep[p]][1]) or EPSILON}"
+                for p in chosen)
+            for A, t, chosen in unresolved))
+
+    externals = {sym(A): method for A, method in EXTERNAL.items() if A in row}
+    digest = grammar_digest(text)
+    first = {A: set(sets.names(bits)) | ({EPSILON} if A in sets.nullable else set())
+             for A, bits in sets.first.items()}
+    follow = {A: set(sets.names(bits)) for A, bits in sets.follow.items()}
+    return (PredictTable(digest, terminals, nonterminals, productions, table, predicates, externals,
+                         {A: frozenset(first[A] - {EPSILON}) for A in nonterminals},
+                         {A: frozenset(follow[A]) for A in nonterminals},
+                         frozenset(A for A in nonterminals if A in sets.nullable), conflicts),
+            first, follow)
+
+
+def _predicate(A, t, candidates, grammar, keep, predicates):
+    """Index of the predicate that decides between two candidates, or UNRESOLVED."""
+    def key(p):
+        lhs, rhs, kind, alt, origin = grammar.productions[keep[p]]
+        return (origin, rhs[0] if rhs else None)
+    named = [p for p in candidates if key(p) in PREDICATES]
+    if len(candidates) != 2 or len(named) != 1:
+        return UNRESOLVED
+    if_true = named[0]
+    if_false = candidates[0] if candidates[1] == if_true else candidates[1]
+    predicates.append((PREDICATES[key(if_true)], if_true, if_false))
+    return len(predicates) - 1
+
+
+# --- Report ------------------------------------------------------------------------
+# REPORT_FILE is the compiled table as JSON for tools and people:
+# productions, FIRST/FOLLOW, every non-error cell and the conflict report,
+# keyed by the grammar digest so an unchanged grammar is not rewritten.
+RESOLUTIONS = {GREED: 'greed', UNRESOLVED: 'unresolved'}
+KIND_NAMES = ('rule', 'group', 'empty', 'more', 'done')
+
+
+def spelling(terminal):
+    """How the grammar writes a token type ('T_Let' -> 'let', 'T_Id' -> 'Id')."""
+    return _SPELLINGS.get(terminal, terminal)
+
+
+_SPELLINGS = {token: text.strip('"') for text, token in TERMINALS.items()}
+
+
+def production_text(table, p):
+    """`lhs -> rhs` of production p, in grammar spellings."""
+    lhs, _, _, _, rhs = table.productions[p]
+    body = ' '.join(spelling(table.symbol_name(s)) for s in rhs) or EPSILON
+    return f"{table.symbol_name(lhs)} -> {body}"
+
+
+def report(table):
+    """The JSON-ready report of a PredictTable (see REPORT_FILE)."""
+    productions = [{'lhs': table.symbol_name(lhs), 'kind': KIND_NAMES[kind], 'alt': alt,
+                    'origin': table.nonterminals[origin],
+                    'rhs': [table.symbol_name(s) for s in rhs]}
+                   for lhs, kind, alt, origin, rhs in table.productions]
+    cells = {}
+    for r, A in enumerate(table.nonterminals):
+        for c, t in enumerate(table.terminals):
+            entry = table.table[r * table.n_cols + c]
+            if entry == ERROR:
+                continue
+            if entry >= 0:
+                cells.setdefault(A, {})[t] = entry
+            else:
+                method, if_true, if_false = table.predicates[-2 - entry]
+                cells.setdefault(A, {})[t] = {'predicate': method, 'if_true': if_true,
+                                              'if_false': if_false}
+    conflicts = []
+    for A, t, prods, resolution in table.conflicts:
+        conflict = {'nonterminal': A, 'terminal': t, 'productions': list(prods),
+                    'resolution': RESOLUTIONS.get(resolution, 'predicate')}
+        if resolution >= 0:
+            conflict['predicate'] = table.predicates[resolution][0]
+        conflicts.append(conflict)
+    return {
+        'digest': table.digest.hex(),
+        'start': START,
+        'terminals': table.terminals,
+        'nonterminals': table.nonterminals,
+        'productions': productions,
+        'nullable': sorted(table.nullable),
+        'first': {A: sorted(table.first[A]) for A in table.nonterminals},
+        'follow': {A: sorted(table.follow[A]) for A in table.nonterminals},
+        'externals': {table.symbol_name(sym): method for sym, method in table.externals.items()},
+        'table': cells,
+        'conflicts': conflicts,
+    }
+
+
+def write_report(table, path=None):
+    """Write the report of `table` unless `path` already holds it; returns whether it wrote."""
+    path = path or REPORT_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            if json.load(f).get('digest') == table.digest.hex():
+                return False
+    except (OSError, ValueError):
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report(table), f, indent=1, ensure_ascii=False)
+        f.write('\n')
+    return True
+
+
+# --- Loading -----------------------------------------------------------------------
+_tables = {}
+
+
+def load_predict_table(grammar_path=GRAMMAR_FILE, cache_path=CACHE_FILE):
+    """The compiled table for the grammar file, from memory, the cache or a fresh compile."""
+    with open(grammar_path, encoding='utf-8') as f:
+        text = f.read()
+    digest = grammar_digest(text)
+    table = _tables.get(digest)
+    if table is None:
+        table = PredictTable.load(cache_path, digest)
+    if table is None:
+        table = compile_grammar(text)[0]
+        try:
+            table.save(cache_path)
+        except OSError:
+            pass    # read-only checkout: compile again next time
+    _tables[digest] = table
+    return table
+
+
+if __name__ == '__main__':
+    # Usage: python ll1_table.py [grammar file]
+    # Compiles the grammar (or takes it from the cache), refreshes
+    # REPORT_FILE for the default grammar and prints the conflict report.
+    path = sys.argv[1] if len(sys.argv) > 1 else GRAMMAR_FILE
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        table = load_predict_table(path) if path == GRAMMAR_FILE else compile_grammar(text)[0]
+        failed = None
+    except GrammarError as e:
+        # still report every conflict, then fail
+        failed = e
+        try:
+            table = compile_grammar(text, strict=False)[0]
+        except GrammarError as e:
+            sys.exit(f"Grammar error: {e}")
+    print(f"{len(table.productions)} productions, {len(table.nonterminals)} nonterminals, "
+          f"{len(table.terminals)} terminals")
+    print("\nConflicts:" if table.conflicts else "\nNo conflicts")
+    for conflict in report(table)['conflicts']:
+        how = conflict['resolution']
+        if how == 'predicate':
+            how = f"predicate {conflict['predicate']}"
+        alts = ' | '.join(production_text(table, p) for p in conflict['productions'])
+        print(f"  {conflict['nonterminal']} on {spelling(conflict['terminal'])}: {alts} ({how})")
+    if path == GRAMMAR_FILE:
+        wrote = write_report(table)
+        print(f"\nReport {'written to' if wrote else 'up to date in'} '{REPORT_FILE}'")
+    if failed:
+        sys.exit(f"Grammar error: {failed}")
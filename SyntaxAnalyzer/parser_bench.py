@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, os.pardir, 'Lexer'))
+
+from Lexer import Lexer
+from Parser import Parser, TableParser
+from incremental import IncrementalParser
+from ll1_table import CACHE_FILE, GRAMMAR_FILE, PredictTable, compile_grammar, grammar_digest, load_predict_table
+
+# Times the recursive-descent Parser against the table-driven TableParser
+# on a corpus built by repeating the sample inputs (Lexer/input*.txt) until
+# it reaches TARGET_TOKENS, and checks both build the same tree. Also
+# reports what compiling the predict table costs against loading it from
+# the binary cache, what Parser.parse_parallel gets out of the machine's
+# cores, and what an incremental reparse after a one-token edit costs as
+# the corpus grows.
+
+TARGET_TOKENS = 200_000
+ROUNDS = 3
+REPARSE_SIZES = (12_500, 50_000, 200_000)
+
+
+def load_corpus(paths, target=TARGET_TOKENS):
+    sample = ''
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            sample += f.read() + '\n'
+    count = max(1, len(Lexer(sample).tokenize_buffer(skip_trivia=True)) - 1)
+    return sample * max(1, target // count)
+
+
+def bench(engine, tokens, rounds=ROUNDS):
+    best = None
+    parser = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parser = engine(tokens)
+        parser.parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parser
+
+
+def bench_reparse(paths, sizes=REPARSE_SIZES, rounds=ROUNDS):
+    # rewrite one number in the middle of the corpus; time the edit (relex
+    # + reparse) and the reparse alone against parsing the edited text from
+    # scratch
+    for size in sizes:
+        inc = IncrementalParser(load_corpus(paths, size))
+        parse_times = []
+        reparse = inc.parser.reparse
+
+        def timed_reparse(*args):
+            start = time.perf_counter()
+            tree = reparse(*args)
+            parse_times.append(time.perf_counter() - start)
+            return tree
+        inc.parser.reparse = timed_reparse
+        number = next(t for t in inc.lexed[len(inc.lexed) // 2:] if t.type.name == 'T_Decimal')
+        offset, length = number.offset, len(number.lexeme)
+        best = None
+        for i in range(rounds):
+            digits = '7' * (i % 2 + 1)
+            start = time.perf_counter()
+            inc.edit(offset, length, digits)
+            elapsed = time.perf_counter() - start
+            length = len(digits)
+            best = elapsed if best is None else min(best, elapsed)
+        full, parser = bench(Parser, Lexer(inc.source).tokenize_buffer(skip_trivia=True), 1)
+        status = 'identical' if inc.parser.ast.to_tree() == parser.ast.to_tree() else 'MISMATCH'
+        print(f"     edit: {best * 1000:6.2f} ms at {len(inc.lexed):>7} tokens, reparse "
+              f"{min(parse_times) * 1000:5.2f} ms (full parse {full * 1000:6.1f} ms, {status})")
+
+
+def main():
+    lexer_dir = os.path.join(SCRIPT_DIR, os.pardir, 'Lexer')
+    names = sys.argv[1:] or sorted(n for n in os.listdir(lexer_dir)
+                                   if n.startswith('input') and n.endswith('.txt'))
+    # only repeat inputs that parse cleanly
+    paths = []
+    for name in names:
+        path = os.path.join(lexer_dir, name)
+        with open(path, 'r', encoding='utf-8') as f:
+            p = Parser(Lexer(f.read()).tokenize_buffer(skip_trivia=True))
+        p.parse()
+        if p.errors:
+            print(f"skipping {name}: {p.errors[0]}")
+            continue
+        paths.append(path)
+
+    tokens = Lexer(load_corpus(paths)).tokenize_buffer(skip_trivia=True)
+    print(f"corpus: {len(paths)} files, {len(tokens)} tokens")
+
+    with open(GRAMMAR_FILE, encoding='utf-8') as f:
+        text = f.read()
+    start = time.perf_counter()
+    compile_grammar(text)
+    compiled = time.perf_counter() - start
+    load_predict_table()            # make sure the cache is written
+    start = time.perf_counter()
+    PredictTable.load(CACHE_FILE, grammar_digest(text))
+    cached = time.perf_counter() - start
+    print(f" table: compile {compiled * 1000:.1f} ms, cached load {cached * 1000:.1f} ms")
+
+    reference = None
+    for label, engine in (('recursive', Parser), ('table', TableParser)):
+        elapsed, parser = bench(engine, tokens)
+        tree = parser.ast.to_tree()
+        if reference is None:
+            reference = tree
+        status = 'identical' if tree == reference and not parser.errors else 'MISMATCH'
+        print(f"{label:>9}: {len(tokens) / elapsed / 1000:8.1f} k tokens/s  "
+              f"({elapsed:.3f}s, {len(parser.ast)} nodes, {status})")
+
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        parser = Parser(tokens)
+        parser.parse_parallel()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    status = 'identical' if parser.ast.to_tree() == reference and not parser.errors else 'MISMATCH'
+    print(f"     pool: {len(tokens) / best / 1000:8.1f} k tokens/s  "
+          f"({best:.3f}s, {len(parser.ast)} nodes, {status}, {os.cpu_count()} workers)")
+
+    bench_reparse(paths)
+
+
+if __name__ == '__main__':
+    main()
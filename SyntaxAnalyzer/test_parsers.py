@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+LEXER_DIR = os.path.join(SCRIPT_DIR, os.pardir, 'Lexer')
+for path in (SCRIPT_DIR, LEXER_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from Lexer import Lexer
+from Parser import Parser, TableParser
+
+# Differential test: the recursive-descent Parser and the table-driven
+# TableParser must accept and reject the same token buffers. Inputs are the
+# sample programs (Lexer/input*.txt), a few fixed edge cases, and seeded
+# one-token mutations of the samples.
+
+MUTATIONS = 1000
+WORDS = ('let mut fn return break continue if else loop println! bool i32 true false '
+         '( ) [ ] { } , : ; = -> ! || && == < + - * x y 1 0x1 "s" "{}"').split()
+
+CASES = [
+    'fn main() { return return 2; }',
+    'fn main() { let arr = 1; return let arr = 2; }',
+    'fn main() { return\n return 1; }',
+    'fn main() { return break; }',
+    'fn main() { return; }',
+    'fn f() { return }',
+    'fn f() -> i32 { return 1 }',
+    'fn f() -> i32 { return -x }',
+    'return',
+    'fn main() { if x { } else { } else { } }',
+    'fn main() { println!("{}", x = 1, y); }',
+    'fn main() { x[1][2] = 3; x(1) = 2; }',
+]
+
+
+def samples():
+    names = sorted(n for n in os.listdir(LEXER_DIR) if n.startswith('input') and n.endswith('.txt'))
+    for name in names:
+        with open(os.path.join(LEXER_DIR, name), encoding='utf-8') as f:
+            yield f.read()
+
+
+def tokens(source):
+    try:
+        return Lexer(source).tokenize_buffer(skip_trivia=True)
+    except Exception:
+        return None
+
+
+def accepts(engine, buf):
+    parser = engine(buf)
+    parser.parse()
+    return not parser.errors
+
+
+def check(source):
+    buf = tokens(source)
+    if buf is None:
+        return
+    recursive, table = accepts(Parser, buf), accepts(TableParser, buf)
+    assert recursive == table, f"{source!r}: Parser accepts {recursive}, TableParser {table}"
+
+
+def test_cases():
+    for source in CASES:
+        check(source)
+
+
+def test_samples():
+    for source in samples():
+        check(source)
+
+
+def test_mutations():
+    rng = random.Random(14)
+    lexemes = [[t.lexeme for t in buf][:-1] for buf in map(tokens, samples()) if buf is not None]
+    for _ in range(MUTATIONS):
+        words = list(rng.choice(lexemes))
+        k = rng.randrange(len(words))
+        op = rng.randrange(3)
+        if op == 0:
+            del words[k]
+        elif op == 1:
+            words.insert(k, rng.choice(WORDS))
+        else:
+            words[k] = rng.choice(WORDS)
+        check(' '.join(words))
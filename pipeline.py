@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+
+# Runs Lexer -> Parser -> Semantic Analyzer -> Code Generator in one process.
+# All three later stages work on the parser's arena AST (ast_arena), so
+# nothing goes through tokens.bin, parse_tree.txt or syntax_tree.json. The
+# per-stage scripts still work on their own; their files are only written
+# here on request. compile_stream runs the same stages one top-level item
+# at a time, from a source stream to an output stream.
+
+ROOT = os.path.dirname(os.path.realpath(__file__))
+for stage in ('Lexer', 'SyntaxAnalyzer', 'Semantic Analyzer', 'Code Generator'):
+    stage_dir = os.path.join(ROOT, stage)
+    if stage_dir not in sys.path:
+        sys.path.insert(0, stage_dir)
+
+from Lexer import Lexer, LexerError, SymbolTable, write_token_file
+from Parser import Parser, StreamParser, Token
+from semantic_analyzer import SemanticAnalyzer
+import code_generator
+
+
+class CompileError(Exception):
+    """A stage reported errors; `stage` is 'lexer', 'parser' or 'semantic'."""
+    def __init__(self, stage: str, errors: list):
+        super().__init__(f"{stage} errors:\n" + '\n'.join(errors))
+        self.stage = stage
+        self.errors = errors
+
+
+# --- Pipeline ---------------------------------------------------------------
+def compile(source: str, artifacts_dir: str = None) -> str:
+    """
+    Compile Trust source text to C text. Raises CompileError with the
+    first failing stage's errors. If artifacts_dir is given, the stage
+    files (tokens.bin, parse_tree.txt, syntax_tree.json, output.c) are
+    also written there.
+    """
+    symtab = SymbolTable()
+    try:
+        tokens = Lexer(source, symbol_table=symtab).tokenize_buffer(skip_trivia=True)
+    except LexerError as e:
+        raise CompileError('lexer', [str(e)])
+
+    parser = Parser(tokens)
+    tree = parser.parse()
+    if artifacts_dir is not None:
+        os.makedirs(artifacts_dir, exist_ok=True)
+        write_token_file(os.path.join(artifacts_dir, 'tokens.bin'), tokens)
+        with open(os.path.join(artifacts_dir, 'parse_tree.txt'), 'w', encoding='utf-8') as out:
+            if parser.errors:
+                out.write('Errors:\n' + ''.join(e + '\n' for e in parser.errors))
+            else:
+                out.write(parser.ast.to_tree())
+    if parser.errors:
+        raise CompileError('parser', parser.errors)
+
+    analyzer = SemanticAnalyzer(tree)
+    analyzer.check(tree)
+    if analyzer.errors:
+        raise CompileError('semantic', analyzer.errors)
+
+    if artifacts_dir is not None:
+        with open(os.path.join(artifacts_dir, 'syntax_tree.json'), 'w', encoding='utf-8') as f:
+            json.dump(analyzer.node_to_dict(tree), f, indent=2)
+
+    c_text = '\n'.join(code_generator.gen_program(tree))
+    if artifacts_dir is not None:
+        with open(os.path.join(artifacts_dir, 'output.c'), 'w', encoding='utf-8') as f:
+            f.write(c_text)
+    return c_text
+
+
+def compile_stream(source, out) -> None:
+    """
+    compile() without holding the whole program: `source` is a text stream
+    (anything with .read(n)), and each top-level item's C is written to
+    `out` (anything with .write(s)) as soon as the item is parsed and
+    checked. Memory is bounded by the largest top-level fn and the items
+    after it (see StreamParser), plus the analyzer's symbol array (an
+    entry per declaration).
+
+    Items are checked in source order, which is all the analyzer needs:
+    names resolve against what was declared before them, as in
+    check_Program. The C is compile()'s reordered: globals stay in source
+    order, each tuple struct is defined before the first item that uses
+    it, and there are no prototypes (see code_generator.gen_item).
+
+    Raises CompileError like compile(); C written before the error has
+    been found stays in `out`.
+    """
+    lexer = Lexer(skip_trivia=True)
+    tokens = (Token(t.type.name, t.lexeme, t.line, t.column) for t in lexer.iter_tokens(source))
+    parser = StreamParser(tokens)
+    analyzer = SemanticAnalyzer(None)
+    out.write('\n'.join(code_generator.start_stream()) + '\n')
+    try:
+        for item in parser:
+            analyzer.check(item)
+            if not analyzer.errors:
+                out.write('\n'.join(code_generator.gen_item(item)) + '\n')
+    except LexerError as e:
+        raise CompileError('lexer', [str(e)])
+    if parser.errors:
+        raise CompileError('parser', parser.errors)
+    analyzer.check_main()
+    if analyzer.errors:
+        raise CompileError('semantic', analyzer.errors)
+
+
+if __name__ == '__main__':
+    # Usage: python pipeline.py <source file> [output.c] [--artifacts DIR | --stream]
+    args = sys.argv[1:]
+    stream = '--stream' in args
+    if stream:
+        args.remove('--stream')
+    artifacts_dir = None
+    if '--artifacts' in args:
+        i = args.index('--artifacts')
+        if i + 1 >= len(args):
+            sys.exit("--artifacts needs a directory")
+        artifacts_dir = args[i + 1]
+        del args[i:i + 2]
+    if not args or (stream and artifacts_dir is not None):
+        sys.exit("Usage: python pipeline.py <source file> [output.c] [--artifacts DIR | --stream]")
+
+    output = args[1] if len(args) > 1 else 'output.c'
+    if stream:
+        try:
+            with open(args[0], encoding='utf-8') as f, open(output, 'w', encoding='utf-8') as out:
+                compile_stream(f, out)
+        except CompileError as e:
+            os.remove(output)
+            for err in e.errors:
+                print(f"{e.stage.capitalize()} error: {err}")
+            sys.exit(1)
+        print(f"Generated {output}")
+        sys.exit(0)
+
+    with open(args[0], encoding='utf-8') as f:
+        source = f.read()
+    try:
+        c_text = compile(source, artifacts_dir)
+    except CompileError as e:
+        for err in e.errors:
+            print(f"{e.stage.capitalize()} error: {err}")
+        sys.exit(1)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(c_text)
+    print(f"Generated {output}")